@@ -1,15 +1,14 @@
 from router import Router
-import network_map as nwm
 import constants
 
-def runBellmanFord():
+def runBellmanFord(sim):
     ''' 
     Begin Bellman Ford by iterating through the routers and resetting the 
     weights of the necessary entries of the routers' routing tables. Then have
-    every router broadcast routing table packets. 
+    every router broadcast its whole routing table. 
     '''
-    for ids in nwm.routers:     # broadcast RT packets from every router
-        curr_router = nwm.get_router_from_id(ids)
+    for ids in sim.routers:     # broadcast RT packets from every router
+        curr_router = sim.get_router_from_id(ids)
         # modify routing table to reset values
         curr_router.modify_routing_table()
-        curr_router.broadcastRTPackets()
\ No newline at end of file
+        curr_router.broadcastRTPackets(full=True)
\ No newline at end of file
@@ -140,6 +140,34 @@ class Analytics:
             else:
                 self.flow_window_size[flowID] = [(currTime, windowSize)]
 
+    def merge(self, other):
+        '''
+        Add the logs of another Analytics object (e.g. from another partition
+        of a parallel simulation) to this one. Rates logged at the same time
+        are added together and the other logs are kept sorted by time.
+        '''
+        for logs, other_logs in ((self.link_buff_occupancy, 
+                                    other.link_buff_occupancy),
+                                 (self.flow_packet_RTD, other.flow_packet_RTD),
+                                 (self.flow_window_size,
+                                    other.flow_window_size)):
+            for key, points in other_logs.items():
+                logs.setdefault(key, []).extend(points)
+                logs[key].sort(key=lambda x: x[0])
+
+        for logs, other_logs in ((self.link_flow_rate, other.link_flow_rate),
+                                 (self.flow_send_rate, other.flow_send_rate)):
+            for key, points in other_logs.items():
+                totals = dict(logs.get(key, []))
+                for currTime, amount in points:
+                    totals[currTime] = totals.get(currTime, 0) + amount
+                logs[key] = sorted(totals.items())
+
+        for linkID, lost in other.link_packet_lost.items():
+            link_lost = self.link_packet_lost.setdefault(linkID, {})
+            for currTime, numPkts in lost.items():
+                link_lost[currTime] = link_lost.get(currTime, 0) + numPkts
+
     def convertToWindow(self, times, data, numWindows=None):
         '''
         Converts the input times and data into numWindows discrete windows. The
@@ -0,0 +1,169 @@
+# benchmark.py
+# Scaling benchmark. Generates synthetic networks (see topology_gen.py) of
+# increasing size and simulates each one in a fresh process, reporting the
+# network size, events per second, peak memory and wall time of every run.
+#
+# Usage:
+#   python benchmark.py [--topologies T1 T2 ...] [--sizes N1 N2 ...]
+#                       [--wall-budget seconds] [--end-time ms]
+#                       [generator options] [-o results.csv]
+# e.g.
+#   python benchmark.py --topologies dumbbell fattree --sizes 2 4 8 \
+#       --flow-size 0.5 --wall-budget 60
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:         # Not available on Windows
+    resource = None
+
+import constants
+import sweep
+import topology_gen
+from simulator import Simulator
+
+def get_peak_memory():
+    '''
+    Returns the peak resident memory (MB) of this process so far, or None if
+    it can't be measured here.
+    '''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB everywhere else
+    if os.uname().sysname == 'Darwin':
+        return peak / (1024.0 * 1024.0)
+    return peak / 1024.0
+
+def run_benchmark_point(inFile, scheduler, end_time, wall_budget):
+    '''
+    Simulate inFile until all the flows are done, end_time (ms) or
+    wall_budget seconds (whichever comes first) and return the measurements.
+    '''
+    # The simulation prints its progress, which we don't want here
+    with open(os.devnull, 'w') as devnull, \
+        contextlib.redirect_stdout(devnull):
+        start = time.time()
+        simulator = Simulator(inFile, scheduler)
+        setup_time = time.time() - start
+
+        if end_time is None:
+            simulator.run(wall_budget)
+        else:
+            simulator.run_until(end_time, wall_budget)
+
+    stats = simulator.get_stats()
+    return {
+        'hosts': len(simulator.sim.hosts),
+        'routers': len(simulator.sim.routers),
+        'links': len(simulator.sim.links) // 2,
+        'flows': len(simulator.sim.flows),
+        'done': stats['done'],
+        'flows_done': len(stats['flows_done']),
+        'sim_time': stats['time'],
+        'events': stats['num_events'],
+        'events_per_sec': stats['events_per_sec'],
+        'setup_time': setup_time,
+        'run_time': stats['wall_time'],
+        'peak_mem_MB': get_peak_memory(),
+    }
+
+def benchmark_worker(conn, inFile, scheduler, end_time, wall_budget):
+    '''
+    Body of the process running one benchmark point. Sends back ('ok',
+    measurements) or ('error', description).
+    '''
+    try:
+        msg = ('ok', run_benchmark_point(inFile, scheduler, end_time,
+                                            wall_budget))
+    except Exception as e:
+        msg = ('error', repr(e))
+    conn.send(msg)
+    conn.close()
+
+def run_in_process(inFile, scheduler, end_time, wall_budget):
+    '''
+    Run one benchmark point in a new process, so its peak memory isn't
+    affected by earlier runs.
+    '''
+    ctx = multiprocessing.get_context('spawn')
+    conn, worker_conn = ctx.Pipe()
+    worker = ctx.Process(target=benchmark_worker,
+                args=(worker_conn, inFile, scheduler, end_time, wall_budget))
+    worker.start()
+    worker_conn.close()
+
+    try:
+        status, value = conn.recv()
+    except EOFError:
+        status, value = 'error', "benchmark process exited without a result"
+    worker.join()
+
+    if status == 'error':
+        raise RuntimeError("Benchmark of %s failed: %s" % (inFile, value))
+    return value
+
+def run_benchmark(topologies, sizes, args, scheduler=None, end_time=None,
+                    wall_budget=None):
+    '''
+    Generate and simulate every topology at every size, one run at a time
+    so the timings don't compete for cores. Returns one result dictionary
+    per run.
+    '''
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for topology in topologies:
+            for size in sizes:
+                inFile = os.path.join(tmp_dir, "%s_%d.txt" % (topology, size))
+                with open(inFile, 'w') as f:
+                    f.write(topology_gen.generate(topology, size, args))
+
+                result = {'topology': topology, 'size': size}
+                result.update(run_in_process(inFile, scheduler, end_time,
+                                                wall_budget))
+                results.append(result)
+
+                # Print progress since the larger runs take a while
+                print("%s %d: %d events in %.2f s" % (topology, size,
+                        result['events'], result['run_time']))
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the simulator on synthetic networks of "
+                    "increasing size.")
+    parser.add_argument('--topologies', nargs='+',
+                        choices=sorted(topology_gen.TOPOLOGIES),
+                        default=['dumbbell', 'parkinglot', 'ring', 'fattree',
+                                    'random'])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[2, 4, 8],
+                        help="sizes to generate (see topology_gen.py)")
+    parser.add_argument('--scheduler', default=constants.EQ_SCHEDULER,
+                        help="event queue scheduler")
+    parser.add_argument('--end-time', type=float, default=None,
+                        help="stop each run at this simulated time (ms)")
+    parser.add_argument('--wall-budget', type=float, default=None,
+                        help="stop each run after this many seconds")
+    parser.add_argument('-o', '--out', default=None,
+                        help="also write the results to this CSV file")
+    topology_gen.add_generator_args(parser)
+    parser.set_defaults(plot=0)
+    args = parser.parse_args()
+
+    if 'fattree' in args.topologies and any(s % 2 for s in args.sizes):
+        print("Fat tree sizes must be even")
+        exit(1)
+
+    results = run_benchmark(args.topologies, args.sizes, args,
+                            args.scheduler, args.end_time, args.wall_budget)
+
+    sweep.print_table(results)
+    if args.out is not None:
+        sweep.write_csv(results, args.out)
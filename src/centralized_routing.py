@@ -0,0 +1,154 @@
+# centralized_routing.py
+# Centralized routing, the alternative to Bellman Ford's routing table
+# packets (set constants.ROUTING = 'centralized'). Every routing update reads
+# the current cost of every link straight from the Link objects, runs
+# Dijkstra from every host and installs the next hops directly into the
+# routers' routing tables, so routing causes no events or traffic at all.
+#
+# The link costs are the same as Bellman Ford's (Link.cost, see
+# routing_updates.py), and equal cost paths are broken by the number of
+# hops. Updates are incremental: a host's shortest path tree is only
+# recomputed if one of its links changed cost or a link that got cheaper
+# gives a shorter path.
+
+import heapq
+
+from router import Router
+
+class CentralizedRouting:
+    '''
+    Computes the routes of a simulation's routers from the link costs.
+    '''
+    def __init__(self, sim):
+        self.sim = sim
+        self.hosts = list(sim.hosts.values())
+
+        # Bidirectional links between routers, as their direction a link
+        self.router_links = [link for link in sim.link_list \
+                                if link.ID[-1] == 'a' and \
+                                isinstance(link.src_node, Router) and \
+                                isinstance(link.dest_node, Router)]
+        self.costs = None           # Link costs of the last update, by index
+
+        # Shortest path trees of the last update. next_hops[h][r] is the
+        #   index of the link router r sends packets for the h'th host down
+        #   (None if r can't reach it) and dists[h][r] the (cost, hops) of
+        #   that path, both by the router's node index.
+        num_nodes = len(sim.node_list)
+        self.next_hops = [[None] * num_nodes for host in self.hosts]
+        self.dists = [[None] * num_nodes for host in self.hosts]
+
+    def get_costs(self):
+        '''
+        Returns the current routing cost of every link by its index.
+        '''
+        return [link.cost for link in self.sim.link_list]
+
+    def update(self):
+        '''
+        Recompute the shortest path trees affected by the link costs that
+        changed since the last update and install them in the routing tables.
+        '''
+        costs = self.get_costs()
+        for h, host in enumerate(self.hosts):
+            if self.costs is None or self.needs_update(h, host, costs):
+                self.shortest_paths(h, host, costs)
+        self.costs = costs
+
+        self.install_routes()
+
+    def needs_update(self, h, host, costs):
+        '''
+        Returns True if the shortest path tree of the h'th host could have
+        changed since the last update.
+        '''
+        next_hops = self.next_hops[h]
+        dists = self.dists[h]
+
+        host_link = host.link.index
+        if costs[host_link] != self.costs[host_link]:
+            return True
+
+        for link in self.router_links:
+            new_cost = costs[link.index]
+            old_cost = self.costs[link.index]
+            if new_cost == old_cost:
+                continue
+
+            A = link.src_node.index
+            B = link.dest_node.index
+
+            # The link is part of the tree, so paths using it changed
+            if next_hops[A] == link.index or \
+                next_hops[B] == link.opposite.index:
+                return True
+
+            # The link got cheaper and now gives a shorter path
+            if new_cost < old_cost and \
+                (self.is_shorter(dists[A], new_cost, dists[B]) or \
+                 self.is_shorter(dists[B], new_cost, dists[A])):
+                return True
+
+        return False
+
+    def is_shorter(self, dist, cost, old_dist):
+        '''
+        Returns True if a path of dist plus one link of cost is shorter than
+        old_dist.
+        '''
+        if dist is None:
+            return False
+        if old_dist is None:
+            return True
+        return (dist[0] + cost, dist[1] + 1) < old_dist
+
+    def shortest_paths(self, h, host, costs):
+        '''
+        Run Dijkstra from the h'th host through the routers. Link costs are
+        the same in both directions, so the distance from the host to a
+        router is the router's distance to the host.
+        '''
+        next_hops = [None] * len(self.sim.node_list)
+        dists = [None] * len(self.sim.node_list)
+
+        # The host's only link leads to its router
+        first = host.link.dest_node
+        dists[first.index] = (costs[host.link.index], 1)
+        next_hops[first.index] = host.link.opposite.index
+
+        heap = [(dists[first.index], first.index, first)]
+        while heap:
+            dist, index, router = heapq.heappop(heap)
+            if dist > dists[index]:
+                continue                # Already found a shorter path
+
+            for link in router.out_links:
+                neighbor = link.dest_node
+                if not isinstance(neighbor, Router):
+                    continue            # Hosts don't forward packets
+
+                new_dist = (dist[0] + costs[link.index], dist[1] + 1)
+                old_dist = dists[neighbor.index]
+                if old_dist is None or new_dist < old_dist:
+                    dists[neighbor.index] = new_dist
+                    # The neighbor sends packets back down the link
+                    next_hops[neighbor.index] = link.opposite.index
+                    heapq.heappush(heap, (new_dist, neighbor.index, neighbor))
+
+        self.next_hops[h] = next_hops
+        self.dists[h] = dists
+
+    def install_routes(self):
+        '''
+        Write the next hops and costs into every router's routing table.
+        Routers that can't reach a host keep the link they were using.
+        '''
+        for router in self.sim.routers.values():
+            for h, host in enumerate(self.hosts):
+                entry = router.routingTable[host.id]
+                next_hop = self.next_hops[h][router.index]
+                if next_hop is None:
+                    entry[1] = float("Inf")
+                else:
+                    entry[0] = next_hop
+                    entry[1] = self.dists[h][router.index][0]
@@ -0,0 +1,112 @@
+# checkpoint.py
+# Save the full simulator state at some simulated time and restore it later,
+# or fork several what-if branches from the current state in parallel.
+#
+# e.g.
+#   sim = Simulation()
+#   sim.load_network(inFile)
+#   sim.start()
+#   sim.run_events(end_time=10000)      # Warm up until 10 s
+#   checkpoint.save_checkpoint(sim, "warm.pkl")
+#   ...
+#   sim = checkpoint.load_checkpoint("warm.pkl")
+#   sim.links['L1a'].rate = 5.0         # What if L1 slowed down?
+#   sim.run_events()
+
+import os
+import pickle
+
+def save_checkpoint(sim, fileName):
+    '''
+    Write the full state of the Simulation sim to fileName: its event queue
+    (with the network's pending events), analytics logs and every object of
+    the network. The objects refer to each other (e.g. flows and the event
+    handles of their timeouts), so they are pickled together.
+    '''
+    with open(fileName, 'wb') as f:
+        pickle.dump(sim, f, pickle.HIGHEST_PROTOCOL)
+
+def load_checkpoint(fileName):
+    '''
+    Returns the Simulation saved in fileName. It can then be continued with
+    its run_events.
+    '''
+    with open(fileName, 'rb') as f:
+        return pickle.load(f)
+
+def default_branch_result(sim):
+    '''
+    Result sent back by a branch when fork_branches isn't given one: the
+    finish time of the simulation and of every flow.
+    '''
+    result = {'end_time': sim.EQ.currentTime}
+    for flow_id, flow in sim.flows.items():
+        result[flow_id + '_done'] = flow.done_time
+    return result
+
+def run_branch(sim, branch, end_time, result):
+    '''
+    Body of a forked branch: apply the branch's changes, run the simulation
+    and return the result.
+    '''
+    if branch is not None:
+        branch(sim)
+    sim.run_events(end_time)
+    return result(sim)
+
+def fork_branches(sim, branches, end_time=None, result=None):
+    '''
+    Fork one child process per entry of branches from the current (warm)
+    state of the Simulation sim and run them in parallel. Each branch is a
+    function (or None to run unchanged) that the child calls with sim to
+    modify it before running the rest of the simulation (until end_time, if
+    given). The child then sends back the value of result(sim)
+    (default_branch_result by default), which must be picklable.
+
+    Returns the results in the same order as branches. sim is not changed
+    in this process. Only available where os.fork is.
+    '''
+    if result is None:
+        result = default_branch_result
+
+    children = []
+    for branch in branches:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:    # Child: run the branch and report back
+            os.close(read_fd)
+            exit_code = 0
+            try:
+                msg = ('ok', run_branch(sim, branch, end_time, result))
+            except Exception as e:
+                msg = ('error', repr(e))
+                exit_code = 1
+
+            with os.fdopen(write_fd, 'wb') as f:
+                pickle.dump(msg, f, pickle.HIGHEST_PROTOCOL)
+            os._exit(exit_code)
+
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    results = []
+    errors = []
+    for i, (pid, read_fd) in enumerate(children):
+        with os.fdopen(read_fd, 'rb') as f:
+            try:
+                status, value = pickle.load(f)
+            except EOFError:
+                status, value = 'error', "branch exited without a result"
+        os.waitpid(pid, 0)
+
+        if status == 'ok':
+            results.append(value)
+        else:
+            results.append(None)
+            errors.append("branch %d: %s" % (i, value))
+
+    if errors:
+        raise RuntimeError("Forked branches failed: " + "; ".join(errors))
+
+    return results
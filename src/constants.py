@@ -15,21 +15,59 @@ RTABLE_PKT_SIZE = 64.0      # Bytes per routing table packet
 
 # Time Delays
 CONSECUTIVE_PKT_DELAY = 0.5 # Send new consecutive packets every 0.5 ms 
-TIMEOUT_TIME = 500          # Default packet timeout time, otherwise use avg RTT 
+TIMEOUT_TIME = 500          # Retransmission timeout until a flow has an RTT
+                            #   sample (ms)
 FAST_PERIOD = 100           # Time to update window size for Fast TCP
 BELLMAN_PERIOD = 5000       # Time between each bellman ford event enqueued (ms)
 
+# Retransmission Timeout (see retransmit_timer.py)
+RTO_MIN = 200               # Min retransmission timeout (ms)
+RTO_MAX = 60000             # Max retransmission timeout, after backoff (ms)
+RTO_ALPHA = 0.125           # Gain of the smoothed RTT
+RTO_BETA = 0.25             # Gain of the RTT variation
+RTO_K = 4                   # RTT variations the timeout adds to the smoothed RTT
+
+# Routing
+ROUTING = 'bellman'         # 'bellman' (routing table packets) or
+                            #   'centralized' (see centralized_routing.py)
+ROUTING_UPDATES = 'periodic'    # 'periodic' or 'triggered' by link cost
+                                #   changes (see routing_updates.py)
+ROUTING_CHECK_PERIOD = 500  # Time between link cost checks (ms)
+ROUTING_HOLD_DOWN = 5000    # Min time between routing updates (ms)
+ROUTING_COST_THRESHOLD = 10240.0    # Link cost change (bytes) that triggers
+                                    #   a routing update
+ROUTING_CACHE_SIZE = 32     # Cost vectors whose routing tables are kept
+
+# Fast TCP
+FAST_ALPHA = 15             # Packets each flow aims to keep queued in the network
+FAST_GAMMA = 0.5            # Weight of the new window in each window update
+
+# Links
+BUFFER_SIZE = None          # If set, overrides every link's buffer size (KB)
+
+# Fluid Flows (see fluid.py)
+FLUID_FLOWS = []            # IDs of the flows to simulate as fluid
+FLUID_STEP = 10             # Time between fluid model steps (ms)
+FLUID_EPSILON = 1e-6        # Fluid rates (bytes/ms) and backlogs (bytes)
+                            #   below this count as none
+
+# Event Queue
+EQ_SCHEDULER = 'heap'       # Event queue backend, 'heap' (faster in practice)
+                            #   or 'calendar' (see event_queue.py)
+
+# Event Loop
+WALL_CHECK_EVENTS = 1000    # Events between wall clock checks for time budgets
+MAX_SIM_TIME = 3600000      # Simulated time (ms) at which simulate() stops a
+                            #   run whose flows haven't all finished
+
+# Object Pools
+POOL_SIZE = 8192            # Max released events/packets of each class kept
+                            #   for reuse. The free lists peak at about 5000
+                            #   on a generated fattree-8 (128 flows).
+
 # Other
 DEFAULT_NUM_WINDOWS = 500   # Default window size for windowed averages
 DEC_PLACES = 2				# Round the decimal places for analytic's times
 
-# Global Variables
-global system_EQ            # the global event queue struct
-global system_analytics     # the global analytics class
-
-global debug                # When debugging
-global all_flows_done       # Indicates if all flows are completed
-global bellman_ford         # If we are running bellman ford
-
-debug = False
-bellman_ford = True
+# Debugging
+debug = False               # Print debugging output
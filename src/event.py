@@ -1,4 +1,10 @@
+import constants
+
 class Event:
+    __slots__ = ('event_type', 'time', 'data')
+
+    free_list = []      # Dispatched events that can be reused
+
     # Event Types
     flow_start = 1      # Flow begins at some time
     pckt_rcv = 2        # Packet is received by host or router
@@ -11,6 +17,15 @@ class Event:
     bellman_ford = 9    # Run bellman ford event
     flow_done = 10
     flow_rcv_data = 11  # Flow gets a data packet 
+    fluid_update = 12   # Advance the fluid flows by a step
+
+    def __new__(cls, *args):
+        '''
+        Reuse a released event if there is one instead of allocating a new one.
+        '''
+        if cls.free_list:
+            return cls.free_list.pop()
+        return object.__new__(cls)
 
     def __init__(self, ev_type, time, data):
         '''
@@ -25,57 +40,84 @@ class Event:
         self.data = data
         
         ''' 
-        Event Type Details:
+        Event Type Details (events refer to the simulation's objects directly,
+        not by ID):
         flow_start:
             Description: tells the flow to send packets
-            Data: [flowID]
+            Data: [flow]
 
         pckt_rcv:
             Description: Hands off packet to a host or router to deal with
-            Data: [hostID/routerID, packet]
+            Data: [host/router, packet]
 
         link_free:
             Description: Frees the link (i.e. it is no longer sending a packet),
                 and tells the link to send another packet if possible.
-            Data: [linkID]
+            Data: [link]
 
         flow_send_packets:
             Description: Enables the flow to tell the flow's source/dest 
                 (some host) to send packets.
-            Data: [hostID, list of packets]
+            Data: [host, list of packets]
 
         ack_rcv:
             Description: Tells the flow an acknowledgement packet was received
-            Data: [packetID, flowID, acknowledgement time]
+            Data: [packetID, flow, acknowledgement time, if the acknowledged 
+                data packet was a retransmission]
 
         pckt_send:
             Description: Hands off the packet to the link to send, hold in 
                 buffer, or drop.
-            Data: [linkID, packet]
+            Data: [link, packet]
 
         update_FAST:
             Description: Update the window size for Fast TCP congestion control 
                 algorithm
-            Data: [flowID]
+            Data: [flow]
 
         pckt_timeout:
-            Description: Tells the flow that a packet with a certain ID has 
-                timed out
-            Data: [packet, flowID]
+            Description: The flow's retransmission timer (see 
+                retransmit_timer.py) fired. Tells the flow which of its 
+                packets have timed out
+            Data: [flow]
 
         bellman_ford:
             Description: Enqueues another Bellman Ford event at a fixed time, 
                 and begins Bellman Ford algorithm to dynamically update 
-                routing tables.
+                routing tables (or recomputes the routes directly if the 
+                routing is centralized). With change triggered routing 
+                updates, this only happens if the link costs changed (see 
+                routing_updates.py).
             Data: None
 
         flow_done:
             Description: Checks if all the flows are finished, and updates the 
-                global constant that indicates all flows are finished.
+                simulation's flag that indicates all flows are finished.
             Data: None
 
         flow_rcv_data:
             Description: Flow receives a data packet and determines what ack 
                 to send
-            Data: [flowID, packet]
+            Data: [flow, packet]
+
+        fluid_update:
+            Description: Advances the fluid flows and the fluid in the links 
+                by one step, and enqueues the next step.
+            Data: None
+        '''
+
+    def release(self):
+        '''
+        Put the event on the free list once it has been dispatched. The event
+        must not be used after it is released.
+        '''
+        self.data = None
+        if len(Event.free_list) < constants.POOL_SIZE:
+            Event.free_list.append(self)
+
+    @staticmethod
+    def clear_pool():
+        '''
+        Drop the released events kept for reuse.
         '''
+        Event.free_list.clear()
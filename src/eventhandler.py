@@ -3,97 +3,122 @@ from flow import Flow
 from flowReno import FlowReno
 from host import Host
 from router import Router
-import network_map as nwm 
 import constants
-import BellmanFord
 
-def EventHandler(cur_event):
+# Maps each event type to the function that handles it
+event_handlers = {}
+
+def register_handler(event_type, handler):
+    '''
+    Register the function that handles events of event_type. The handler is
+    called with the Simulation and the event.
+    '''
+    if event_type in event_handlers:
+        raise ValueError("Handler for event type %s registered twice" 
+                            % event_type)
+    event_handlers[event_type] = handler
+
+def EventHandler(sim, cur_event):
     ''' 
     Based on the current event's event type, the event handler will perform
-    different functions. 
+    different functions in the simulation sim. 
     '''
-    if cur_event.event_type == Event.flow_start:    # Start the flow
-        print(nwm.flows)
-        print(cur_event.data[0])
-        cur_flow = nwm.flows[cur_event.data[0]]    # Convert flow ID into flow
-        cur_flow.flowStart()
-
-    elif cur_event.event_type == Event.pckt_rcv:    
-        # notify host or router of packet it has received
-        if cur_event.data[0][0] == 'H':
-            rcv_host = nwm.hosts[cur_event.data[0]] # Convert host ID to host
-            rcv_packet = cur_event.data[1]
-            rcv_host.receivePacket(rcv_packet)
-        elif cur_event.data[0][0] == 'R':
-            rcv_router = nwm.routers[cur_event.data[0]]
-            rcv_packet = cur_event.data[1]
-            rcv_router.receivePackets(rcv_packet)
-
-    elif cur_event.event_type == Event.link_free:   
-        # indicate the link is free to send more packets across it
-        lnk = nwm.links[cur_event.data[0]]
-        lnk.handle_link_free()
-
-    elif cur_event.event_type == Event.flow_send_packets:
-        # Host is assigned a list of packets to send
-        src_host = nwm.hosts[cur_event.data[0]]
-        pkts_to_send = cur_event.data[1]
-        if constants.debug: 
-            print("Event Handler - Sending packets: ")
-            print("Source Host: %s" % src_host)
-            print("Packets to Send: %s" % pkts_to_send)
-
-        src_host.sendPackets(pkts_to_send)
-
-    elif cur_event.event_type == Event.ack_rcv:
-        # Log the appropriate acknowledgment received in the correct flow
-        if constants.debug: print("ACK data: %s" % cur_event.data)
-        cur_flow = nwm.flows[cur_event.data[1]]
-        packetID = cur_event.data[0]
-        ack_time = cur_event.data[2]
-        cur_flow.getACK(packetID, ack_time)
-
-
-    elif cur_event.event_type == Event.pckt_send:
-        # Enqueues a packet onto cur_link's buffer
-        cur_link = nwm.links[cur_event.data[0]]
-        cur_pckt = cur_event.data[1]
-
-        cur_link.enqueue_packet(cur_pckt)
-
-    elif cur_event.event_type == Event.update_FAST:
-        # Fast TCP window size is updated peridically. 
-        cur_flow = nwm.flows[cur_event.data[0]]
-        cur_flow.updateW()
-
-    elif cur_event.event_type == Event.pckt_timeout:
-        # Instruct the flow of the event to handle the packet timeout
-        cur_pckt = cur_event.data[0]
-        cur_flow = nwm.flows[cur_pckt.owner_flow]
-        cur_flow.handlePacketTimeout(cur_pckt.packet_id)
-
-    elif cur_event.event_type == Event.bellman_ford: 
-        # Run Bellman Ford and enqueue the next instance of bellman ford
-        newTime = cur_event.time + constants.BELLMAN_PERIOD
-        bellman_event = Event(Event.bellman_ford, newTime, None)
-        constants.system_EQ.enqueue(bellman_event)
-        BellmanFord.runBellmanFord()
+    event_handlers[cur_event.event_type](sim, cur_event)
+
+def handle_flow_start(sim, cur_event):
+    # Start the flow
+    cur_flow = cur_event.data[0]
+    print(sim.flows)
+    print(cur_flow.ID)
+    cur_flow.flowStart()
+
+def handle_pckt_rcv(sim, cur_event):
+    # notify host or router of packet it has received
+    rcv_node = cur_event.data[0]
+    rcv_node.receivePacket(cur_event.data[1])
+
+def handle_link_free(sim, cur_event):
+    # indicate the link is free to send more packets across it
+    lnk = cur_event.data[0]
+    lnk.handle_link_free()
+
+def handle_flow_send_packets(sim, cur_event):
+    # Host is assigned a list of packets to send
+    src_host = cur_event.data[0]
+    pkts_to_send = cur_event.data[1]
+    if constants.debug: 
+        print("Event Handler - Sending packets: ")
+        print("Source Host: %s" % src_host)
+        print("Packets to Send: %s" % pkts_to_send)
+
+    src_host.sendPackets(pkts_to_send)
+
+def handle_ack_rcv(sim, cur_event):
+    # Log the appropriate acknowledgment received in the correct flow
+    if constants.debug: print("ACK data: %s" % cur_event.data)
+    cur_flow = cur_event.data[1]
+    packetID = cur_event.data[0]
+    ack_time = cur_event.data[2]
+    retransmitted = cur_event.data[3]
+    cur_flow.getACK(packetID, ack_time, retransmitted)
+
+def handle_pckt_send(sim, cur_event):
+    # Enqueues a packet onto cur_link's buffer
+    cur_link = cur_event.data[0]
+    cur_pckt = cur_event.data[1]
+
+    cur_link.enqueue_packet(cur_pckt)
+
+def handle_update_FAST(sim, cur_event):
+    # Fast TCP window size is updated peridically. 
+    cur_flow = cur_event.data[0]
+    cur_flow.updateW()
+
+def handle_pckt_timeout(sim, cur_event):
+    # Instruct the flow of the event to handle its packet timeouts
+    cur_flow = cur_event.data[0]
+    cur_flow.timer.expire()
+
+def handle_bellman_ford(sim, cur_event):
+    # Update the routes if needed and enqueue the next check
+    newTime = cur_event.time + sim.routing_updates.get_period()
+    bellman_event = Event(Event.bellman_ford, newTime, None)
+    sim.EQ.enqueue(bellman_event)
+    if sim.routing_updates.check():
         print("Bellman Ford, time = %f" %cur_event.time)
 
-    elif cur_event.event_type == Event.flow_done:
-        # count how many flows are finished. Main will run analytics when all
-        # flows are done
-        done_cnt = 0
-        for flow in nwm.flows.keys():
-            if nwm.flows[flow].done == True:
-                done_cnt += 1
-        if done_cnt == len(nwm.flows):
-            constants.all_flows_done = True
-            print("Time all flows done")
-            print(cur_event.data[0])
-
-    elif cur_event.event_type == Event.flow_rcv_data:
-        # indicate to the appropriate flow that it has received a data packet
-        cur_flow = nwm.flows[cur_event.data[0]]
-        cur_pkt = cur_event.data[1]
-        cur_flow.flowReceiveDataPacket(cur_pkt)
+def handle_flow_done(sim, cur_event):
+    # count how many flows are finished. Main will run analytics when all
+    # flows are done
+    done_cnt = 0
+    for flow in sim.flows.keys():
+        if sim.flows[flow].done == True:
+            done_cnt += 1
+    if done_cnt == len(sim.flows):
+        sim.all_flows_done = True
+        print("Time all flows done")
+        print(cur_event.data[0])
+
+def handle_fluid_update(sim, cur_event):
+    # Advance the fluid flows by one step
+    sim.fluid.step()
+
+def handle_flow_rcv_data(sim, cur_event):
+    # indicate to the appropriate flow that it has received a data packet
+    cur_flow = cur_event.data[0]
+    cur_pkt = cur_event.data[1]
+    cur_flow.flowReceiveDataPacket(cur_pkt)
+    cur_pkt.release()           # The data packet reached its destination
+
+register_handler(Event.flow_start, handle_flow_start)
+register_handler(Event.pckt_rcv, handle_pckt_rcv)
+register_handler(Event.link_free, handle_link_free)
+register_handler(Event.flow_send_packets, handle_flow_send_packets)
+register_handler(Event.ack_rcv, handle_ack_rcv)
+register_handler(Event.pckt_send, handle_pckt_send)
+register_handler(Event.update_FAST, handle_update_FAST)
+register_handler(Event.pckt_timeout, handle_pckt_timeout)
+register_handler(Event.bellman_ford, handle_bellman_ford)
+register_handler(Event.flow_done, handle_flow_done)
+register_handler(Event.flow_rcv_data, handle_flow_rcv_data)
+register_handler(Event.fluid_update, handle_fluid_update)
@@ -1,17 +1,22 @@
 from event import Event
 from packet import DataPacket
+from inflight import InFlightPackets
+from retransmit_timer import RetransmitTimer
 from event_queue import EventQueue
+import collections
 import constants
 import math
-import queue
 
 class Flow:
     """Flow Class"""
-    def __init__(self, ID, source, destination, data_amt, start):
+    def __init__(self, sim, ID, source, destination, data_amt, start):
+        self.sim = sim              # Simulation the flow is part of
         self.ID = ID                # Flow ID
 
         self.source = source        # Source host
         self.dest = destination     # Destination host
+        self.source_host = None     # Host objects of source and dest, set by
+        self.dest_host = None       #   inp_network.index_network
         self.data_amt = data_amt    # Size of data in MB
         self.start = start          # Time at which flow begins
         
@@ -19,21 +24,55 @@ class Flow:
                                     # initialize to 1 for RENO and FAST
 
         self.done = False
+        self.done_time = None       # Time at which the flow finished
 
         # Number of data packets the flow needs to send
         self.num_packets = math.ceil(data_amt * constants.MB_TO_BYTES /\
             constants.DATA_PKT_SIZE)
 
 
-        # TCP Reno and Fast TCP stuff
-        self.unackPackets = []  
-        self.packetsToSend = queue.Queue()
+        # Packets to send: the new packets from next_new up to num_packets
+        #   go first, then the lost packets in the order they were lost
+        self.next_new = 0
+        self.retransmits = collections.deque()
+
+        # Packets in the pipeline, and the order they were sent in. Packets
+        #   that timed out stay in pipeline_order until they reach the front.
+        self.unackPackets = InFlightPackets(self.num_packets)
+        self.pipeline_order = collections.deque()
         self.expectedAckID = 0
 
+        # Retransmission timer of the packets in the pipeline
+        self.timer = RetransmitTimer(self)
+
+
+
+
+    def hasPacketsToSend(self):
+        '''
+        Returns True if there are new or lost packets left to send.
+        '''
+        return self.next_new < self.num_packets or len(self.retransmits) > 0
 
+    def nextPacketToSend(self):
+        '''
+        Returns the ID of the next packet to send: new packets first, then
+        the lost packets.
+        '''
+        if self.next_new < self.num_packets:
+            self.next_new += 1
+            return self.next_new - 1
+        return self.retransmits.popleft()
 
+    def firstUnackd(self):
+        '''
+        Returns the ID of the earliest sent packet still in the pipeline.
+        '''
+        while self.pipeline_order[0] not in self.unackPackets:
+            self.pipeline_order.popleft()   # Timed out, so queued to resend
+        return self.pipeline_order[0]
 
-    def getACK(self, packetID, ackTime):
+    def getACK(self, packetID, ackTime, retransmitted):
         ''' 
         Sends a list of packets depending on the windowSize to the host. The
         function sends packets from dropped packets and new packets (gives 
@@ -47,34 +86,35 @@ class Flow:
         #if self.numRTT != 0:
         #    print("Avg RTT %f" % (self.sumRTT/self.numRTT))
 
-        self.updateRTTandLogRTD(ackTime)
+        self.updateRTTandLogRTD(ackTime, retransmitted)
 
         #if packetID == 0:
         #    print("First ack")
-        #    print(constants.system_EQ.currentTime)
+        #    print(self.sim.EQ.currentTime)
 
         # Packet wasn't dropped
-        if (len(self.unackPackets) > 0) and (packetID == self.unackPackets[0]):    
+        if (len(self.unackPackets) > 0) and (packetID == self.firstUnackd()):
+            self.pipeline_order.popleft()
             self.unackPackets.remove(packetID)  # Mark as acknowledged
 
         elif packetID in self.unackPackets:  # if we dropped some packet
-            indofpkt = self.unackPackets.index(packetID)
-
-            for i in range(indofpkt):
-                PID = self.unackPackets[i]
-                self.packetsToSend.put_nowait(PID)
-                #print("%s was lost" % PID)
-
-            for i in range(indofpkt):
-                del self.unackPackets[0]
+            # Every packet sent before it was lost
+            while self.pipeline_order[0] != packetID:
+                PID = self.pipeline_order.popleft()
+                if PID in self.unackPackets:
+                    self.unackPackets.remove(PID)
+                    self.retransmits.append(PID)
+                    #print("%s was lost" % PID)
                 
         # The flow is finished 
-        if len(self.unackPackets) == 0 and self.packetsToSend.empty(): 
+        if len(self.unackPackets) == 0 and not self.hasPacketsToSend():
+            self.timer.stop()
             self.done = True
+            self.done_time = self.sim.EQ.currentTime
             flow_done_event = Event(Event.flow_done, \
-                constants.system_EQ.currentTime, \
-                [constants.system_EQ.currentTime])
-            constants.system_EQ.enqueue(flow_done_event)
+                self.sim.EQ.currentTime, \
+                [self.sim.EQ.currentTime])
+            self.sim.EQ.enqueue(flow_done_event)
             return
 
         # We're finished with this window
@@ -87,53 +127,51 @@ class Flow:
     ''' Functions for TCP Congestion Control ''' 
 
     def flowStart(self):
-        # Initialize packetsToSend queue to contain all the packets
-        for pkt_ID in range(self.num_packets):
-            self.packetsToSend.put_nowait(pkt_ID)
-
         # Send initial packets (windowSize will likely be 1)
         self.flowSendNPackets(self.windowSize)
 
-    # Sends N packets from teh packetsToSendQueue
+    def initReceiver(self):
+        '''
+        The destination acks every packet directly, so it has no state.
+        '''
+        pass
+
+    # Sends the next N packets to send
     def flowSendNPackets(self, N):
         pkt_list = []       # list of packets to send
 
+        if len(self.unackPackets) == 0:
+            self.pipeline_order.clear()     # Only timed out packets are left
+
         for i in range(N):
-            if self.packetsToSend.empty():
+            if not self.hasPacketsToSend():
                 break
 
-            pktID = self.packetsToSend.get_nowait()     # Get Packet to send
+            # New packets go first, so once they are all sent it's a lost one
+            retransmitted = self.next_new == self.num_packets
+            pktID = self.nextPacketToSend()     # Get Packet to send
             #print("FLOW: Sending Packet with ID %s" % pktID )
             pkt = DataPacket(pktID, self.source, self.dest, self.ID, \
-                constants.system_EQ.currentTime)    # Create data packet
+                self.sim.EQ.currentTime, retransmitted)   # Create data packet
             pkt_list.append(pkt)    # Add to list of packets to send to host
 
             if (len(self.unackPackets) == 0) and (i == 0):
                 self.expectedAckID = pktID
 
-            self.unackPackets.append(pktID) # Add to list of packets in pipeline
-
-            # Calculate the time at which to timeout
-            if self.numRTT == 0:
-                timeout_time = constants.system_EQ.currentTime + self.windowSize
-            else:
-                timeout_time = constants.system_EQ.currentTime \
-                    + constants.TIMEOUT_TIME
-
-            # Create and enqueue timeout event
-            timeout_ev = Event(Event.pckt_timeout, timeout_time, [pkt])
-            constants.system_EQ.enqueue(timeout_ev)
+            self.unackPackets.add(pktID)    # Add to packets in pipeline
+            self.pipeline_order.append(pktID)
+            self.timer.packetSent(pktID)
 
 
         # Send a "flow send packets" event to send pkt_list
         event_to_send = Event(Event.flow_send_packets, \
-            constants.system_EQ.currentTime, [self.source, pkt_list])
-        constants.system_EQ.enqueue(event_to_send)
+            self.sim.EQ.currentTime, [self.source_host, pkt_list])
+        self.sim.EQ.enqueue(event_to_send)
 
         # Log that packets were sent
-        constants.system_analytics.log_flow_send_rate(self.ID, \
+        self.sim.analytics.log_flow_send_rate(self.ID, \
             len(pkt_list) * constants.DATA_PKT_SIZE, \
-            constants.system_EQ.currentTime)
+            self.sim.EQ.currentTime)
 
 
 
@@ -143,23 +181,23 @@ class Flow:
             #print("Got timeout event for packet %d" % packetID)
             # Remove packet from unacknowledged packets
             self.unackPackets.remove(packetID)          
-            self.packetsToSend.put_nowait(packetID)     # Send packet again
+            self.retransmits.append(packetID)   # Send packet again
 
             # If the packet we timed out was the next packet we were 
             # expecting (and we are still expecting more packets) 
             # then update the expected ack ID
             if packetID == self.expectedAckID and len(self.unackPackets) != 0:
-                self.expectedAckID = self.unackPackets[0]
+                self.expectedAckID = self.firstUnackd()
 
-            if (len(self.unackPackets) == 0) and \
-                (self.packetsToSend.empty() == False):
+            if (len(self.unackPackets) == 0) and self.hasPacketsToSend():
                 self.flowSendNPackets(self.windowSize)
 
+    def updateRTTandLogRTD(self, ackTime, retransmitted):
+        RTT = self.sim.EQ.currentTime - ackTime
+        self.sim.analytics.log_packet_RTD(self.ID,
+            RTT, self.sim.EQ.currentTime)
 
-    def updateRTTandLogRTD(self, ackTime):
-        RTT = constants.system_EQ.currentTime - ackTime
-        constants.system_analytics.log_packet_RTD(self.ID,
-            RTT, constants.system_EQ.currentTime)
+        self.timer.rttSample(RTT, retransmitted)    # Update the timeout
 
 
 
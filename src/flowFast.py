@@ -1,6 +1,8 @@
 from event import Event
 from packet import DataPacket
 from packet import AckPacket
+from inflight import InFlightPackets
+from retransmit_timer import RetransmitTimer
 from event_queue import EventQueue
 
 import constants
@@ -9,11 +11,14 @@ import queue
 
 class FlowFast:
     """Flow Class"""
-    def __init__(self, ID, source, destination, data_amt, start):
+    def __init__(self, sim, ID, source, destination, data_amt, start):
+        self.sim = sim              # Simulation the flow is part of
         self.ID = ID                # Flow ID
 
         self.source = source        # Source host
         self.dest = destination     # Destination host
+        self.source_host = None     # Host objects of source and dest, set by
+        self.dest_host = None       #   inp_network.index_network
         self.data_amt = data_amt    # Size of data in MB
         self.start = start          # Time at which flow begins
         
@@ -21,6 +26,7 @@ class FlowFast:
                                     # initialize to 1 for RENO and FAST
 
         self.done = False
+        self.done_time = None       # Time at which the flow finished
 
         # Number of data packets the flow needs to send
         self.num_packets = math.ceil(data_amt * constants.MB_TO_BYTES / \
@@ -35,17 +41,23 @@ class FlowFast:
         self.minRTT = 0.0
         self.numRTT = 0.0
         self.sumRTT = 0.0
-        self.gamma = 0.5
-        self.alpha = 15
+        self.gamma = constants.FAST_GAMMA
+        self.alpha = constants.FAST_ALPHA
 
         # TCP Reno and Fast TCP stuff
-        self.unackPackets = []  
+        self.unackPackets = InFlightPackets(self.num_packets)
         self.last_unackd = 0  
+        self.next_new = 0           # No packet from this ID on was sent yet
         self.dupAckCtr = 0
-        self.unreceivedpackets = []
-        self.timeouts_to_cancel = []
+        # Destination's state: every packet below next_expected has been
+        #   received, as have the packets in out_of_order
+        self.next_expected = 0
+        self.out_of_order = set()
         self.timeout_ctr = 0
 
+        # Retransmission timer of the packets in the pipeline
+        self.timer = RetransmitTimer(self)
+
         # TCP Reno Stuff Only 
         # Slow start threshold (max buffer size converted to data packets)
         self.sst = 1000000
@@ -56,28 +68,24 @@ class FlowFast:
         created and enqueued for the packet. 
         '''
 
-        if data_packet.packet_id in self.unreceivedpackets:
-            self.unreceivedpackets.remove(data_packet.packet_id)
-
-        if len(self.unreceivedpackets) > 0:
-            # Update expected ACK ID
-            next_expected_packet = self.unreceivedpackets[0]  
-        else:
-            next_expected_packet = self.num_packets
+        # Update expected ACK ID
+        self.receivePacketID(data_packet.packet_id)
+        next_expected_packet = self.next_expected
 
         # Create and send an acknowledgement packet
         #print("Sending ACK packet ID %d for data packet ID %d" %(next_expected_packet, data_packet.packet_id))
         ackpckt = AckPacket(next_expected_packet, self.dest, \
-            self.source, self.ID, data_packet.timestamp)
+            self.source, self.ID, data_packet.timestamp, \
+            data_packet.retransmitted)
         self.sendPacket(ackpckt)
 
-    def getACK(self, packetID, pktMadeTime):
+    def getACK(self, packetID, pktMadeTime, retransmitted):
         '''
         When an acknowledgment is received, the ID is checked against the
         counter of acknowledgments to check for dropped packets. 
         '''
 
-        self.updateRTTandLogRTD(pktMadeTime)
+        self.updateRTTandLogRTD(pktMadeTime, retransmitted)
         #print("Flow received an acknowledgement with ID %d" %packetID)
         #print("Last Unack'd: %d" %self.last_unackd)
 
@@ -88,13 +96,15 @@ class FlowFast:
 
             if self.last_unackd == self.num_packets:
                 self.unackPackets.clear()
+                self.timer.stop()
                 self.done = True
-                print("Flow %s is done at time %s" % (self.ID, constants.system_EQ.currentTime))
+                self.done_time = self.sim.EQ.currentTime
+                print("Flow %s is done at time %s" % (self.ID, self.sim.EQ.currentTime))
                 
                 flow_done_event = Event(Event.flow_done, \
-                    constants.system_EQ.currentTime, \
-                    [constants.system_EQ.currentTime])
-                constants.system_EQ.enqueue(flow_done_event)
+                    self.sim.EQ.currentTime, \
+                    [self.sim.EQ.currentTime])
+                self.sim.EQ.enqueue(flow_done_event)
                 return
 
             lengthPktsToSend = math.ceil(self.windowSize)\
@@ -105,21 +115,39 @@ class FlowFast:
     ''' Functions for TCP Congestion Control ''' 
     def flowStart(self):
         '''
-        Initializes the beginning of a flow by setting the list of unreceived 
-        packets contain all the packets in order. Initial packets are then sent.
+        Initializes the beginning of a flow by setting up the destination's 
+        state. Initial packets are then sent.
         '''
-
-        for pkt_ID in range(self.num_packets):
-            self.unreceivedpackets.append(pkt_ID)
+        self.initReceiver()
 
         # Send initial packets
         self.flowSendNPackets(math.ceil(self.windowSize))
         
-        FAST_event = Event(Event.update_FAST, constants.system_EQ.currentTime\
-             + constants.FAST_PERIOD, [self.ID])
-        constants.system_EQ.enqueue(FAST_event)
+        FAST_event = Event(Event.update_FAST, self.sim.EQ.currentTime\
+             + constants.FAST_PERIOD, [self])
+        self.sim.EQ.enqueue(FAST_event)
 
 
+    def initReceiver(self):
+        '''
+        Set up the destination's state: no packets have been received yet.
+        '''
+        self.next_expected = 0
+        self.out_of_order.clear()
+
+    def receivePacketID(self, packetID):
+        '''
+        Record that the destination got the data packet packetID. The next
+        expected packet moves past every packet received in order.
+        '''
+        if packetID == self.next_expected:
+            self.next_expected += 1
+            while self.next_expected in self.out_of_order:
+                self.out_of_order.remove(self.next_expected)
+                self.next_expected += 1
+        elif packetID > self.next_expected:
+            self.out_of_order.add(packetID)
+
     def flowSendNPackets(self, N):
         '''
         Sends N packets from the packetsToSendQueue.
@@ -133,35 +161,35 @@ class FlowFast:
                 break
 
             if PID not in self.unackPackets:    # Only send new packets
-                pkt = DataPacket(PID, self.source, self.dest, self.ID, \
-                    constants.system_EQ.currentTime)    # Create data packet
+                pkt = self.makeDataPacket(PID)    # Create data packet
                 self.sendPacket(pkt)
                 num_packets_sent += 1
 
         # Log that packets were sent
-        constants.system_analytics.log_flow_send_rate(self.ID, \
+        self.sim.analytics.log_flow_send_rate(self.ID, \
             num_packets_sent * constants.DATA_PKT_SIZE, \
-            constants.system_EQ.currentTime)
+            self.sim.EQ.currentTime)
 
 
     def handlePacketTimeout(self, packetID):
         '''
         This will be called by event handler in the case of a packet timeout.
+        As in Reno, the window goes back to 1 and the pipeline is sent again
+        from the oldest unacknowledged packet, so the packets that time out
+        together are not all sent again in one burst.
         '''
         # If packet is unacknowledged
-        if packetID in self.unackPackets and \
-            packetID not in self.timeouts_to_cancel:    
+        if packetID in self.unackPackets:
             #print("Got timeout event for packet %d" % packetID)
             self.timeout_ctr += 1
-            # Remove packet from unacknowledged packets
-            self.unackPackets.remove(packetID)         
 
-            pkt = DataPacket(packetID, self.source, self.dest, self.ID, \
-                    constants.system_EQ.currentTime)
-            self.sendPacket(pkt)
+            self.unackPackets.clear()
+            self.timer.stop()
+            self.windowSize = 1.0
+
+            self.flowSendNPackets(math.ceil(self.windowSize))
 
-        if packetID in self.timeouts_to_cancel:
-            self.timeouts_to_cancel.remove(packetID)
+            self.logWindowSize()
 
 
     def updateW(self):
@@ -182,19 +210,19 @@ class FlowFast:
         # Enqueue an event to update Fast TCP W after certain time
         if self.done == False:
             FAST_event = Event(Event.update_FAST,
-                                constants.system_EQ.currentTime \
-                                    + constants.FAST_PERIOD, [self.ID])
-            constants.system_EQ.enqueue(FAST_event)
+                                self.sim.EQ.currentTime \
+                                    + constants.FAST_PERIOD, [self])
+            self.sim.EQ.enqueue(FAST_event)
 
 
-    def updateRTTandLogRTD(self, pktMadeTime):
+    def updateRTTandLogRTD(self, pktMadeTime, retransmitted):
         '''
         The round trip time and round trip delay is calculated based on packet
         attributes.
         '''
-        RTT = constants.system_EQ.currentTime - pktMadeTime
-        constants.system_analytics.log_packet_RTD(self.ID,
-            RTT, constants.system_EQ.currentTime)
+        RTT = self.sim.EQ.currentTime - pktMadeTime
+        self.sim.analytics.log_packet_RTD(self.ID,
+            RTT, self.sim.EQ.currentTime)
 
         if self.minRTT == 0:        # Save minimum RTT time
             self.minRTT = RTT
@@ -204,49 +232,50 @@ class FlowFast:
         self.sumRTT += RTT
         self.numRTT += 1.0
 
+        self.timer.rttSample(RTT, retransmitted)    # Update the timeout
+
+    def makeDataPacket(self, packetID):
+        '''
+        Create the data packet packetID, marked as a retransmission if it
+        was sent before.
+        '''
+        return DataPacket(packetID, self.source, self.dest, self.ID, \
+            self.sim.EQ.currentTime, packetID < self.next_new)
+
     def sendPacket(self, pkt):
         '''
         The flow enqueues a packet 
         '''
         if type(pkt) is DataPacket:
             #print("Sending DATA packet ID %d" %pkt.packet_id)
-            self.unackPackets.append(pkt.packet_id)
-
-            # Calculate the time at which to timeout
-            timeout_time = constants.system_EQ.currentTime \
-                        + constants.TIMEOUT_TIME
-
-            # Create and enqueue timeout event
-            timeout_ev = Event(Event.pckt_timeout, timeout_time, [pkt])
-            constants.system_EQ.enqueue(timeout_ev)
+            self.unackPackets.add(pkt.packet_id)
+            self.next_new = max(self.next_new, pkt.packet_id + 1)
+            self.timer.packetSent(pkt.packet_id)
             event_to_send = Event(Event.flow_send_packets, \
-                    constants.system_EQ.currentTime, [self.source, [pkt]])
+                    self.sim.EQ.currentTime, [self.source_host, [pkt]])
 
         else:
             event_to_send = Event(Event.flow_send_packets, \
-                        constants.system_EQ.currentTime, [self.dest, [pkt]])
+                        self.sim.EQ.currentTime, [self.dest_host, [pkt]])
             #print("Sending ACK packet ID %d" %pkt.packet_id)
 
-        constants.system_EQ.enqueue(event_to_send)
+        self.sim.EQ.enqueue(event_to_send)
     
     def removeAckdPackets(self):
         ''' 
-        Iterates through the list of unacknowledged packets. If the packet
-        ID is already acknowledged and thus a smaller value than the last 
-        unacknowledged packet ID, it will be removed from the list. 
+        Every packet with an ID smaller than the last unacknowledged packet 
+        ID is already acknowledged, so it is removed from the unacknowledged
+        packets. Returns minus the number of packets removed.
         '''
-        cur_length = len(self.unackPackets)
-        for PID in self.unackPackets:
-            if PID < self.last_unackd:
-                self.unackPackets.remove(PID)
-        return (len(self.unackPackets)-cur_length)
+        ackd = self.unackPackets.remove_below(self.last_unackd)
+        return -len(ackd)
 
     def logWindowSize(self):
         ''' 
         Calls analytics to record the current window size of the flow. 
         '''
-        constants.system_analytics.log_window_size(self.ID, \
-            constants.system_EQ.currentTime, self.windowSize)
+        self.sim.analytics.log_window_size(self.ID, \
+            self.sim.EQ.currentTime, self.windowSize)
 
 
 
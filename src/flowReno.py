@@ -1,6 +1,8 @@
 from event import Event
 from packet import DataPacket
 from packet import AckPacket
+from inflight import InFlightPackets
+from retransmit_timer import RetransmitTimer
 from event_queue import EventQueue
 import constants
 import math
@@ -9,11 +11,14 @@ import queue
 
 class FlowReno():
     """Flow Class"""
-    def __init__(self, ID, source, destination, data_amt, start):
+    def __init__(self, sim, ID, source, destination, data_amt, start):
+        self.sim = sim              # Simulation the flow is part of
         self.ID = ID                # Flow ID
 
         self.source = source        # Source host
         self.dest = destination     # Destination host
+        self.source_host = None     # Host objects of source and dest, set by
+        self.dest_host = None       #   inp_network.index_network
         self.data_amt = data_amt    # Size of data in MB
         self.start = start          # Time at which flow begins
         
@@ -21,6 +26,7 @@ class FlowReno():
                                     # initialize to 1 for RENO and FAST
 
         self.done = False
+        self.done_time = None       # Time at which the flow finished
 
         # Number of data packets the flow needs to send
         self.num_packets = math.ceil(data_amt * constants.MB_TO_BYTES / \
@@ -34,49 +40,73 @@ class FlowReno():
         self.minRTT = 0.0
         self.numRTT = 0.0
         self.sumRTT = 0.0
-        self.gamma = 0.5
-        self.alpha = 15
+        self.gamma = constants.FAST_GAMMA
+        self.alpha = constants.FAST_ALPHA
 
         # TCP Reno and Fast TCP stuff
-        self.unackPackets = [] 
+        self.unackPackets = InFlightPackets(self.num_packets)
         self.last_unackd = 0  
+        self.next_new = 0           # No packet from this ID on was sent yet
         self.dupAckCtr = 0
 
+        # Retransmission timer of the packets in the pipeline
+        self.timer = RetransmitTimer(self)
+
         # TCP Reno Stuff Only 
         # Slow start threshold (max buffer size converted to data packets)
         self.sst = 1000000
 
-        # Holds packets the source has not yet received
-        self.unreceivedpackets = []
+        # Destination's state: every packet below next_expected has been
+        #   received, as have the packets in out_of_order
+        self.next_expected = 0
+        self.out_of_order = set()
 
         self.fast_recovery = False
         self.fast_recovery_pkts = -1    # Max packet received in fast recovery
-        self.timeouts_to_cancel = []
         self.last_timeout_time = -100000.0
+        # Highest packet sent when a timeout last lowered the slow start
+        #   threshold. Timeouts before the ACKs pass it are the same loss.
+        self.timeout_recover = -1
         self.timeout_ctr = 0
 
     def flowStart(self):
         ''' 
-        Initialize unreceived packets to contain all the packets in order 
+        Initialize the destination's state and send the first packets
         '''
-        for pkt_ID in range(self.num_packets):
-            self.unreceivedpackets.append(pkt_ID)
+        self.initReceiver()
 
         # Send initial packets
         self.flowSendNPackets(math.ceil(self.windowSize))
 
+    def initReceiver(self):
+        '''
+        Set up the destination's state: no packets have been received yet.
+        '''
+        self.next_expected = 0
+        self.out_of_order.clear()
+
+    def receivePacketID(self, packetID):
+        '''
+        Record that the destination got the data packet packetID. The next
+        expected packet moves past every packet received in order.
+        '''
+        if packetID == self.next_expected:
+            self.next_expected += 1
+            while self.next_expected in self.out_of_order:
+                self.out_of_order.remove(self.next_expected)
+                self.next_expected += 1
+        elif packetID > self.next_expected:
+            self.out_of_order.add(packetID)
+
     def flowReceiveDataPacket(self, data_packet):
-        if data_packet.packet_id in self.unreceivedpackets:
-            self.unreceivedpackets.remove(data_packet.packet_id)
         # Update expected ACK ID
-        if len(self.unreceivedpackets) > 0:
-            next_expected_packet = self.unreceivedpackets[0]  
-        else:
-            next_expected_packet = self.num_packets
+        self.receivePacketID(data_packet.packet_id)
+        next_expected_packet = self.next_expected
 
         # Create and send an acknowledgement packet
         ackpckt = AckPacket(next_expected_packet, self.dest, self.source, \
-            self.ID, data_packet.timestamp)
+            self.ID, data_packet.timestamp, \
+            data_packet.retransmitted)
         self.sendPacket(ackpckt)
 
 
@@ -91,15 +121,14 @@ class FlowReno():
                 break
 
             if PID not in self.unackPackets:    # Only send new packets
-                pkt = DataPacket(PID, self.source, self.dest, self.ID,\
-                    constants.system_EQ.currentTime)    # Create data packet
+                pkt = self.makeDataPacket(PID)    # Create data packet
                 self.sendPacket(pkt)
                 num_packets_sent += 1
 
         # Log that packets were sent
-        constants.system_analytics.log_flow_send_rate(self.ID, \
+        self.sim.analytics.log_flow_send_rate(self.ID, \
             num_packets_sent * constants.DATA_PKT_SIZE, \
-            constants.system_EQ.currentTime)
+            self.sim.EQ.currentTime)
 
 
     def handlePacketTimeout(self, packetID):
@@ -107,18 +136,22 @@ class FlowReno():
         This will be called by event handler in the case of a packet timeout
         '''
         # If packet is unacknowledged
-        if packetID in self.unackPackets and\
-             packetID not in self.timeouts_to_cancel:
+        if packetID in self.unackPackets:
 
             if self.numRTT == 0:
                 rtt = 0
             else:
                 rtt = float(self.sumRTT)/self.numRTT
 
-            if constants.system_EQ.currentTime > self.last_timeout_time + rtt:
-                self.sst = max(float(self.windowSize)/2.0, 1.0)
+            if self.sim.EQ.currentTime > self.last_timeout_time + rtt:
+                # The slow start threshold is only lowered once per loss
+                #   (RFC 5681): a timeout of any packet that was already in
+                #   flight then means the network hasn't drained yet
+                if self.last_unackd > self.timeout_recover:
+                    self.sst = max(float(self.windowSize)/2.0, 1.0)
+                    self.timeout_recover = self.next_new - 1
                 self.windowSize = 1.0
-                self.last_timeout_time = constants.system_EQ.currentTime
+                self.last_timeout_time = self.sim.EQ.currentTime
             #print("Got timeout event for packet %d" % packetID)
             self.timeout_ctr += 1
             # Remove packet from unacknowledged packets
@@ -128,6 +161,7 @@ class FlowReno():
             self.dupAckCtr = 0
 
             self.unackPackets.clear()
+            self.timer.stop()
             self.fast_recovery = False
             self.fast_recovery_pkts = -1
 
@@ -135,9 +169,6 @@ class FlowReno():
   
             self.logWindowSize()
 
-        if packetID in self.timeouts_to_cancel:
-            self.timeouts_to_cancel.remove(packetID)
-
 
     def updateW(self):
         ''' 
@@ -157,13 +188,13 @@ class FlowReno():
 
         self.logWindowSize()
 
-    def getACK(self, packetID, ackTime):
+    def getACK(self, packetID, ackTime, retransmitted):
         '''
         When an acknowledgment packet is received, the ID is compared to the
         last acknowledged packet to check for dropped packets. Appropriate
         actions are made based on the phase the simulation is in. 
         '''
-        self.updateRTTandLogRTD(ackTime)
+        self.updateRTTandLogRTD(ackTime, retransmitted)
         #print("Flow received an acknowledgement with ID %d" %packetID)
         #print("Last Unack'd: %d" %self.last_unackd)
 
@@ -173,22 +204,22 @@ class FlowReno():
 
             if self.last_unackd == self.num_packets:
                 self.unackPackets.clear()
+                self.timer.stop()
                 self.done = True
-                print("Flow %s is done at time %s" % (self.ID, constants.system_EQ.currentTime))
+                self.done_time = self.sim.EQ.currentTime
+                print("Flow %s is done at time %s" % (self.ID, self.sim.EQ.currentTime))
                 #print("Number of timeouts %d" %self.timeout_ctr)
                 flow_done_event = Event(Event.flow_done, \
-                    constants.system_EQ.currentTime, \
-                    [constants.system_EQ.currentTime])
-                constants.system_EQ.enqueue(flow_done_event)
+                    self.sim.EQ.currentTime, \
+                    [self.sim.EQ.currentTime])
+                self.sim.EQ.enqueue(flow_done_event)
                 return
 
             # If we're in the fast recovery phase and we received a 
             # packet request for a packet in this window, then send it
             if self.fast_recovery and \
                 self.last_unackd <= self.fast_recovery_pkts:
-                pkt = DataPacket(self.last_unackd, self.source, self.dest, \
-                    self.ID, constants.system_EQ.currentTime)
-                self.timeouts_to_cancel.append(self.last_unackd)
+                pkt = self.makeDataPacket(self.last_unackd)
                 self.sendPacket(pkt)
 
                 num_removed = self.removeAckdPackets()
@@ -214,33 +245,33 @@ class FlowReno():
                 self.windowSize = math.ceil(self.sst)
                 self.logWindowSize()
                 self.fast_recovery = True
-                self.fast_recovery_pkts = max(self.unackPackets)
+                self.fast_recovery_pkts = self.unackPackets.max()
 
-                pkt = DataPacket(self.last_unackd, self.source, self.dest, \
-                    self.ID, constants.system_EQ.currentTime)
-                self.timeouts_to_cancel.append(packetID)
+                pkt = self.makeDataPacket(self.last_unackd)
                 self.sendPacket(pkt)
 
         if self.last_unackd == self.num_packets: # We're done with this flow
             self.unackPackets.clear()
+            self.timer.stop()
             self.done = True
+            self.done_time = self.sim.EQ.currentTime
             #print("Flow %s is done at time %s" % (self.ID, 
-            # constants.system_EQ.currentTime))
+            # self.sim.EQ.currentTime))
             flow_done_event = Event(Event.flow_done, \
-                constants.system_EQ.currentTime, \
-                [constants.system_EQ.currentTime])
-            constants.system_EQ.enqueue(flow_done_event)
+                self.sim.EQ.currentTime, \
+                [self.sim.EQ.currentTime])
+            self.sim.EQ.enqueue(flow_done_event)
             return
 
 
-    def updateRTTandLogRTD(self, ackTime):
+    def updateRTTandLogRTD(self, ackTime, retransmitted):
         '''
         Round Trip Time and Round Trip Delay are updated and logged in 
         analytics. 
         '''
-        RTT = constants.system_EQ.currentTime - ackTime
-        constants.system_analytics.log_packet_RTD(self.ID,
-            RTT, constants.system_EQ.currentTime)
+        RTT = self.sim.EQ.currentTime - ackTime
+        self.sim.analytics.log_packet_RTD(self.ID,
+            RTT, self.sim.EQ.currentTime)
 
         if self.minRTT == 0:        # Save minimum RTT time
             self.minRTT = RTT
@@ -250,6 +281,16 @@ class FlowReno():
         self.sumRTT += RTT
         self.numRTT += 1.0
 
+        self.timer.rttSample(RTT, retransmitted)    # Update the timeout
+
+
+    def makeDataPacket(self, packetID):
+        '''
+        Create the data packet packetID, marked as a retransmission if it
+        was sent before.
+        '''
+        return DataPacket(packetID, self.source, self.dest, self.ID, \
+            self.sim.EQ.currentTime, packetID < self.next_new)
 
     def sendPacket(self, pkt):
         '''
@@ -260,44 +301,35 @@ class FlowReno():
         '''
         if type(pkt) is DataPacket:
             #print("Sending DATA packet ID %d" %pkt.packet_id)
-            self.unackPackets.append(pkt.packet_id)
-
-            # Calculate the time at which to timeout
-            timeout_time = constants.system_EQ.currentTime \
-                + constants.TIMEOUT_TIME
-
-            # Create and enqueue timeout event
-            timeout_ev = Event(Event.pckt_timeout, timeout_time, [pkt])
-            constants.system_EQ.enqueue(timeout_ev)
+            self.unackPackets.add(pkt.packet_id)
+            self.next_new = max(self.next_new, pkt.packet_id + 1)
+            self.timer.packetSent(pkt.packet_id)
             event_to_send = Event(Event.flow_send_packets, \
-                constants.system_EQ.currentTime, [self.source, [pkt]])
+                self.sim.EQ.currentTime, [self.source_host, [pkt]])
 
         else:
             event_to_send = Event(Event.flow_send_packets, \
-                constants.system_EQ.currentTime, [self.dest, [pkt]])
+                self.sim.EQ.currentTime, [self.dest_host, [pkt]])
             #print("Sending ACK packet ID %d" %pkt.packet_id)
 
         
-        constants.system_EQ.enqueue(event_to_send)
+        self.sim.EQ.enqueue(event_to_send)
 
     def logWindowSize(self):
         '''
         The window size is logged in system analytics at a specified current 
         time. 
         '''
-        constants.system_analytics.log_window_size(self.ID, \
-            constants.system_EQ.currentTime, self.windowSize)
+        self.sim.analytics.log_window_size(self.ID, \
+            self.sim.EQ.currentTime, self.windowSize)
 
     def removeAckdPackets(self):
         '''
-        The packet is removed from the list of unacknowledged packets.
+        The acknowledged packets are removed from the unacknowledged packets.
+        Returns minus the number of packets removed.
         '''
-        cur_length = len(self.unackPackets)
-        for PID in self.unackPackets:
-            if PID < self.last_unackd:
-                self.unackPackets.remove(PID)
-
-        return (len(self.unackPackets)-cur_length)
+        ackd = self.unackPackets.remove_below(self.last_unackd)
+        return -len(ackd)
 
     def getWindowSize(self):
         '''
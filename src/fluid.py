@@ -0,0 +1,361 @@
+# fluid.py
+# Hybrid fluid/packet simulation. The flows listed in constants.FLUID_FLOWS
+# are not simulated packet by packet. Instead, every FLUID_STEP ms the fluid
+# model advances their windows with fluid (ODE) approximations of TCP Reno
+# and FAST TCP, and pushes their rates through the links on their paths,
+# where they take up capacity and buffer space:
+#   - the fluid is served with the capacity the packets leave, and an
+#     overloaded link serves fluid and packets in proportion to their
+#     arrival rates, like a FIFO queue
+#   - the fluid backlog counts towards the link's buffer occupancy, so
+#     packets are dropped once it fills the buffer, and it delays the packets
+#     queued behind it (Link.fluid_delay)
+#   - fluid that doesn't fit in the buffer is lost, which is the loss rate
+#     the fluid flows react to
+#   - each link passes on the fraction of its fluid it got through over the
+#     last step, so the links downstream of a bottleneck see the thinned rate
+# The packet level (foreground) flows therefore see the queueing delay and
+# loss caused by the fluid (background) flows, for one event per step
+# instead of several events per packet.
+#
+# Limitations: the thinning lags a step behind the upstream links, a fluid
+# flow's ACKs are not simulated (only the delays of the reverse path count
+# towards its RTT) and pdes.py doesn't support fluid flows. A single fluid
+# flow finishes within about 25% of the same flow run as packets
+# (tests/test_fluid.py), which lose time to timeouts the fluid doesn't model.
+
+import constants
+from event import Event
+from router import Router
+
+def get_byte_rate(rate):
+    '''
+    Convert a link rate in megabits per second to bytes per ms.
+    '''
+    return rate / constants.BYTES_TO_MBITS / constants.SEC_TO_MS
+
+class FluidFlow:
+    '''
+    A flow simulated as a fluid rate instead of as packets. cc is the
+    congestion control whose window dynamics it follows, 'R' (TCP Reno) or
+    'F' (FAST TCP).
+    '''
+    def __init__(self, sim, ID, source, destination, data_amt, start, cc):
+        if cc not in ('R', 'F'):
+            raise ValueError("Unknown congestion control for fluid flow "
+                                "%s: %s" % (ID, cc))
+
+        self.sim = sim              # Simulation the flow is part of
+        self.ID = ID                # Flow ID
+        self.cc = cc                # Congestion control, 'R' or 'F'
+
+        self.source = source        # Source host
+        self.dest = destination     # Destination host
+        self.source_host = None     # Host objects of source and dest, set by
+        self.dest_host = None       #   inp_network.index_network
+        self.data_amt = data_amt    # Size of data in MB
+        self.start = start          # Time at which flow begins
+
+        self.windowSize = 1.0       # Window size in data packets
+        self.slow_start = True      # TCP Reno slow start phase
+        self.gamma = constants.FAST_GAMMA
+        self.alpha = constants.FAST_ALPHA
+
+        self.started = False
+        self.next_FAST = None       # Time of the next FAST TCP update
+        self.done = False
+        self.done_time = None       # Time at which the flow finished
+
+        self.num_bytes = data_amt * constants.MB_TO_BYTES
+        self.bytes_delivered = 0.0  # Bytes that have reached the destination
+        self.rate = 0.0             # Sending rate in bytes per ms
+
+        self.path = None            # Links from source to dest
+        self.ack_path = None        # Links from dest back to source
+        self.RTT = None             # RTT of the last step
+
+        self.minRTT = 0.0
+        self.numRTT = 0.0
+        self.sumRTT = 0.0
+
+    def flowStart(self):
+        '''
+        The flow's fluid starts with the next step of the fluid model.
+        '''
+        self.started = True
+        self.next_FAST = self.sim.EQ.currentTime + constants.FAST_PERIOD
+        self.logWindowSize()
+
+    def get_base_RTT(self):
+        '''
+        RTT of the flow's paths with every buffer empty.
+        '''
+        base_RTT = 0.0
+        for link in self.path:
+            base_RTT += link.delay + constants.SEC_TO_MS * \
+                constants.DATA_PKT_SIZE * constants.BYTES_TO_MBITS / link.rate
+        for link in self.ack_path:
+            base_RTT += link.delay + constants.SEC_TO_MS * \
+                constants.ACK_PKT_SIZE * constants.BYTES_TO_MBITS / link.rate
+        return base_RTT
+
+    def get_RTT(self):
+        '''
+        RTT of the flow's paths including the current queueing delays of the
+        links (both the fluid backlog and the buffered packets).
+        '''
+        RTT = self.get_base_RTT()
+        for link in self.path + self.ack_path:
+            RTT += (link.fluid_bytes + link.buffer.bytes_used) / \
+                    get_byte_rate(link.rate)
+        return RTT
+
+    def send(self):
+        '''
+        Set the sending rate for the next step from the window and RTT.
+        '''
+        if self.RTT is None:
+            self.RTT = self.get_base_RTT()
+        self.rate = self.windowSize * constants.DATA_PKT_SIZE / self.RTT
+
+    def update(self, step):
+        '''
+        Account for the fluid delivered over the last step (step ms long) and
+        update the window from the RTT and loss rate the flow saw.
+        '''
+        now = self.sim.EQ.currentTime
+
+        # Fraction of the fluid that got through every link of the path,
+        #   and the loss rate along the path
+        delivered = 1.0
+        not_lost = 1.0
+        for link in self.path:
+            delivered *= link.fluid_pass
+            not_lost *= 1.0 - link.fluid_loss
+        loss = 1.0 - not_lost
+
+        step_bytes = self.rate * delivered * step
+        self.bytes_delivered += step_bytes
+        self.sim.analytics.log_flow_send_rate(self.ID, self.rate * step, now)
+
+        self.RTT = self.get_RTT()
+        self.logRTT(self.RTT, step_bytes / constants.DATA_PKT_SIZE)
+
+        if self.cc == 'R':
+            self.updateWReno(step, loss)
+        else:
+            self.updateWFast(now)
+        self.logWindowSize()
+
+        if self.bytes_delivered >= self.num_bytes:
+            # The last byte was sent partway through the step (at its start
+            #   if nothing was left to send), and like a packet flow the
+            #   flow is done when its ACK gets back, an RTT later
+            overshoot = 1.0
+            if step_bytes > 0:
+                overshoot = (self.bytes_delivered - self.num_bytes) / step_bytes
+            self.flowDone(now + step * (1.0 - overshoot) + self.RTT)
+
+    def updateWReno(self, step, loss):
+        '''
+        TCP Reno fluid model: the window doubles every RTT in slow start.
+        Afterwards it grows by one packet per RTT and is halved at the rate
+        that packets are lost, i.e. dW/dt = 1/RTT - W * W * loss / (2 * RTT).
+        '''
+        if self.slow_start:
+            if loss > 0:
+                self.slow_start = False
+                self.windowSize = max(self.windowSize / 2.0, 1.0)
+            else:
+                self.windowSize *= 2.0 ** (step / self.RTT)
+            return
+
+        dW = (1.0 - self.windowSize * self.windowSize * loss / 2.0) * \
+                step / self.RTT
+        self.windowSize = max(self.windowSize + dW, self.windowSize / 2.0, 1.0)
+
+    def updateWFast(self, now):
+        '''
+        FAST TCP fluid model: every FAST_PERIOD the window is set to
+        (1 - gamma) * W + gamma * (minRTT / avgRTT * W + alpha), at most
+        doubling, as in FlowFast.updateW. Like FlowFast, avgRTT is the
+        average RTT of every packet acknowledged so far.
+        '''
+        while self.next_FAST <= now:
+            self.next_FAST += constants.FAST_PERIOD
+            if self.numRTT == 0:
+                self.windowSize = 1.0
+                continue
+            avgRTT = self.sumRTT / self.numRTT
+            eqW = (1 - self.gamma) * self.windowSize + self.gamma * \
+                    (self.minRTT / avgRTT * self.windowSize + self.alpha)
+            self.windowSize = min(2 * self.windowSize, eqW)
+
+    def flowDone(self, done_time):
+        self.done = True
+        self.done_time = done_time
+        self.rate = 0.0
+        print("Flow %s is done at time %s" % (self.ID, done_time))
+
+        flow_done_event = Event(Event.flow_done, done_time, [done_time])
+        self.sim.EQ.enqueue(flow_done_event)
+
+    def logRTT(self, RTT, num_pkts):
+        '''
+        Log the RTT of the num_pkts packets acknowledged over the last step.
+        '''
+        self.sim.analytics.log_packet_RTD(self.ID, RTT,
+                                            self.sim.EQ.currentTime)
+        if num_pkts <= 0:
+            return
+        if self.minRTT == 0 or RTT < self.minRTT:
+            self.minRTT = RTT
+        self.sumRTT += RTT * num_pkts
+        self.numRTT += num_pkts
+
+    def logWindowSize(self):
+        self.sim.analytics.log_window_size(self.ID,
+            self.sim.EQ.currentTime, self.windowSize)
+
+class FluidModel:
+    '''
+    Advances the fluid flows of a simulation and the fluid in its links.
+    '''
+    def __init__(self, sim, flows):
+        self.sim = sim
+        self.flows = flows          # FluidFlows of the simulation
+        self.links = set()          # Links with fluid arriving or queued
+
+    def start(self):
+        '''
+        Enqueue the first step of the fluid model, when the first fluid flow
+        starts.
+        '''
+        self.enqueue_step(min(flow.start for flow in self.flows))
+
+    def enqueue_step(self, time):
+        '''
+        Enqueue the next step of the fluid model for time (or now, if that
+        has passed).
+        '''
+        time = max(time, self.sim.EQ.currentTime)
+        fluid_event = Event(Event.fluid_update, time, None)
+        self.sim.EQ.enqueue(fluid_event)
+
+    def is_idle(self, link):
+        '''
+        Returns True if no fluid arrives at link and its backlog has drained.
+        Rates and backlogs below FLUID_EPSILON are float residue.
+        '''
+        return link.fluid_rate < constants.FLUID_EPSILON and \
+            link.fluid_bytes < constants.FLUID_EPSILON
+
+    def get_path(self, host, dest):
+        '''
+        Returns the links from host to the host with ID dest according to
+        the routers' current routing tables, or None if there is no route
+        yet.
+        '''
+        link = host.link
+        path = [link]
+        while isinstance(link.dest_node, Router):
+            link_index = link.dest_node.routingTable[dest][0]
+            if link_index is None or len(path) > len(self.sim.link_list):
+                return None
+            link = self.sim.link_list[link_index]
+            path.append(link)
+        return path
+
+    def step(self):
+        '''
+        Advance the fluid by one step: route the fluid flows, serve the fluid
+        at every link and update the flows' windows. Enqueues the next step
+        until the fluid flows are done and the links have drained, skipping
+        ahead to the next flow's start while there is no fluid.
+        '''
+        step = constants.FLUID_STEP
+        now = self.sim.EQ.currentTime
+
+        for link in self.links:
+            link.fluid_rate = 0.0
+
+        active = []
+        for flow in self.flows:
+            if not flow.started or flow.done:
+                continue
+            flow.path = self.get_path(flow.source_host, flow.dest)
+            flow.ack_path = self.get_path(flow.dest_host, flow.source)
+            if flow.path is None or flow.ack_path is None:
+                continue            # Wait for the routing tables
+
+            # Each link passes on the fraction of the fluid it got through
+            #   over the last step
+            flow.send()
+            rate = flow.rate
+            for link in flow.path:
+                link.fluid_rate += rate
+                rate *= link.fluid_pass
+                link.carries_fluid = True
+                self.links.add(link)
+            active.append(flow)
+
+        for link in list(self.links):
+            self.serve_link(link, step)
+            if self.is_idle(link):
+                self.drain_link(link)
+                self.links.discard(link)
+
+        for flow in active:
+            flow.update(step)
+
+        waiting = [flow for flow in self.flows if not flow.done]
+        if self.links or any(flow.started for flow in waiting):
+            self.enqueue_step(now + step)
+        elif waiting:
+            self.enqueue_step(min(flow.start for flow in waiting))
+
+    def serve_link(self, link, step):
+        '''
+        Serve the fluid arriving at link over a step of step ms, given the
+        packets that arrived over the last step, and update the link's fluid
+        backlog, loss rate and queueing delay.
+        '''
+        capacity = get_byte_rate(link.rate)
+        fluid_in = link.fluid_rate
+        pkts_in = link.arrived_bytes / step
+        link.arrived_bytes = 0.0
+
+        # An overloaded FIFO queue serves every kind of traffic in proportion
+        #   to its arrival rate
+        if fluid_in + pkts_in > capacity:
+            share = capacity * fluid_in / (fluid_in + pkts_in)
+        else:
+            share = capacity - pkts_in
+        service = min(fluid_in + link.fluid_bytes / step, share)
+
+        # Fluid that doesn't fit in the buffer next to the packets is lost
+        backlog = max(link.fluid_bytes + (fluid_in - service) * step, 0.0)
+        room = max(link.buffer_capacity - link.get_buffer_occupancy() + \
+                    link.fluid_bytes, 0.0)
+        lost = max(backlog - room, 0.0)
+        backlog -= lost
+
+        link.fluid_service = service
+        link.fluid_pass = min(service / fluid_in, 1.0) if fluid_in > 0 else 1.0
+        link.fluid_loss = lost / (fluid_in * step) if fluid_in > 0 else 0.0
+        link.set_fluid_backlog(backlog)
+        link.fluid_delay = backlog / capacity
+
+    def drain_link(self, link):
+        '''
+        Clear what is left of the fluid at an idle link, which stops counting
+        the packets that arrive at it.
+        '''
+        link.fluid_rate = 0.0
+        link.fluid_service = 0.0
+        link.fluid_pass = 1.0
+        link.fluid_loss = 0.0
+        link.carries_fluid = False
+        link.arrived_bytes = 0.0
+        link.set_fluid_backlog(0.0)
+        link.fluid_delay = 0.0
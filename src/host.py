@@ -4,7 +4,6 @@ from packet import AckPacket, DataPacket
 from event_queue import EventQueue
 from event import Event
 from analytics import Analytics
-import network_map as nwm
 from flow import Flow
 
 class Host:
@@ -12,54 +11,64 @@ class Host:
     A Host: end points of the network. Hosts send and receive data and 
     acknowledgement packets.
     '''
-    def __init__(self, id, out_link):
+    def __init__(self, sim, id, out_link):
         super(Host, self).__init__()
+        self.sim = sim              # Simulation the host is part of
         self.id = id
         self.out_link = out_link    # ID of link connected to host
 
+        # Set once the whole network is read (see inp_network.index_network)
+        self.index = None           # Integer index of the host
+        self.link = None            # Link object of out_link
+
     def sendPackets(self, packetlist):
         '''
         Send packets across this host's link
         '''
 
         for pckt in packetlist:
-            sendPckt = Event(Event.pckt_send, constants.system_EQ.currentTime,
-                        [self.out_link, pckt])
-            constants.system_EQ.enqueue(sendPckt)
+            sendPckt = Event(Event.pckt_send, self.sim.EQ.currentTime,
+                        [self.link, pckt])
+            self.sim.EQ.enqueue(sendPckt)
 
     def receivePacket(self, pckt):
         '''
         Receive packets from the link and determine what to do 
         '''
         if type(pckt) is AckPacket:
-            self.tellFlowAckReceived(pckt)
+            flow = self.sim.flows[pckt.owner_flow]
+            self.tellFlowAckReceived(flow, pckt)
+            pckt.release()
 
         elif type(pckt) is DataPacket:
-            if type(nwm.flows[pckt.owner_flow]) is Flow:
+            flow = self.sim.flows[pckt.owner_flow]
+            if type(flow) is Flow:
                 self.directlySendAck(pckt)
+                pckt.release()
             else:
-                self.tellFlowDataReceived(pckt)
+                self.tellFlowDataReceived(flow, pckt)
 
-    def tellFlowAckReceived(self, ackpkt):
+    def tellFlowAckReceived(self, flow, ackpkt):
         '''
         Send the acknowledgment packet to the flow (through the event queue)
         to deal with packet losses/sending new packets.
         '''
-        ackEvent = Event(Event.ack_rcv, constants.system_EQ.currentTime, 
-                    [ackpkt.packet_id, ackpkt.owner_flow, ackpkt.timestamp])
+        ackEvent = Event(Event.ack_rcv, self.sim.EQ.currentTime, 
+                    [ackpkt.packet_id, flow, ackpkt.timestamp,
+                    ackpkt.retransmitted])
 
-        constants.system_EQ.enqueue(ackEvent)
+        self.sim.EQ.enqueue(ackEvent)
 
-    def tellFlowDataReceived(self, datapkt):
+    def tellFlowDataReceived(self, flow, datapkt):
         '''
         If we're running any congestion control, tell the flow that a data
         packet was received so the flow can keep track of unreceived packets
         and send an ack for the next expected packet.
         '''
-        flow_gets_data = Event(Event.flow_rcv_data, constants.system_EQ.currentTime,
-                            [datapkt.owner_flow, datapkt])
+        flow_gets_data = Event(Event.flow_rcv_data, self.sim.EQ.currentTime,
+                            [flow, datapkt])
 
-        constants.system_EQ.enqueue(flow_gets_data)
+        self.sim.EQ.enqueue(flow_gets_data)
 
     def directlySendAck(self, datapkt):
         '''
@@ -69,9 +78,9 @@ class Host:
         src = datapkt.destination_id        # Ack goes in opposite direction
         dest = datapkt.origin_id
         ackpckt = AckPacket(datapkt.packet_id, src, dest, datapkt.owner_flow,
-                    datapkt.timestamp)
+                    datapkt.timestamp, datapkt.retransmitted)
 
-        sendAckEvent = Event(Event.pckt_send, constants.system_EQ.currentTime,
-                        [self.out_link, ackpckt])
+        sendAckEvent = Event(Event.pckt_send, self.sim.EQ.currentTime,
+                        [self.link, ackpckt])
 
-        constants.system_EQ.enqueue(sendAckEvent)
+        self.sim.EQ.enqueue(sendAckEvent)
@@ -0,0 +1,72 @@
+# inflight.py
+# Set of the data packets a flow has sent that haven't been acknowledged
+# yet. Packet IDs run from 0 to the flow's number of packets, so the set is
+# a bitmap indexed by packet ID: adding, removing and checking a packet are
+# O(1), and a cumulative ACK only has to clear the packets it passes.
+
+class InFlightPackets:
+    '''
+    Set of the packet IDs in the pipeline of a flow with num_packets packets.
+    '''
+    def __init__(self, num_packets):
+        self.bits = bytearray(num_packets)  # 1 if the packet is in flight
+        self.count = 0              # Number of packets in flight
+        self.low = 0                # No packet below this is in flight
+        self.high = 0               # No packet at or above this is in flight
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, packetID):
+        return self.bits[packetID] == 1
+
+    def add(self, packetID):
+        if self.bits[packetID] == 0:
+            self.bits[packetID] = 1
+            self.count += 1
+            if self.count == 1:
+                self.low = packetID
+                self.high = packetID + 1
+            else:
+                self.low = min(self.low, packetID)
+                self.high = max(self.high, packetID + 1)
+
+    def remove(self, packetID):
+        if self.bits[packetID] == 0:
+            raise KeyError(packetID)
+        self.bits[packetID] = 0
+        self.count -= 1
+
+    def remove_below(self, packetID):
+        '''
+        Remove every packet with an ID below packetID (i.e. the packets
+        acknowledged by a cumulative ACK of packetID). Returns the IDs of the
+        removed packets.
+        '''
+        bits = self.bits
+        removed = []
+        for PID in range(self.low, min(packetID, self.high)):
+            if bits[PID] == 1:
+                bits[PID] = 0
+                removed.append(PID)
+        self.low = max(self.low, packetID)
+        self.count -= len(removed)
+        return removed
+
+    def max(self):
+        '''
+        Returns the highest packet ID in flight.
+        '''
+        if self.count == 0:
+            raise ValueError("No packets in flight")
+        while self.bits[self.high - 1] == 0:
+            self.high -= 1
+        return self.high - 1
+
+    def clear(self):
+        bits = self.bits
+        for PID in range(self.low, self.high):
+            bits[PID] = 0
+        self.count = 0
+        self.low = 0
+        self.high = 0
@@ -2,12 +2,17 @@ from link import Link
 from flow import Flow
 from flowReno import FlowReno
 from flowFast import FlowFast
+from fluid import FluidFlow, FluidModel
 from host import Host
 from router import Router
-import network_map as nwm
 import constants
+import util
 
-def inp_network(file):
+def inp_network(sim, file):
+    '''
+    Read the network described in file into the Simulation sim. Returns True
+    if the network was valid.
+    '''
     f = open(file, 'r')
     
     sec_count = 0       # Count what section we're in
@@ -34,63 +39,67 @@ def inp_network(file):
         if sec_count == 0:
             # Every link descriptor line will be formatted like:
             #   params = linkID  src  dest  rate  delay  buffer_cap
+            buffer_cap = float(params[5])
+            if constants.BUFFER_SIZE is not None:
+                buffer_cap = float(constants.BUFFER_SIZE)
 
             # Set up first link (direction a)
-            temp_link = Link(params[0]+'a', float(params[3]),
+            temp_link = Link(sim, params[0]+'a', float(params[3]),
                         float(params[4]), params[1], params[2], 
-                        float(params[5]))
+                        buffer_cap)
 
-            if (params[0]+'a') in nwm.links:
+            if (params[0]+'a') in sim.links:
                 raise ValueError('Link {} defined twice'.format(params[0]))
                 return False
 
-            nwm.links[params[0]+'a'] = temp_link
+            sim.links[params[0]+'a'] = temp_link
             
-            # Set up second link, (direction b)
-            temp_link = Link(params[0]+'b', float(params[3]), 
+            # Set up second link, (direction b), which shares the buffer
+            #   counters of direction a
+            temp_link = Link(sim, params[0]+'b', float(params[3]), 
                         float(params[4]), params[2], params[1],
-                        float(params[5]))
+                        buffer_cap, temp_link.buffer.shared)
             
-            if (params[0]+'b') in nwm.links:
+            if (params[0]+'b') in sim.links:
                 raise ValueError('Link {} defined twice'.format(params[0]))
                 return False
 
-            nwm.links[params[0]+'b'] = temp_link
+            sim.links[params[0]+'b'] = temp_link
 
 
             # If the source parameter is a host, put host in dictionary
             # Order by host number and then link number
             if params[1][0] == 'H':
-                if params[1] in nwm.hosts:
+                if params[1] in sim.hosts:
                     raise ValueError('Host {} has two out links'.format(params[1]))
                     return False
                 else:
-                    nwm.hosts[params[1]] = Host(params[1], params[0]+'a')
+                    sim.hosts[params[1]] = Host(sim, params[1], params[0]+'a')
 
             # If the source parameter is a router, put router in dictionary
             # Order by router number
             elif params[1][0] == 'R':
-                if params[1] in nwm.routers:
-                    nwm.routers[params[1]].links.append(params[0]+'a')
+                if params[1] in sim.routers:
+                    sim.routers[params[1]].links.append(params[0]+'a')
                 else:
-                    nwm.routers[params[1]] = Router(params[1])
-                    nwm.routers[params[1]].links.append(params[0]+'a')
+                    sim.routers[params[1]] = Router(sim, params[1])
+                    sim.routers[params[1]].links.append(params[0]+'a')
 
             # If the destination parameter is a host, put host in dictionary
             if params[2][0] == 'H':
-                if params[2] in nwm.hosts:
+                if params[2] in sim.hosts:
                     raise ValueError('Host {} has two out links'.format(params[2]))
                 else:
-                    nwm.hosts[params[2]] = Host(params[2], params[0]+'b')
+                    sim.hosts[params[2]] = Host(sim, params[2], params[0]+'b')
 
             # If the destination parameter is a router, put router in
             #   dictionary
             elif params[2][0] == 'R':
-                if params[2] in nwm.routers:
-                    nwm.routers[params[2]].links.append(params[0]+'b')
+                if params[2] in sim.routers:
+                    sim.routers[params[2]].links.append(params[0]+'b')
                 else:
-                    nwm.routers[params[2]] = Router(params[2])
-                    nwm.routers[params[2]].links.append(params[0]+'b')
+                    sim.routers[params[2]] = Router(sim, params[2])
+                    sim.routers[params[2]].links.append(params[0]+'b')
 
         # Flow parameters
         # Assume input file puts flows in order
@@ -99,43 +108,91 @@ def inp_network(file):
             # Every line will be formatted like:
             #   params = flowID   source   dest   dataAmt   flowStart
 
-            if params[0] in nwm.flows:
+            if params[0] in sim.flows:
                 raise ValueError('Flow {} defined twice'.format(params[0]))
                 return False
 
             # Set up the flow based on the congestion control we will use 
             #   for it
-            if params[5] == 0:          # No congestion Control
-                nwm.flows[params[0]] = Flow(params[0], params[1], params[2],
-                                        float(params[3]), 
+            if params[0] in constants.FLUID_FLOWS:
+                sim.flows[params[0]] = FluidFlow(sim, params[0], params[1],
+                                        params[2], float(params[3]),
+                                        float(params[4])*constants.SEC_TO_MS,
+                                        params[5].rstrip())
+
+            elif params[5] == 0:          # No congestion Control
+                sim.flows[params[0]] = Flow(sim, params[0], params[1],
+                                        params[2], float(params[3]), 
                                         float(params[4])*constants.SEC_TO_MS)
 
             elif params[5] == 'R\n':    # TCP Reno
-                nwm.flows[params[0]] = FlowReno(params[0], params[1], 
+                sim.flows[params[0]] = FlowReno(sim, params[0], params[1], 
                                         params[2], float(params[3]),
                                         float(params[4])*constants.SEC_TO_MS)
 
             elif params[5] == 'F\n':    # FAST TCP
-                nwm.flows[params[0]] = FlowFast(params[0], params[1],
+                sim.flows[params[0]] = FlowFast(sim, params[0], params[1],
                                         params[2], float(params[3]), 
                                         float(params[4])*constants.SEC_TO_MS)
 
         # Plot Output Section
         if sec_count == 2:
-            params[-1] = params[-1][:2]
+            # Strip the line ending (IDs can be longer than two characters)
+            params[-1] = params[-1].rstrip()
 
             if plot_line == 0:          # First line is links to plot
-                nwm.links2plot = params
+                sim.links2plot = params
             elif plot_line == 1:        # Second is flows to plot
-                nwm.flows2plot = params
+                sim.flows2plot = params
 
             plot_line += 1
 
     f.close()
 
+    # Hosts and routers are both looked up as nodes when receiving packets
+    sim.nodes.update(sim.hosts)
+    sim.nodes.update(sim.routers)
+
+    index_network(sim)
+
+    # Fluid flows are advanced together by the fluid model
+    fluid_flows = [flow for flow in sim.flows.values() \
+                    if isinstance(flow, FluidFlow)]
+    if fluid_flows:
+        sim.fluid = FluidModel(sim, fluid_flows)
+
     # Set up the router's routing tables
-    for router_id in nwm.routers:
-        router = nwm.get_router_from_id(router_id)
+    for router_id in sim.routers:
+        router = sim.get_router_from_id(router_id)
         router.init_routing_table()
 
     return True
+
+def index_network(sim):
+    '''
+    Give every node and link a dense integer index and the objects that they
+    work with direct references to each other, so the simulation doesn't
+    have to look them up by ID. IDs are only kept for input/output and
+    plotting.
+    '''
+    sim.node_list = list(sim.nodes.values())
+    for i, node in enumerate(sim.node_list):
+        node.index = i
+
+    sim.link_list = list(sim.links.values())
+    for i, link in enumerate(sim.link_list):
+        link.index = i
+        link.opposite = sim.links[util.flip_link_id(link.ID)]
+        link.src_node = sim.nodes[link.A]
+        link.dest_node = sim.nodes[link.B]
+        link.plotted = link.name in sim.links2plot
+
+    for host in sim.hosts.values():
+        host.link = sim.links[host.out_link]
+
+    for router in sim.routers.values():
+        router.out_links = [sim.links[link_id] for link_id in router.links]
+
+    for flow in sim.flows.values():
+        flow.source_host = sim.hosts[flow.source]
+        flow.dest_host = sim.hosts[flow.dest]
@@ -1,30 +1,109 @@
 import constants
-import queue
+import collections
 import analytics
-import util
-import network_map as nwm
 from event import Event
 from packet import Packet 
 from packet import DataPacket
 
 
+class BufferCounters:
+    '''
+    Number of bytes and packets in the buffers of both directions of a 
+    bidirectional link. The two Link objects share one of these, so the 
+    occupancy of the whole link is available without looking up the other 
+    direction.
+    '''
+    __slots__ = ('bytes', 'pkts', 'fluid')
+
+    def __init__(self):
+        self.bytes = 0.0
+        self.pkts = 0
+        self.fluid = 0.0            # Fluid backlog in bytes (see fluid.py)
+
+class LinkBuffer:
+    '''
+    FIFO buffer of the packets waiting to be sent across a link. The 
+    simulator is single threaded, so unlike queue.Queue nothing is locked.
+    Every put/get also updates the counters shared with the opposite 
+    direction.
+    '''
+    __slots__ = ('pkts', 'bytes_used', 'shared')
+
+    def __init__(self, shared):
+        self.pkts = collections.deque()
+        self.bytes_used = 0.0       # Bytes in this direction's buffer
+        self.shared = shared        # BufferCounters of the whole link
+
+    def __len__(self):
+        return len(self.pkts)
+
+    def empty(self):
+        return not self.pkts
+
+    def put(self, pkt):
+        self.pkts.append(pkt)
+        self.bytes_used += pkt.size
+        self.shared.bytes += pkt.size
+        self.shared.pkts += 1
+
+    def get(self):
+        pkt = self.pkts.popleft()
+        self.bytes_used -= pkt.size
+        self.shared.bytes -= pkt.size
+        self.shared.pkts -= 1
+        return pkt
+
 class Link:
     '''A uni-directional link. Data can only flow from A to B.'''
 
-    def __init__(self, ID, rate, delay, A, B, buffer_cap):
+    def __init__(self, sim, ID, rate, delay, A, B, buffer_cap, counters=None):
+        '''
+        counters is the BufferCounters of the opposite direction of this
+        link, if it has already been created.
+        '''
+        self.sim = sim              # Simulation the link is part of
         self.ID = ID
+        self.name = ID[0:-1]        # ID without the direction, for plotting
         self.rate = float(rate)     # Link rate in megabits per second
         self.delay = float(delay)   # Link delay in ms
         self.A = A                  # Link source
         self.B = B                  # Link destination
 
+        # Set once the whole network is read (see inp_network.index_network)
+        self.index = None           # Integer index of the link
+        self.opposite = None        # Link in the opposite direction
+        self.src_node = None        # Host or router A
+        self.dest_node = None       # Host or router B
+        self.plotted = False        # If the link's analytics are logged
+
         # Buffer capacity in bytes
         self.buffer_capacity = float(buffer_cap) * constants.KB_TO_BYTES       
 
         self.in_use = False         # If a packet is being sent over the link
-        self.buffer_space_used = float(0)       # Space used in link buffer
-        self.buffer = queue.Queue()
+        if counters is None:
+            counters = BufferCounters()
+        self.buffer = LinkBuffer(counters)
+        self.pkts_dropped = 0       # Number of packets dropped by this link
+        self.cost = 0.0             # Cost the routers see for the link, set
+                                    #   by routing_updates.RoutingUpdates
 
+        # If B is simulated by another process (see pdes.py), function that
+        #   is called with (arrival time, index of B, packet) instead of
+        #   enqueueing a packet receive event
+        self.send_remote = None
+
+        # Fluid flows using the link (see fluid.py)
+        self.fluid_rate = 0.0       # Fluid arriving (bytes per ms)
+        self.fluid_service = 0.0    # Fluid sent (bytes per ms)
+        self.fluid_loss = 0.0       # Fraction of the fluid dropped
+        self.fluid_bytes = 0.0      # Fluid backlog in bytes
+        self.fluid_delay = 0.0      # Queueing delay of the fluid backlog (ms)
+        self.fluid_pass = 1.0       # Fraction of the fluid that got through
+                                    #   over the last step
+        self.carries_fluid = False  # Set while fluid uses the link
+        self.arrived_bytes = 0.0    # Bytes of packets since the last step
+                                    #   (only counted while carries_fluid)
+        self.last_arrival = 0.0     # Arrival time of the last packet sent
 
     def handle_link_free(self):
         '''
@@ -32,33 +111,45 @@ class Link:
         buffer, dequeue it and send it across the link (i.e. put link free
         event on the EQ, along with a packet received event for the destination
         of this link). If the buffer is empty, mark the link as free.
+
+        The link is free again once the packet has been put onto it, while the
+        packet only reaches B after the propagation delay, so several packets
+        can be in flight on the link at once.
         '''
 
         if self.buffer.empty():                 # No more packets to send
             self.in_use = False
 
         else:
-            pkt = self.buffer.get_nowait()
-            self.buffer_space_used -= pkt.size
+            pkt = self.buffer.get()
 
             self.log_buffer_occupancy()
 
-            # Calculate when packet will reach end of link
-            travel_time = float(constants.system_EQ.currentTime + 
-                            self.get_packet_travel_time(pkt))
+            # Calculate when the packet is on the link and when it will reach
+            #   the end of the link
+            sent_time = float(self.sim.EQ.currentTime +
+                            self.get_transmission_time(pkt.size))
+            travel_time = max(sent_time + self.delay + self.fluid_delay,
+                                self.last_arrival)
+            self.last_arrival = travel_time
             
-            self.log_link_rate(pkt.size, travel_time)   # Log link rate
+            self.log_link_rate(pkt.size, sent_time)     # Log link rate
             
             self.in_use = True  # Indicate that the link is in use
             
             # Generate link free and packet receive events
-            link_free_event = Event(Event.link_free, travel_time, [self.ID])
+            link_free_event = Event(Event.link_free, sent_time, [self])
+            self.sim.EQ.enqueue(link_free_event)
+
+            if self.send_remote is not None:
+                self.send_remote(travel_time, self.dest_node.index, pkt)
+                return
+
             pkt_receive_event = Event(Event.pckt_rcv, travel_time, 
-                                    [self.B, pkt])
+                                    [self.dest_node, pkt])
 
-            # Enqueue these events in global Event Queue
-            constants.system_EQ.enqueue(link_free_event)
-            constants.system_EQ.enqueue(pkt_receive_event)
+            # Enqueue these events in the Event Queue
+            self.sim.EQ.enqueue(pkt_receive_event)
 
     def enqueue_packet(self, pkt):
         '''
@@ -66,11 +157,12 @@ class Link:
         log a dropped packet in analytics. If the buffer is empty then send the
         packet immediately across the link.
         '''
-        
+        if self.carries_fluid:
+            self.arrived_bytes += pkt.size
+
         # If the buffer is empty and link is free, immediately send packet
         if self.buffer.empty() and self.in_use == False:
-            self.buffer.put_nowait(pkt)
-            self.buffer_space_used += pkt.size
+            self.buffer.put(pkt)
   
             self.log_buffer_occupancy()
             self.log_packet_dropped(0)  # Log no packet dropped
@@ -86,22 +178,23 @@ class Link:
                 print("buffer capacity is %s" % self.buffer_capacity)   
 
             self.log_packet_dropped(1)      # Log that a packet was dropped
+            self.pkts_dropped += 1
+            pkt.release()
 
         # Otherwise link is in use/buffer is not empty, so add packet to buffer
         else:       
-            self.buffer.put_nowait(pkt)
-            self.buffer_space_used += pkt.size
+            self.buffer.put(pkt)
             
             self.log_buffer_occupancy()
             self.log_packet_dropped(0)
 
     def get_packet_travel_time(self, pkt):
         '''
-        Compute the travel time for a packet. Will involve the current time 
-        and the transmission time.
+        Compute the travel time for a packet, from the start of its
+        transmission until it reaches B: the transmission time plus the
+        propagation delay.
         '''
-        travel_time = constants.SEC_TO_MS * \
-                        (pkt.size * constants.BYTES_TO_MBITS * 1.0 / self.rate)
+        travel_time = self.get_transmission_time(pkt.size) + self.delay
         
         if constants.debug:
             print("Travel Time:")
@@ -109,54 +202,76 @@ class Link:
 
         return travel_time
 
-    def get_buffer_occupancy(self):
+    def get_transmission_time(self, size):
+        '''
+        Compute the time (ms) it takes to put size bytes onto the link.
+        '''
+        return constants.SEC_TO_MS * \
+                (size * constants.BYTES_TO_MBITS * 1.0 / self.rate)
+
+    def get_min_latency(self):
         '''
-        Get the number of bytes in the bidirectional link that this link is a 
-        part of. This checks the number of bytes in the buffer of the link 
-        that runs opposite to this one.
+        Get the shortest time between a packet leaving A and arriving at B,
+        i.e. the travel time of the smallest packet.
         '''
-        other_link_obj = self.get_opposite_link_obj()
+        min_size = min(constants.DATA_PKT_SIZE, constants.ACK_PKT_SIZE,
+                        constants.RTABLE_PKT_SIZE)
+        return self.get_transmission_time(min_size) + self.delay
 
+    def get_buffer_occupancy(self):
+        '''
+        Get the number of bytes in the buffers of the bidirectional link that 
+        this link is a part of (both directions), including fluid backlog.
+        '''
         if constants.debug:
             print(self.ID)
-            print((self.buffer_space_used + other_link_obj.buffer_space_used)/
-                    float(1024))
+            print(self.buffer.shared.bytes/float(1024))
 
-        return self.buffer_space_used + other_link_obj.buffer_space_used
+        return self.buffer.shared.bytes + self.buffer.shared.fluid
 
     def get_buffer_pkts(self):
         '''
-        Get the number of bytes in the bidirectional link that this link is a 
-        part of. This checks the number of bytes in the buffer of the link 
-        that runs opposite to this one.
+        Get the number of packets in the buffers of the bidirectional link 
+        that this link is a part of (both directions).
         '''
-        other_link_obj = self.get_opposite_link_obj()
-        return self.buffer.qsize() + other_link_obj.buffer.qsize()
+        return self.buffer.shared.pkts
+
+    def set_fluid_backlog(self, backlog):
+        '''
+        Set the bytes of fluid queued in this direction's buffer. The
+        shared total is summed again rather than adjusted, so float residue
+        can't leave it (and the link cost) slightly negative.
+        '''
+        self.fluid_bytes = backlog
+        self.buffer.shared.fluid = backlog
+        if self.opposite is not None:
+            self.buffer.shared.fluid += self.opposite.fluid_bytes
 
     def get_opposite_link_obj(self):
         '''
         Get the link object that runs opposite to this one.
         '''
-        other_link_id = util.flip_link_id(self.ID)
-
-        return nwm.get_link_from_id(other_link_id)
+        return self.opposite
 
     def log_buffer_occupancy(self):
         '''
         Log the total buffer occupancy for system analytics.
         '''
-        constants.system_analytics.log_buff_occupancy(self.ID[0:-1],
-                constants.system_EQ.currentTime, self.get_buffer_pkts())
+        if self.plotted:
+            self.sim.analytics.log_buff_occupancy(self.name,
+                    self.sim.EQ.currentTime, self.get_buffer_pkts())
 
     def log_packet_dropped(self, num_packets):
         '''
         Log that num_packets were dropped for system analytics.
         '''
-        constants.system_analytics.log_dropped_packet(self.ID[0:-1],
-                constants.system_EQ.currentTime, num_packets)
+        if self.plotted:
+            self.sim.analytics.log_dropped_packet(self.name,
+                    self.sim.EQ.currentTime, num_packets)
 
     def log_link_rate(self, pktsize, time):
         '''
         Log the link rate by logging the number of bytes sent over at this time.
         '''
-        constants.system_analytics.log_link_rate(self.ID, pktsize, time)
+        if self.plotted:
+            self.sim.analytics.log_link_rate(self.ID, pktsize, time)
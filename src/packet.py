@@ -1,27 +1,79 @@
 import constants
 
 class Packet:
+    __slots__ = ('packet_id', 'origin_id', 'destination_id', 'size')
+
+    free_list = []      # Every packet class keeps its own free list
+
+    def __new__(cls, *args):
+        '''
+        Reuse a released packet of the same class if there is one instead of
+        allocating a new one.
+        '''
+        if cls.free_list:
+            return cls.free_list.pop()
+        return object.__new__(cls)
+
     def __init__(self, packet_id, origin_id, destination_id, size):
         self.packet_id = packet_id
         self.origin_id = origin_id
         self.destination_id = destination_id
         self.size = size
 
+    def release(self):
+        '''
+        Put the packet on its class's free list once it has been consumed
+        (received by its final destination or dropped). The packet must not
+        be used after it is released.
+        '''
+        if len(self.free_list) < constants.POOL_SIZE:
+            self.free_list.append(self)
+
 class RoutingTablePacket(Packet):
-    def __init__(self, packet_id, origin_id, size, link_id, routing_table):
+    __slots__ = ('link_index', 'routing_table', 'changes')
+
+    free_list = []
+
+    def __init__(self, packet_id, origin_id, size, link_index, routing_table,
+                    changes):
         # No destination because it needs to go to all neighbors of the origin node
         super().__init__(packet_id, origin_id, None, size)
-        self.link_id = link_id              # Link that the routing table packet arrived on
+        self.link_index = link_index        # Index of the link that the routing table packet arrived on
         self.routing_table = routing_table  # Routing table informaiton
+        self.changes = changes              # Sender's log of changed entries (see Router.changes)
+
+    def release(self):
+        self.routing_table = None
+        self.changes = None
+        super().release()
 
 class DataPacket(Packet):
-    def __init__(self, packet_id, origin_id, destination_id, pkt_flow, time_stamp):
+    __slots__ = ('owner_flow', 'timestamp', 'retransmitted')
+
+    free_list = []
+
+    def __init__(self, packet_id, origin_id, destination_id, pkt_flow, time_stamp,
+                    retransmitted=False):
         super().__init__(packet_id, origin_id, destination_id, constants.DATA_PKT_SIZE)
         self.owner_flow = pkt_flow
         self.timestamp = time_stamp
+        self.retransmitted = retransmitted  # If the packet was sent before
 
 class AckPacket(Packet):
-    def __init__(self, packet_id, origin_id, destination_id, pkt_flow, time_stamp):
+    __slots__ = ('owner_flow', 'timestamp', 'retransmitted')
+
+    free_list = []
+
+    def __init__(self, packet_id, origin_id, destination_id, pkt_flow, time_stamp,
+                    retransmitted=False):
         super().__init__(packet_id, origin_id, destination_id, constants.ACK_PKT_SIZE)
         self.owner_flow = pkt_flow
-        self.timestamp = time_stamp
+        self.timestamp = time_stamp         # Timestamp of the data packet acked
+        self.retransmitted = retransmitted  # If that data packet was resent
+
+def clear_pools():
+    '''
+    Drop the released packets of every class kept for reuse.
+    '''
+    for cls in (Packet, RoutingTablePacket, DataPacket, AckPacket):
+        cls.free_list.clear()
@@ -0,0 +1,366 @@
+# pdes.py
+# Conservative parallel discrete event simulation. The hosts and routers are
+# partitioned into regions and every region is simulated by its own worker
+# process, with its own event queue and copy of the network. Packets that
+# cross a link into another region are sent to that region as timestamped
+# messages.
+#
+# Synchronization is window based: every link needs at least
+# Link.get_min_latency() to deliver a packet, so with lookahead L (the
+# smallest such latency over the links between regions) an event at time t
+# can not affect another region before t + L. Each round every region
+# processes its events in [T, T + L), where T is the earliest pending event
+# of any region, and the messages produced during the round are delivered
+# before the next one.
+#
+# Limitations: a region only sees the buffers of its own side of a link
+# between regions, so Bellman Ford link costs for those links leave out the
+# other direction's buffer, and routing table packets carry a copy of the
+# sender's routing table and log of changes instead of a reference to them,
+# so the receiver reads the whole log (a full advertisement) every time.
+# Routers also keep their next hops while routes are reset (see
+# Router.keep_next_hops), which the sequential simulation doesn't do. The
+# results therefore match a sequential run whose routers keep their next
+# hops: exactly on networks with a single path, and within about 0.2% of
+# the flow finish times on networks with more than one (tests/test_pdes.py).
+#
+# Usage:
+#   python pdes.py <input file> <number of regions> [scheduler]
+
+import multiprocessing
+import sys
+import traceback
+
+import constants
+from analytics import Analytics
+from event import Event
+from eventhandler import EventHandler
+from simulation import Simulation
+
+def partition_network(sim, num_regions):
+    '''
+    Split the routers of sim into (at most) num_regions regions of
+    consecutive routers in breadth first order, so that neighboring routers
+    tend to be in the same region. Every host goes in the region of the node
+    at the other end of its link. Returns a dictionary of node ID to region.
+    '''
+    neighbors = {router_id: [] for router_id in sim.routers}
+    for link in sim.links.values():
+        if link.A in sim.routers and link.B in sim.routers:
+            neighbors[link.A].append(link.B)
+
+    # Breadth first ordering of the routers (covering every component)
+    order = []
+    for start in sorted(sim.routers):
+        if start in order:
+            continue
+        order.append(start)
+        i = len(order) - 1
+        while i < len(order):
+            for router_id in sorted(neighbors[order[i]]):
+                if router_id not in order:
+                    order.append(router_id)
+            i += 1
+
+    num_regions = max(1, min(num_regions, len(order)))
+    node_regions = {}
+    for i, router_id in enumerate(order):
+        node_regions[router_id] = i * num_regions // len(order)
+
+    for host_id, host in sim.hosts.items():
+        neighbor = host.link.B
+        node_regions[host_id] = node_regions.get(neighbor, 0)
+
+    return node_regions
+
+def get_lookahead(sim, node_regions):
+    '''
+    Returns the smallest latency of the links between regions. If there are
+    none, the regions never interact and any window is safe, so windows are
+    one Bellman Ford period long.
+    '''
+    lookahead = float('inf')
+    for link in sim.links.values():
+        if node_regions[link.A] != node_regions[link.B]:
+            lookahead = min(lookahead, link.get_min_latency())
+
+    if lookahead == float('inf'):
+        return constants.BELLMAN_PERIOD
+    return lookahead
+
+class Region:
+    '''
+    State of one region, which lives in its worker process.
+    '''
+    def __init__(self, inFile, region, node_regions, scheduler):
+        self.region = region
+        self.outbox = []            # Messages sent during this round
+
+        self.sim = Simulation(scheduler)
+        if not self.sim.load_network(inFile):
+            raise ValueError("The network was not valid: %s" % inFile)
+        sim = self.sim
+
+        local_nodes = set(node_id for node_id, r in node_regions.items() \
+                            if r == region)
+        self.local_flows = [flow_id for flow_id, flow in sim.flows.items() \
+                            if flow.source in local_nodes]
+
+        # Flows that only have their destination here, whose receiving side
+        #   isn't set up by flowStart
+        self.receiving_flows = [flow_id for flow_id, flow in \
+                                sim.flows.items() if flow.dest in local_nodes \
+                                and flow.source not in local_nodes]
+
+        # Packets crossing into another region are sent as messages
+        for link in sim.links.values():
+            if link.A in local_nodes and link.B not in local_nodes:
+                link.send_remote = self.make_sender(node_regions[link.B])
+
+        # While routes are reset, routers keep sending down their own links
+        #   rather than the destination host's last-hop link, which may be
+        #   in another region
+        for router_id in local_nodes:
+            if router_id in sim.routers:
+                sim.routers[router_id].keep_next_hops = True
+
+        # Regions can't agree on when link costs changed, so they update
+        #   their routes periodically
+        sim.routing_updates.triggered = False
+
+        # Only this region's routers take part in Bellman Ford here. Remote
+        #   hosts stay in sim.hosts since every routing table has all hosts.
+        for node_id in list(sim.nodes):
+            if node_id not in local_nodes:
+                del sim.nodes[node_id]
+                sim.routers.pop(node_id, None)
+
+    def make_sender(self, dest_region):
+        def send_remote(time, node_index, pkt):
+            self.outbox.append((dest_region, time, node_index, pkt))
+        return send_remote
+
+    def start_bellman_ford(self):
+        self.sim.routing_updates.start()
+
+    def start_flows(self):
+        '''
+        Enqueue the start events of the flows whose source is in this region,
+        and the periodic Bellman Ford event.
+        '''
+        for flow_id in self.receiving_flows:
+            self.sim.flows[flow_id].initReceiver()
+
+        for flow_id in self.local_flows:
+            flow = self.sim.flows[flow_id]
+            flow_event = Event(Event.flow_start, flow.start, [flow])
+            self.sim.EQ.enqueue(flow_event)
+
+        bellman_event = Event(Event.bellman_ford, constants.BELLMAN_PERIOD,
+                                None)
+        self.sim.EQ.enqueue(bellman_event)
+
+    def run_window(self, window_end, messages):
+        '''
+        Receive the messages from other regions, then process every event
+        before window_end.
+        '''
+        EQ = self.sim.EQ
+        for time, node_index, pkt in messages:
+            if time < EQ.currentTime:
+                raise RuntimeError("Region %d got a message for time %s at "
+                    "time %s" % (self.region, time, EQ.currentTime))
+            rcv_event = Event(Event.pckt_rcv, time,
+                                [self.sim.node_list[node_index], pkt])
+            EQ.enqueue(rcv_event)
+
+        next_time = EQ.getNextTime()
+        while next_time is not None and next_time < window_end and \
+                not self.sim.all_flows_done:
+            curr_event = EQ.dequeue()
+            EventHandler(self.sim, curr_event)
+            curr_event.release()
+            next_time = EQ.getNextTime()
+
+    def get_status(self):
+        '''
+        Returns the messages sent since the last status, the time of the next
+        local event and the finish times of this region's finished flows.
+        '''
+        outbox = self.outbox
+        self.outbox = []
+        done_flows = {flow_id: self.sim.flows[flow_id].done_time \
+                        for flow_id in self.local_flows \
+                        if self.sim.flows[flow_id].done}
+        return outbox, self.sim.EQ.getNextTime(), done_flows
+
+    def get_results(self):
+        return self.sim.analytics, self.sim.EQ.event_ctr
+
+def region_worker(conn, inFile, region, node_regions, scheduler):
+    '''
+    Worker process of one region. Runs commands sent by the coordinator and
+    replies with ('ok', the region's status) after each one, or with
+    ('error', description) if anything went wrong.
+    '''
+    try:
+        state = Region(inFile, region, node_regions, scheduler)
+
+        while True:
+            cmd = conn.recv()
+
+            if cmd[0] == 'bellman_ford':
+                state.start_bellman_ford()
+            elif cmd[0] == 'start_flows':
+                state.start_flows()
+            elif cmd[0] == 'window':
+                state.run_window(cmd[1], cmd[2])
+            elif cmd[0] == 'finish':
+                conn.send(('ok', state.get_results()))
+                break
+
+            conn.send(('ok', state.get_status()))
+
+    except Exception:
+        conn.send(('error', "region %d:\n%s" % (region,
+                                                traceback.format_exc())))
+
+    conn.close()
+
+class Coordinator:
+    '''
+    Starts one worker process per region and runs the synchronization rounds.
+    '''
+    def __init__(self, inFile, num_regions, scheduler=None):
+        sim = Simulation(scheduler)
+        if not sim.load_network(inFile):
+            raise ValueError("The network was not valid: %s" % inFile)
+        if sim.fluid is not None:
+            raise ValueError("Fluid flows are not supported in parallel runs")
+        if sim.routing is not None:
+            raise ValueError("Centralized routing is not supported in "
+                                "parallel runs")
+
+        self.node_regions = partition_network(sim, num_regions)
+        self.num_regions = max(self.node_regions.values()) + 1
+        self.lookahead = get_lookahead(sim, self.node_regions)
+        self.num_flows = len(sim.flows)
+        self.links2plot = sim.links2plot
+        self.flows2plot = sim.flows2plot
+
+        self.done_flows = {}
+        self.inboxes = [[] for r in range(self.num_regions)]
+        self.next_times = [None] * self.num_regions
+
+        self.conns = []
+        self.workers = []
+        for region in range(self.num_regions):
+            conn, worker_conn = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=region_worker,
+                        args=(worker_conn, inFile, region, self.node_regions,
+                                scheduler))
+            worker.start()
+            self.conns.append(conn)
+            self.workers.append(worker)
+
+    def receive(self, region):
+        '''
+        Returns the next reply from a region's worker.
+        '''
+        result, value = self.conns[region].recv()
+        if result == 'error':
+            for worker in self.workers:
+                worker.terminate()
+            raise RuntimeError("Parallel simulation failed in " + value)
+        return value
+
+    def broadcast(self, cmd):
+        '''
+        Send cmd to every region and collect their statuses.
+        '''
+        for conn in self.conns:
+            conn.send(cmd)
+        for region in range(self.num_regions):
+            self.receive_status(region, self.receive(region))
+
+    def receive_status(self, region, status):
+        outbox, next_time, done_flows = status
+        for dest_region, time, node_index, pkt in outbox:
+            self.inboxes[dest_region].append((time, node_index, pkt))
+        self.next_times[region] = next_time
+        self.done_flows.update(done_flows)
+
+    def get_next_time(self):
+        '''
+        Returns the time of the earliest pending event or message in any
+        region, or None if there are none.
+        '''
+        times = [t for t in self.next_times if t is not None]
+        times += [msg[0] for inbox in self.inboxes for msg in inbox]
+        if len(times) == 0:
+            return None
+        return min(times)
+
+    def run_rounds(self, until_flows_done):
+        '''
+        Run synchronization rounds until no region has anything left to do
+        (or all the flows are done, if until_flows_done).
+        '''
+        while True:
+            if until_flows_done and len(self.done_flows) == self.num_flows:
+                break
+
+            next_time = self.get_next_time()
+            if next_time is None:
+                break
+
+            window_end = next_time + self.lookahead
+            for region, conn in enumerate(self.conns):
+                conn.send(('window', window_end, self.inboxes[region]))
+                self.inboxes[region] = []
+            for region in range(self.num_regions):
+                self.receive_status(region, self.receive(region))
+
+    def run(self):
+        '''
+        Run the initial Bellman Ford until the routing tables settle, then the
+        flows until they are all done. Returns the merged analytics.
+        '''
+        self.broadcast(('bellman_ford',))
+        self.run_rounds(False)
+
+        self.broadcast(('start_flows',))
+        self.run_rounds(True)
+
+        analytics = Analytics(self.links2plot, self.flows2plot)
+        self.num_events = 0
+        for conn in self.conns:
+            conn.send(('finish',))
+        for region in range(self.num_regions):
+            region_analytics, num_events = self.receive(region)
+            analytics.merge(region_analytics)
+            self.num_events += num_events
+        for worker in self.workers:
+            worker.join()
+
+        return analytics
+
+if __name__ == "__main__":
+    inFile = sys.argv[1]
+    num_regions = int(sys.argv[2])
+
+    scheduler = constants.EQ_SCHEDULER
+    if len(sys.argv) > 3:
+        scheduler = sys.argv[3]
+
+    coordinator = Coordinator(inFile, num_regions, scheduler)
+    print("Regions: %s" % coordinator.node_regions)
+    print("Lookahead: %s ms" % coordinator.lookahead)
+
+    analytics = coordinator.run()
+
+    for flow_id in sorted(coordinator.done_flows):
+        print("Flow %s is done at time %s" % (flow_id,
+                coordinator.done_flows[flow_id]))
+
+    analytics.plotOutput()
@@ -0,0 +1,140 @@
+# profiler.py
+# Opt-in instrumentation of the event loop. When a Simulation's profiler is
+# set, Simulation.run_events dispatches every event through it instead of
+# calling EventHandler directly.
+
+import json
+import time
+
+from event import Event
+from eventhandler import EventHandler
+
+# Event type number -> name, e.g. 2 -> 'pckt_rcv'
+EVENT_NAMES = {value: name for name, value in vars(Event).items() \
+                if type(value) is int}
+
+class EventProfiler:
+    def __init__(self, sim):
+        '''
+        Records how many events of each type the Simulation sim handled and
+        the wall time spent handling them, the peak size of the event queue
+        and the overall event rate.
+
+        event_counts (dictionary) - key is the event type, value is the
+            number of events of that type that were handled
+
+        event_times (dictionary) - key is the event type, value is the total
+            wall time (s) spent in EventHandler for events of that type
+        '''
+        self.sim = sim
+        self.event_counts = {}
+        self.event_times = {}
+        self.peak_queue_size = 0
+
+        self.wall_time = 0.0        # Wall time (s) between start and stop
+        self.sim_time = 0.0         # Simulated time (ms) between start and stop
+        self.start_wall = None
+        self.start_sim = None
+
+    def start(self):
+        '''
+        Start measuring the overall wall and simulated time.
+        '''
+        self.start_wall = time.perf_counter()
+        self.start_sim = self.sim.EQ.currentTime
+
+    def stop(self):
+        '''
+        Stop measuring the overall wall and simulated time. Time from
+        several start/stop periods is added up.
+        '''
+        self.wall_time += time.perf_counter() - self.start_wall
+        self.sim_time += self.sim.EQ.currentTime - self.start_sim
+        self.start_wall = None
+
+    def handle(self, cur_event):
+        '''
+        Handle the event with EventHandler, recording how long it took.
+        '''
+        ev_type = cur_event.event_type
+
+        start = time.perf_counter()
+        EventHandler(self.sim, cur_event)
+        elapsed = time.perf_counter() - start
+
+        if ev_type in self.event_counts:
+            self.event_counts[ev_type] += 1
+            self.event_times[ev_type] += elapsed
+        else:
+            self.event_counts[ev_type] = 1
+            self.event_times[ev_type] = elapsed
+
+        queue_size = self.sim.EQ.getSize()
+        if queue_size > self.peak_queue_size:
+            self.peak_queue_size = queue_size
+
+    def get_summary(self):
+        '''
+        Returns the profile as a dictionary.
+        '''
+        num_events = sum(self.event_counts.values())
+        handler_time = sum(self.event_times.values())
+
+        events = {}
+        for ev_type in sorted(self.event_counts):
+            name = EVENT_NAMES.get(ev_type, str(ev_type))
+            events[name] = {
+                'count': self.event_counts[ev_type],
+                'wall_time': self.event_times[ev_type],
+                'avg_wall_time': self.event_times[ev_type] / \
+                                    self.event_counts[ev_type],
+            }
+
+        summary = {
+            'events': events,
+            'num_events': num_events,
+            'handler_time': handler_time,
+            'wall_time': self.wall_time,
+            'sim_time': self.sim_time,
+            'peak_queue_size': self.peak_queue_size,
+            'events_per_sec': None,
+            'sim_ms_per_wall_sec': None,
+        }
+        if self.wall_time > 0:
+            summary['events_per_sec'] = num_events / self.wall_time
+            summary['sim_ms_per_wall_sec'] = self.sim_time / self.wall_time
+
+        return summary
+
+    def print_summary(self):
+        '''
+        Print a table of the time spent on each event type, followed by the
+        overall numbers.
+        '''
+        summary = self.get_summary()
+        handler_time = summary['handler_time']
+
+        print("%-18s %10s %12s %12s %7s" % ("event type", "count",
+                "wall (s)", "avg (us)", "% time"))
+        for name, stats in summary['events'].items():
+            percent = 0.0
+            if handler_time > 0:
+                percent = 100.0 * stats['wall_time'] / handler_time
+            print("%-18s %10d %12.3f %12.2f %7.1f" % (name, stats['count'],
+                    stats['wall_time'], stats['avg_wall_time'] * 1e6, percent))
+
+        print("Events handled: %d" % summary['num_events'])
+        print("Peak event queue size: %d" % summary['peak_queue_size'])
+        print("Wall time: %.3f s (%.3f s in event handlers)" %
+                (summary['wall_time'], handler_time))
+        if summary['events_per_sec'] is not None:
+            print("Events per second: %.0f" % summary['events_per_sec'])
+            print("Simulated ms per wall second: %.3f" %
+                    summary['sim_ms_per_wall_sec'])
+
+    def dump_json(self, fileName):
+        '''
+        Write the profile to fileName as JSON.
+        '''
+        with open(fileName, 'w') as f:
+            json.dump(self.get_summary(), f, indent=2)
@@ -0,0 +1,148 @@
+# retransmit_timer.py
+# Retransmission timer of a flow. Instead of one timeout event per data
+# packet, a flow keeps a single timer for its earliest deadline. The timer
+# keeps the deadline of every packet in the pipeline in a heap, and its one
+# timeout event waits for the deadline at the top:
+#   - when the event fires, the deadlines at the top of packets that have
+#     been acknowledged (or sent again since, so their deadline moved) are
+#     skipped, and the event is enqueued again if the earliest deadline of
+#     an unacknowledged packet is still to come. A cumulative ACK therefore
+#     moves the timer on to the next packet without touching the event
+#     queue.
+#   - the flow's handlePacketTimeout is called for every unacknowledged
+#     packet whose deadline has passed, earliest deadline first, and the
+#     event is enqueued for the next deadline.
+#   - the timeout can shrink (see below), so a packet sent later can have
+#     an earlier deadline than the ones in the pipeline. Sending it moves
+#     the event forward to its deadline.
+# Packets time out exactly when they would with one event each, but a flow
+# has at most one pending pckt_timeout event and enqueues about one per
+# timeout period instead of one per packet sent.
+#
+# The timeout (RTO) adapts to the flow's path as in RFC 6298: the timer keeps
+# a smoothed RTT and RTT variation of the RTTs its flow measures (Jacobson/
+# Karels), and the timeout is the smoothed RTT plus RTO_K variations. Every
+# timeout doubles it (exponential backoff) and, following Karn's rule, the
+# RTTs of retransmitted packets aren't used, so the timeout stays backed off
+# until a packet gets through the first time it is sent.
+
+import heapq
+
+import constants
+from event import Event
+
+class RetransmitTimer:
+    '''
+    Single retransmission timer of a flow's data packets.
+    '''
+    def __init__(self, flow):
+        self.flow = flow
+        self.timeout = constants.TIMEOUT_TIME   # Time until a packet times out
+
+        self.SRTT = None            # Smoothed RTT, None until the first sample
+        self.RTTVAR = None          # RTT variation
+        self.backoffs = 0           # Times the timeout doubled since a sample
+
+        # Heap of (deadline, packet ID, backoffs) of the packets timed, and
+        #   the deadline of each packet's last transmission
+        self.sent = []
+        self.deadlines = {}
+
+        self.handle = None          # Event queue handle of the timeout event
+        self.event_time = None      # Time the timeout event fires at
+        self.expiring = False       # If the timed out packets are handled
+
+    def packetSent(self, packetID):
+        '''
+        Start timing a transmission of packetID, replacing the deadline of
+        any earlier transmission.
+        '''
+        deadline = self.flow.sim.EQ.currentTime + self.timeout
+        self.deadlines[packetID] = deadline
+        heapq.heappush(self.sent, (deadline, packetID, self.backoffs))
+        if self.expiring:
+            return                  # expire enqueues the event when done
+        if self.handle is not None and deadline < self.event_time:
+            self.flow.sim.EQ.cancel(self.handle)    # The timeout shrank
+            self.handle = None
+        if self.handle is None:
+            self.enqueueTimeout(deadline)
+
+    def stop(self):
+        '''
+        Stop timing every packet, e.g. once the flow is done.
+        '''
+        self.sent.clear()
+        self.deadlines.clear()
+        if self.handle is not None:
+            self.flow.sim.EQ.cancel(self.handle)
+            self.handle = None
+
+    def expire(self):
+        '''
+        Called when the timeout event fires. The flow handles the timeout of
+        every unacknowledged packet whose deadline has passed, then the event
+        is enqueued again for the next deadline.
+        '''
+        self.handle = None
+        self.expiring = True        # Packets sent meanwhile don't enqueue it
+
+        front = self.getOldest()
+        while front is not None and \
+            front[0] <= self.flow.sim.EQ.currentTime:
+            heapq.heappop(self.sent)
+            del self.deadlines[front[1]]
+
+            # Back off, unless the packet was sent before the last backoff
+            if front[2] == self.backoffs:
+                self.backoffs += 1
+                self.timeout = min(2 * self.timeout, constants.RTO_MAX)
+
+            self.flow.handlePacketTimeout(front[1])
+            front = self.getOldest()
+
+        self.expiring = False
+        if front is not None:
+            self.enqueueTimeout(front[0])
+
+    def rttSample(self, RTT, retransmitted):
+        '''
+        Update the smoothed RTT and RTT variation with an RTT the flow
+        measured and recompute the timeout. RTTs of retransmitted packets are
+        ignored (Karn's rule).
+        '''
+        if retransmitted:
+            return
+
+        if self.SRTT is None:
+            self.SRTT = RTT
+            self.RTTVAR = RTT / 2.0
+        else:
+            self.RTTVAR = (1 - constants.RTO_BETA) * self.RTTVAR + \
+                constants.RTO_BETA * abs(self.SRTT - RTT)
+            self.SRTT = (1 - constants.RTO_ALPHA) * self.SRTT + \
+                constants.RTO_ALPHA * RTT
+
+        self.backoffs = 0
+        self.timeout = min(max(self.SRTT + constants.RTO_K * self.RTTVAR, \
+            constants.RTO_MIN), constants.RTO_MAX)
+
+    def getOldest(self):
+        '''
+        Returns the (deadline, packet ID, backoffs) of the unacknowledged
+        packet with the earliest deadline, dropping the entries above it.
+        '''
+        unackPackets = self.flow.unackPackets
+        while len(self.sent) > 0:
+            deadline, packetID, backoffs = self.sent[0]
+            if self.deadlines.get(packetID) == deadline:
+                if packetID in unackPackets:
+                    return self.sent[0]
+                del self.deadlines[packetID]    # Acknowledged
+            heapq.heappop(self.sent)
+        return None
+
+    def enqueueTimeout(self, deadline):
+        timeout_ev = Event(Event.pckt_timeout, deadline, [self.flow])
+        self.handle = self.flow.sim.EQ.enqueue(timeout_ev)
+        self.event_time = deadline
@@ -3,19 +3,33 @@ from flow import Flow
 from event import Event
 from packet import Packet
 from event_queue import EventQueue
-import network_map as nwm
 from packet import RoutingTablePacket
-import util
 import constants
 
 class Router:
     '''Router: end points of the network'''
-    def __init__(self, id):
+    def __init__(self, sim, id):
+        self.sim = sim  # Simulation the router is part of
         self.id = id
+        self.index = None   # Integer index, set by inp_network.index_network
         self.links = [] # All links are outgoing from this router
+        self.out_links = [] # Link objects of links, set by index_network
         self.routingTable = None
         self.changeCurr = True
 
+        # If set, routes being reset keep their next hop instead of the
+        #   destination host's last-hop link (set by pdes.py, whose regions
+        #   can't send down another region's links)
+        self.keep_next_hops = False
+
+        # IDs of the hosts whose entries changed this round of Bellman Ford,
+        #   in order, starting with every host. Neighbors only read the part
+        #   of it they haven't seen yet.
+        self.changes = []
+        # How far the log of changes of the neighbor on each incoming link
+        #   has been read: (log, position) by link index
+        self.changes_read = {}
+
     def init_routing_table(self):
         '''
         Initialize the routing table. hosts that are not directly connected
@@ -31,45 +45,52 @@ class Router:
         '''
 
         routing_table = {}
-        hosts_dict = nwm.hosts
-        for host_id in hosts_dict.keys():
-            host_obj = nwm.get_host_from_id(host_id)
-            host_link_id = host_obj.out_link
-            flipped_link_id = util.flip_link_id(host_link_id)
-
-            host_link_obj = nwm.get_link_from_id(flipped_link_id)
+        for host_id, host_obj in self.sim.hosts.items():
+            # Link from the host's neighbor to the host
+            host_link_obj = host_obj.link.opposite
             link_dest = host_link_obj.A
             # If the link connects to this router, add the host 
-            # and weights to the routing table
+            # and weights to the routing table (by the link's index)
             if link_dest == self.id:
-                routing_table[host_id] = [flipped_link_id, 
-                    host_link_obj.get_buffer_occupancy()]
+                routing_table[host_id] = [host_link_obj.index, 
+                    host_link_obj.cost]
 
             else:
                 if setLink==False:
                     routing_table[host_id] = [None, float("Inf"), self.id]
+                elif self.keep_next_hops:
+                    # keep the link we were using, distance infinity
+                    routing_table[host_id] = [self.routingTable[host_id][0],
+                        float("Inf"), self.id]
                 else:
                     # mark the host as link unknown, distance infinity
-                    routing_table[host_id] = [flipped_link_id, float("Inf"), 
-                        self.id]
+                    routing_table[host_id] = [host_link_obj.index,
+                        float("Inf"), self.id]
 
         #print("Routing table for " + self.id + " is " + str(routing_table))
         self.routingTable = routing_table
         
-    def broadcastRTPackets(self):
+    def broadcastRTPackets(self, full=False):
         '''
         Router begins broadcasting packets down all of its neighboring links 
-        for Bellman Ford
+        for Bellman Ford. The packets only advertise the entries that changed
+        since the neighbor last heard from this router, unless full is set, 
+        in which case they advertise the whole routing table (done at the 
+        start of every round of Bellman Ford).
         '''
-        for link in self.links:
+        if full:
+            self.changes = list(self.routingTable)
+
+        for link in self.out_links:
             # make routing table packets for each link
             pckt = RoutingTablePacket(None, self.id, \
-                constants.RTABLE_PKT_SIZE, link, self.routingTable)
+                constants.RTABLE_PKT_SIZE, link.index, self.routingTable,
+                self.changes)
             # enqueue each routing table packet and send it down each link that
             # the router is attached to
             send_pckt_event = Event(Event.pckt_send, \
-                constants.system_EQ.currentTime, [link, pckt])
-            constants.system_EQ.enqueue(send_pckt_event)
+                self.sim.EQ.currentTime, [link, pckt])
+            self.sim.EQ.enqueue(send_pckt_event)
 
 
     def receivePackets(self, pckt):
@@ -78,31 +99,51 @@ class Router:
         the packet's routing table packet and current link cost. If the new 
         weight is less than the corresponding stored weight in the router, the
         entry is over-written. The router then logs a change and broadcasts 
-        another round of routing table packets. Bellman Ford will continue to
-        run until there are no changes to be made.
+        another round of routing table packets with the changed entries. 
+        Bellman Ford will continue to run until there are no changes to be 
+        made.
         '''
         self.changeCurr = False
         if type(pckt) is RoutingTablePacket:
             #print("Routing table for "+self.id+" is "+str(self.routingTable))
 
             # Check the routing table of the packet
-            origin_link = nwm.get_link_from_id(pckt.link_id)
-            link_cost = origin_link.get_buffer_occupancy()
-
-            for hosts in pckt.routing_table.keys():
-                new_cost = pckt.routing_table[hosts][1] + link_cost
-                if new_cost < self.routingTable[hosts][1]:
-                    self.routingTable[hosts][1] = new_cost
-                    # want to flip the ID because direction is reversed
-                    self.routingTable[hosts][0] = \
-                        util.flip_link_id(pckt.link_id)
+            origin_link = self.sim.link_list[pckt.link_index]
+            link_cost = origin_link.cost
+
+            # Only look at the entries that changed since we last heard from
+            #   the neighbor (all of them if it started a new log)
+            routing_table = pckt.routing_table
+            changes = pckt.changes
+            start = 0
+            last_read = self.changes_read.get(pckt.link_index)
+            if last_read is not None and last_read[0] is changes:
+                start = last_read[1]
+            end = len(changes)
+            self.changes_read[pckt.link_index] = (changes, end)
+
+            for i in range(start, end):
+                hosts = changes[i]
+                new_cost = routing_table[hosts][1] + link_cost
+                entry = self.routingTable[hosts]
+                if new_cost < entry[1]:
+                    entry[1] = new_cost
+                    # want the opposite link because direction is reversed
+                    entry[0] = origin_link.opposite.index
+                    self.changes.append(hosts)
                     self.changeCurr = True
 
             # A change has been made to the routing table
             if self.changeCurr == True:
                 self.broadcastRTPackets()
+
+            pckt.release()
         else:
-            next_link = self.routingTable[pckt.destination_id][0]
+            next_link = self.sim.link_list[
+                self.routingTable[pckt.destination_id][0]]
             send_pckt_event = Event(Event.pckt_send, 
-                constants.system_EQ.currentTime, [next_link, pckt])
-            constants.system_EQ.enqueue(send_pckt_event)
+                self.sim.EQ.currentTime, [next_link, pckt])
+            self.sim.EQ.enqueue(send_pckt_event)
+
+    # Hosts and routers both receive packets through receivePacket
+    receivePacket = receivePackets
@@ -0,0 +1,123 @@
+# routing_updates.py
+# Decides when the routes are recomputed. With constants.ROUTING_UPDATES =
+# 'periodic' every link's cost is refreshed and the routes recomputed every
+# BELLMAN_PERIOD, whether anything changed or not. With 'triggered' the link
+# costs are checked every ROUTING_CHECK_PERIOD, but the routes are only
+# recomputed when a cost changes significantly:
+#   - hysteresis: a link's routing cost (Link.cost) only follows its buffer
+#     occupancy once the two differ by more than ROUTING_COST_THRESHOLD, and
+#     is then rounded to a multiple of the threshold, so small fluctuations
+#     of the buffers never reach the routers
+#   - damping: routes are recomputed at most once every ROUTING_HOLD_DOWN ms,
+#     so they can't flap from one check to the next
+#   - memoization: the routing tables the routers converged to are kept for
+#     the last ROUTING_CACHE_SIZE cost vectors. If the costs return to one of
+#     these, the tables are installed directly instead of being recomputed.
+
+import collections
+
+import constants
+
+class RoutingUpdates:
+    '''
+    Keeps the link costs the routers see and starts routing updates when
+    they change.
+    '''
+    def __init__(self, sim, triggered):
+        self.sim = sim
+        self.triggered = triggered  # If updates are change triggered
+
+        # One direction of every bidirectional link (both share a cost)
+        self.links = [link for link in sim.link_list if link.ID[-1] == 'a']
+
+        self.last_update = None     # Time of the last routing update
+        self.costs = None           # Cost vector of the last routing update
+        self.cache = collections.OrderedDict()  # Routing tables by cost vector
+
+    def get_period(self):
+        '''
+        Time between checks of the link costs.
+        '''
+        if self.triggered:
+            return constants.ROUTING_CHECK_PERIOD
+        return constants.BELLMAN_PERIOD
+
+    def start(self):
+        '''
+        Set the link costs and run the initial routing update.
+        '''
+        for link in self.links:
+            self.set_cost(link, link.get_buffer_occupancy())
+        self.update()
+
+    def check(self):
+        '''
+        Check the link costs and update the routes if needed. Returns True if
+        the routes were recomputed.
+        '''
+        if not self.triggered:
+            for link in self.links:
+                self.set_cost(link, link.get_buffer_occupancy())
+            self.update()
+            return True
+
+        now = self.sim.EQ.currentTime
+        if now < self.last_update + constants.ROUTING_HOLD_DOWN:
+            return False
+
+        threshold = constants.ROUTING_COST_THRESHOLD
+        changed = False
+        for link in self.links:
+            occupancy = link.get_buffer_occupancy()
+            if abs(occupancy - link.cost) > threshold:
+                self.set_cost(link, round(occupancy / threshold) * threshold)
+                changed = True
+
+        if not changed:
+            return False
+
+        # Remember what the routers converged to for the previous costs
+        self.cache_tables(self.costs)
+
+        costs = self.get_cost_vector()
+        if costs in self.cache:
+            self.cache.move_to_end(costs)
+            self.install_tables(self.cache[costs])
+            self.last_update = now
+            self.costs = costs
+            return False
+
+        self.update()
+        return True
+
+    def set_cost(self, link, cost):
+        link.cost = cost
+        link.opposite.cost = cost
+
+    def get_cost_vector(self):
+        return tuple(link.cost for link in self.links)
+
+    def update(self):
+        '''
+        Recompute the routes for the current link costs.
+        '''
+        self.last_update = self.sim.EQ.currentTime
+        self.costs = self.get_cost_vector()
+        self.sim.update_routing()
+
+    def cache_tables(self, costs):
+        '''
+        Keep a copy of the routers' current routing tables for costs.
+        '''
+        self.cache[costs] = {router_id: self.copy_table(router.routingTable) \
+                            for router_id, router in self.sim.routers.items()}
+        self.cache.move_to_end(costs)
+        if len(self.cache) > constants.ROUTING_CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    def install_tables(self, tables):
+        for router_id, router in self.sim.routers.items():
+            router.routingTable = self.copy_table(tables[router_id])
+
+    def copy_table(self, table):
+        return {host_id: list(entry) for host_id, entry in table.items()}
@@ -0,0 +1,295 @@
+# simulation.py
+# The state of one simulation: its event queue, analytics and the objects of
+# the network. Every link, router, host and flow keeps a reference to the
+# Simulation it belongs to, so any number of simulations can exist (and be
+# run one after another) in the same process.
+#
+# e.g.
+#   sim = Simulation()
+#   sim.load_network("../Inputs/inp1.txt")
+#   sim.run()
+#   sim.analytics.plotOutput()
+#
+# or, for just the summary numbers:
+#   results = simulate({'network': "../Inputs/inp1.txt",
+#                       'constants': {'FAST_ALPHA': 20}})
+
+import time
+
+import BellmanFord
+import constants
+from analytics import Analytics
+from centralized_routing import CentralizedRouting
+from event import Event
+from event_queue import EventQueue
+from eventhandler import EventHandler
+from inp_network import inp_network
+import packet
+from routing_updates import RoutingUpdates
+
+class Simulation:
+    def __init__(self, scheduler=None):
+        '''
+        An empty simulation, which load_network fills in.
+
+        EQ (EventQueue) - the event queue, using the given scheduler backend
+
+        analytics (Analytics) - logs of the links and flows to plot
+
+        profiler (EventProfiler) - event loop profiler, None unless profiling
+
+        all_flows_done (bool) - set once every flow is finished
+
+        fluid (FluidModel) - advances the fluid flows, None if there are none
+
+        routing (CentralizedRouting) - computes the routes when
+            constants.ROUTING is 'centralized', None for Bellman Ford
+
+        routing_updates (RoutingUpdates) - decides when the routes are
+            recomputed
+
+        links, flows, hosts, routers (dictionaries) - objects of the network
+            by ID. nodes has the hosts and routers together.
+
+        node_list, link_list (lists) - the nodes and links by their integer
+            index (see inp_network.index_network)
+
+        links2plot, flows2plot (lists) - IDs of the links and flows to plot
+
+        The pools of released events and packets are shared by every
+        simulation in the process, so they are emptied here: a traffic peak
+        in an earlier simulation doesn't keep its objects alive.
+        '''
+        Event.clear_pool()
+        packet.clear_pools()
+
+        self.EQ = EventQueue(scheduler)
+        self.analytics = Analytics([], [])
+        self.profiler = None
+        self.all_flows_done = False
+        self.fluid = None
+        self.routing = None
+        self.routing_updates = None
+
+        self.links = {}
+        self.flows = {}
+        self.hosts = {}
+        self.routers = {}
+        self.nodes = {}             # Hosts and routers by ID
+        self.node_list = []
+        self.link_list = []
+        self.links2plot = []
+        self.flows2plot = []
+
+    def load_network(self, inFile):
+        '''
+        Read the network from inFile and set up the analytics for it. Returns
+        False if the network was not valid.
+        '''
+        if not inp_network(self, inFile):
+            return False
+
+        if constants.ROUTING == 'centralized':
+            self.routing = CentralizedRouting(self)
+        elif constants.ROUTING != 'bellman':
+            raise ValueError("Unknown routing: %s" % constants.ROUTING)
+
+        if constants.ROUTING_UPDATES not in ('triggered', 'periodic'):
+            raise ValueError("Unknown routing updates: %s"
+                                % constants.ROUTING_UPDATES)
+        self.routing_updates = RoutingUpdates(self,
+                                constants.ROUTING_UPDATES == 'triggered')
+
+        self.analytics = Analytics(self.links2plot, self.flows2plot)
+        return True
+
+    ####################################
+    ### Getters for the object maps ####
+    ####################################
+
+    def get_link_from_id(self, link_id):
+        return self.links[link_id]
+
+    def get_flow_from_id(self, flow_id):
+        return self.flows[flow_id]
+
+    def get_host_from_id(self, host_id):
+        return self.hosts[host_id]
+
+    def get_router_from_id(self, router_id):
+        return self.routers[router_id]
+
+    def get_node_from_id(self, node_id):
+        return self.nodes[node_id]
+
+    ####################################
+    ### Running the simulation #########
+    ####################################
+
+    def run(self):
+        '''
+        Run the initial Bellman Ford, then start all the flows and dequeue
+        events until the event queue is empty or all the flows are done.
+        '''
+        self.start()
+        self.run_events()
+
+    def start(self):
+        '''
+        Run the initial Bellman Ford to set up the routing tables, then enqueue
+        the flow start events, the first fluid model step (if there are fluid
+        flows) and the first check of the link costs for routing updates.
+        '''
+        # Initial Bellman Ford to set up routing tables
+        self.routing_updates.start()
+
+        # Continue to dequeue events until it is empty (i.e. initial Bellman
+        #   ford is finished and routing tables have initial paths)
+        self.run_events(stop_when_flows_done=False)
+
+        if constants.debug:
+            for r in self.routers.keys():
+                router = self.get_router_from_id(r)
+                print("--" + r + "--")
+                print(str(router.routingTable))
+
+        # Initialize the flag indicating when all flows are done
+        self.all_flows_done = False
+
+        # Enqueue all the flows by enqueueing flow_start events
+        for flow_obj in self.flows.values():
+            flow_event = Event(Event.flow_start, flow_obj.start, [flow_obj])
+            self.EQ.enqueue(flow_event)
+
+        if self.fluid is not None:
+            self.fluid.start()
+
+        # Enqueue the first check for a routing table update
+        bellman_event = Event(Event.bellman_ford,
+                                self.routing_updates.get_period(), None)
+        self.EQ.enqueue(bellman_event)
+
+    def update_routing(self):
+        '''
+        Start a routing update: a round of Bellman Ford, or recomputing the
+        routes directly when the routing is centralized. Called by
+        routing_updates when the routes need to be recomputed.
+        '''
+        if self.routing is None:
+            BellmanFord.runBellmanFord(self)
+        else:
+            self.routing.update()
+
+    def run_events(self, end_time=None, stop_when_flows_done=True,
+                    max_events=None, wall_deadline=None):
+        '''
+        Dequeue events until the event queue is empty or all the flows are
+        done. The run can also be cut short (and continued by calling
+        run_events again):
+            end_time - stop before the first event after this simulated time
+            max_events - stop after handling this many events
+            wall_deadline - stop once time.time() passes this (checked every
+                            WALL_CHECK_EVENTS events)
+        Returns the number of events handled.
+        '''
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start()
+
+        EQ = self.EQ
+        num_events = 0
+
+        # Continue to dequeue events from event queue until it is empty
+        while((not EQ.isempty()) and \
+                (not (stop_when_flows_done and self.all_flows_done))):
+            if end_time is not None and EQ.getNextTime() > end_time:
+                break
+            if max_events is not None and num_events >= max_events:
+                break
+            if wall_deadline is not None and \
+                num_events % constants.WALL_CHECK_EVENTS == 0 and \
+                time.time() > wall_deadline:
+                break
+
+            curr_event = EQ.dequeue()
+            if profiler is None:
+                EventHandler(self, curr_event)
+            else:
+                profiler.handle(curr_event)
+            curr_event.release()
+            num_events += 1
+
+        if profiler is not None:
+            profiler.stop()
+
+        return num_events
+
+    def get_summary(self):
+        '''
+        Returns a dictionary of summary metrics of the simulation so far: the
+        simulated time, events handled, packets dropped and the finish time
+        and average RTT of every flow.
+        '''
+        summary = {}
+        summary['end_time'] = self.EQ.currentTime
+        summary['events'] = self.EQ.event_ctr
+        summary['pkts_dropped'] = sum(link.pkts_dropped \
+                                        for link in self.links.values())
+
+        for flow_id in sorted(self.flows):
+            flow = self.flows[flow_id]
+            summary[flow_id + '_done'] = flow.done_time
+            if getattr(flow, 'numRTT', 0) > 0:
+                summary[flow_id + '_avg_RTT'] = flow.sumRTT / flow.numRTT
+
+        return summary
+
+def simulate(spec):
+    '''
+    Run one simulation described by the dictionary spec and return its
+    summary (see Simulation.get_summary) along with the wall time it took.
+    spec has the keys:
+        network - input file with the network (required)
+        scheduler - event queue backend (default constants.EQ_SCHEDULER)
+        constants - dictionary of values in constants.py to override for
+                    this run. They are restored afterwards.
+        end_time - stop at this simulated time (ms) even if flows remain
+                   (default constants.MAX_SIM_TIME)
+        wall_budget - also stop after this many seconds of wall time
+    The summary's 'finished' is False if the run stopped before every flow
+    was done, so a run that never finishes can't hold up its caller.
+    '''
+    overrides = spec.get('constants', {})
+    for name in overrides:
+        if not hasattr(constants, name):
+            raise ValueError("Unknown constant: %s" % name)
+
+    defaults = {name: getattr(constants, name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            setattr(constants, name, value)
+
+        start = time.time()
+        wall_deadline = None
+        if spec.get('wall_budget') is not None:
+            wall_deadline = start + spec['wall_budget']
+
+        sim = Simulation(spec.get('scheduler'))
+        if not sim.load_network(spec['network']):
+            raise ValueError("The network was not valid: %s"
+                                % spec['network'])
+        sim.start()
+        sim.run_events(end_time=spec.get('end_time', constants.MAX_SIM_TIME),
+                        wall_deadline=wall_deadline)
+        wall_time = time.time() - start
+
+    finally:
+        for name, value in defaults.items():
+            setattr(constants, name, value)
+        Event.clear_pool()
+        packet.clear_pools()
+
+    results = sim.get_summary()
+    results['finished'] = sim.all_flows_done
+    results['wall_time'] = wall_time
+    return results
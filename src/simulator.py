@@ -0,0 +1,150 @@
+# simulator.py
+# Incremental interface to the simulation, for driving bounded runs from
+# other code.
+#
+# e.g.
+#   sim = Simulator("../Inputs/inp1.txt")
+#   sim.run_until(5000)                 # First 5 s of simulated time
+#   sim.step(100)                       # Then 100 more events
+#   for stats in sim.run_iter(sim_interval=1000, wall_budget=60):
+#       print(stats)                    # Every simulated second, for 1 min
+
+import time
+
+from simulation import Simulation
+
+class Simulator:
+    def __init__(self, inFile, scheduler=None):
+        '''
+        Reads the network in inFile and sets up the simulation (available as
+        sim). The initial Bellman Ford and the flow start events are
+        run/enqueued on the first call that runs any events.
+        '''
+        self.sim = Simulation(scheduler)
+        if not self.sim.load_network(inFile):
+            raise ValueError("The network was not valid: %s" % inFile)
+
+        self.started = False
+        self.num_events = 0         # Events handled since the flows started
+        self.wall_time = 0.0        # Wall time (s) spent running events
+
+    def start(self):
+        '''
+        Set up the routing tables and start the flows, if not done already.
+        '''
+        if not self.started:
+            self.sim.start()
+            self.started = True
+
+    def is_done(self):
+        '''
+        Returns True once all the flows are done or there are no more events.
+        '''
+        return self.started and (self.sim.all_flows_done or \
+                                    self.sim.EQ.isempty())
+
+    def run_events(self, end_time=None, max_events=None, wall_budget=None):
+        '''
+        Run events (see Simulation.run_events), stopping after wall_budget seconds
+        of wall time if it is given. Returns the number of events handled.
+        '''
+        self.start()
+
+        start = time.time()
+        wall_deadline = None
+        if wall_budget is not None:
+            wall_deadline = start + wall_budget
+
+        num_events = self.sim.run_events(end_time=end_time,
+                        max_events=max_events, wall_deadline=wall_deadline)
+
+        self.num_events += num_events
+        self.wall_time += time.time() - start
+        return num_events
+
+    def step(self, n_events=1):
+        '''
+        Handle the next n_events events. Returns the number handled, which is
+        smaller if the simulation finished first.
+        '''
+        return self.run_events(max_events=n_events)
+
+    def run_until(self, end_time, wall_budget=None):
+        '''
+        Handle every event up to and including simulated time end_time (ms),
+        or until wall_budget seconds have passed. Returns True if end_time was
+        reached (or the simulation finished), False if the budget ran out.
+        '''
+        self.run_events(end_time=end_time, wall_budget=wall_budget)
+        return self.is_done() or \
+            self.sim.EQ.getNextTime() > end_time
+
+    def run(self, wall_budget=None):
+        '''
+        Run until the simulation is finished or wall_budget seconds have
+        passed. Returns True if the simulation finished.
+        '''
+        self.run_events(wall_budget=wall_budget)
+        return self.is_done()
+
+    def run_iter(self, sim_interval=None, event_interval=None, end_time=None,
+                    wall_budget=None):
+        '''
+        Generator that runs the simulation in chunks and yields get_stats()
+        after each one. A chunk is sim_interval ms of simulated time or
+        event_interval events, whichever comes first (at least one of them
+        must be given). Stops when the simulation finishes, end_time is
+        reached, or wall_budget seconds have passed.
+        '''
+        if sim_interval is None and event_interval is None:
+            raise ValueError("run_iter needs a sim_interval or event_interval")
+
+        self.start()
+
+        wall_deadline = None
+        if wall_budget is not None:
+            wall_deadline = time.time() + wall_budget
+
+        # Chunks follow each other in simulated time even when they have no
+        #   events, e.g. before a flow starts
+        last_chunk_end = self.sim.EQ.currentTime
+        while not self.is_done():
+            chunk_end = end_time
+            if sim_interval is not None:
+                chunk_end = max(last_chunk_end, self.sim.EQ.currentTime) + \
+                    sim_interval
+                last_chunk_end = chunk_end
+                if end_time is not None:
+                    chunk_end = min(chunk_end, end_time)
+
+            chunk_budget = None
+            if wall_deadline is not None:
+                chunk_budget = max(0.0, wall_deadline - time.time())
+
+            self.run_events(end_time=chunk_end, max_events=event_interval,
+                            wall_budget=chunk_budget)
+            yield self.get_stats()
+
+            if end_time is not None and not self.is_done() and \
+                self.sim.EQ.getNextTime() > end_time:
+                break
+            if wall_deadline is not None and time.time() >= wall_deadline:
+                break
+
+    def get_stats(self):
+        '''
+        Returns a dictionary of statistics about the simulation so far.
+        '''
+        stats = {
+            'time': self.sim.EQ.currentTime,
+            'num_events': self.num_events,
+            'queue_size': self.sim.EQ.getSize(),
+            'wall_time': self.wall_time,
+            'events_per_sec': None,
+            'flows_done': sorted(flow_id for flow_id, flow in \
+                                    self.sim.flows.items() if flow.done),
+            'done': self.is_done(),
+        }
+        if self.wall_time > 0:
+            stats['events_per_sec'] = self.num_events / self.wall_time
+        return stats
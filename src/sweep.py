@@ -0,0 +1,161 @@
+# sweep.py
+# Parameter sweep runner. Runs one input file under every combination of a
+# grid of overrides for the values in constants.py, spread over a pool of
+# worker processes, and collects a summary of each run in one table.
+#
+# Usage:
+#   python sweep.py <input file> NAME=v1,v2,... [NAME=v1,v2,...]
+#                   [-j workers] [-o results.csv] [-t end time (ms)]
+#                   [-w wall time budget per run (s)]
+# e.g.
+#   python sweep.py ../Inputs/inp2.txt FAST_ALPHA=10,15,20 BUFFER_SIZE=64,128
+#
+# Every run stops at the end time (constants.MAX_SIM_TIME by default) or when
+# its wall time budget runs out, so a run whose flows never finish can't
+# hold up its worker. Its 'finished' column is then False.
+
+import argparse
+import ast
+import concurrent.futures
+import contextlib
+import csv
+import itertools
+import os
+
+import constants
+from simulation import simulate
+
+def parse_grid_param(param):
+    '''
+    Parse a NAME=v1,v2,... command line argument into the constant name and
+    the list of values to try. Values are read as Python literals where
+    possible (so None, 0.5 and 100 work) and kept as strings otherwise.
+    '''
+    if '=' not in param:
+        raise ValueError("Invalid sweep parameter (expected NAME=v1,v2,...): %s"
+                            % param)
+
+    name, values = param.split('=', 1)
+    if not hasattr(constants, name):
+        raise ValueError("Unknown constant in sweep parameter: %s" % name)
+
+    parsed_values = []
+    for value in values.split(','):
+        try:
+            parsed_values.append(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            parsed_values.append(value)
+
+    return name, parsed_values
+
+def make_grid(grid_params):
+    '''
+    Returns a list of override dictionaries, one for every combination of
+    the values in grid_params (a list of (name, values) pairs).
+    '''
+    names = [name for name, values in grid_params]
+    all_values = [values for name, values in grid_params]
+
+    return [dict(zip(names, combo)) for combo in itertools.product(*all_values)]
+
+def run_sweep_point(inFile, overrides, end_time=None, wall_budget=None):
+    '''
+    Run a single simulation of inFile with the given constants overridden and
+    return its summary, starting with the overridden values. The run stops
+    at end_time (constants.MAX_SIM_TIME if None) or after wall_budget
+    seconds, if given.
+    '''
+    summary = dict(overrides)
+    spec = {'network': inFile, 'constants': overrides,
+            'wall_budget': wall_budget}
+    if end_time is not None:
+        spec['end_time'] = end_time
+
+    # The simulation prints its progress, which we don't want here
+    with open(os.devnull, 'w') as devnull, \
+        contextlib.redirect_stdout(devnull):
+        summary.update(simulate(spec))
+
+    return summary
+
+def run_sweep(inFile, grid, workers=None, end_time=None, wall_budget=None):
+    '''
+    Run inFile once for every override dictionary in grid on a pool of
+    worker processes (one per core by default), each run limited by
+    end_time and wall_budget as in run_sweep_point. Returns the run
+    summaries in the same order as grid.
+    '''
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_sweep_point, itertools.repeat(inFile),
+                                grid, itertools.repeat(end_time),
+                                itertools.repeat(wall_budget)))
+
+def get_columns(results):
+    '''
+    Returns the union of the keys of all the summaries, in the order they
+    first appear.
+    '''
+    columns = []
+    for summary in results:
+        for key in summary:
+            if key not in columns:
+                columns.append(key)
+    return columns
+
+def format_value(value):
+    if isinstance(value, float):
+        return "%.*f" % (constants.DEC_PLACES, value)
+    return str(value)
+
+def print_table(results):
+    '''
+    Print the run summaries as an aligned table with one row per run.
+    '''
+    columns = get_columns(results)
+    rows = [[format_value(summary.get(col, '')) for col in columns] \
+            for summary in results]
+    widths = [max([len(col)] + [len(row[i]) for row in rows]) \
+                for i, col in enumerate(columns)]
+
+    print("  ".join(col.rjust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(val.rjust(w) for val, w in zip(row, widths)))
+
+def write_csv(results, outFile):
+    '''
+    Write the run summaries to a CSV file with one row per run.
+    '''
+    with open(outFile, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=get_columns(results))
+        writer.writeheader()
+        writer.writerows(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run an input file over a grid of constant overrides.")
+    parser.add_argument('inFile', help="input file with the base network")
+    parser.add_argument('params', nargs='*', metavar='NAME=v1,v2,...',
+                        help="constant to override and the values to try")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument('-o', '--out', default=None,
+                        help="also write the results to this CSV file")
+    parser.add_argument('-t', '--end-time', type=float, default=None,
+                        help="stop each run at this simulated time in ms "
+                                "(default: constants.MAX_SIM_TIME)")
+    parser.add_argument('-w', '--wall-budget', type=float, default=None,
+                        help="stop each run after this many seconds")
+    args = parser.parse_args()
+
+    try:
+        grid = make_grid([parse_grid_param(p) for p in args.params])
+    except ValueError as e:
+        print(e)
+        exit(1)
+
+    results = run_sweep(args.inFile, grid, args.workers, args.end_time,
+                        args.wall_budget)
+
+    print_table(results)
+    if args.out is not None:
+        write_csv(results, args.out)
@@ -0,0 +1,282 @@
+# topology_gen.py
+# Generates input files (in the format read by inp_network) for synthetic
+# topologies of any size: dumbbell, parking lot, ring, k-ary fat tree and
+# random graphs, with a configurable number of flows.
+#
+# Usage:
+#   python topology_gen.py <topology> <size> [options] -o <output file>
+# e.g.
+#   python topology_gen.py fattree 4 --flows 16 --cc F -o fattree4.txt
+#
+# The size is the number of host pairs for a dumbbell, the number of routers
+# for a parking lot, ring or random graph, and k for a fat tree.
+
+import argparse
+import random
+
+class Topology:
+    def __init__(self):
+        '''
+        A network under construction.
+
+        links (list) - (node A, node B, rate, delay, buffer) tuples, one per
+            bidirectional link
+
+        hosts (list) - IDs of the hosts, in the order they were added
+        '''
+        self.links = []
+        self.hosts = []
+        self.num_routers = 0
+
+    def add_router(self):
+        self.num_routers += 1
+        return 'R%d' % self.num_routers
+
+    def add_link(self, A, B, rate, delay, buffer_cap):
+        self.links.append((A, B, rate, delay, buffer_cap))
+
+    def add_host(self, router, rate, delay, buffer_cap):
+        '''
+        Add a host connected to router. Every host has exactly one link.
+        '''
+        host = 'H%d' % (len(self.hosts) + 1)
+        self.hosts.append(host)
+        self.add_link(host, router, rate, delay, buffer_cap)
+        return host
+
+def dumbbell(size, args, rng):
+    '''
+    size senders behind one router and size receivers behind another, with
+    the two routers joined by a single bottleneck link. Returns the topology
+    and the list of (source, destination) pairs flows should use.
+    '''
+    topo = Topology()
+    left = topo.add_router()
+    right = topo.add_router()
+    topo.add_link(left, right, args.rate, args.delay, args.buffer)
+
+    senders = [topo.add_host(left, args.host_rate, args.delay, args.buffer) \
+                for i in range(size)]
+    receivers = [topo.add_host(right, args.host_rate, args.delay,
+                    args.buffer) for i in range(size)]
+
+    return topo, list(zip(senders, receivers))
+
+def parking_lot(size, args, rng):
+    '''
+    A chain of size routers with one host on each. The first pair of hosts
+    is the long flow over the whole chain, the others cross one hop each.
+    '''
+    topo = Topology()
+    routers = [topo.add_router() for i in range(size)]
+    for A, B in zip(routers, routers[1:]):
+        topo.add_link(A, B, args.rate, args.delay, args.buffer)
+
+    # Two hosts per router, one for sending and one for receiving
+    senders = [topo.add_host(r, args.host_rate, args.delay, args.buffer) \
+                for r in routers]
+    receivers = [topo.add_host(r, args.host_rate, args.delay, args.buffer) \
+                for r in routers]
+
+    pairs = [(senders[0], receivers[-1])]
+    pairs += [(senders[i], receivers[i + 1]) for i in range(size - 1)]
+    return topo, pairs
+
+def ring(size, args, rng):
+    '''
+    size routers in a ring with one host on each. Flows go between random
+    pairs of hosts.
+    '''
+    topo = Topology()
+    routers = [topo.add_router() for i in range(size)]
+    # Two routers only need one link between them to close the ring
+    num_links = size if size > 2 else size - 1
+    for i in range(num_links):
+        topo.add_link(routers[i], routers[(i + 1) % size], args.rate,
+                        args.delay, args.buffer)
+
+    for r in routers:
+        topo.add_host(r, args.host_rate, args.delay, args.buffer)
+
+    return topo, random_pairs(topo.hosts, rng)
+
+def fat_tree(k, args, rng):
+    '''
+    k-ary fat tree: k pods, each with k/2 edge and k/2 aggregation routers,
+    (k/2)^2 core routers and k/2 hosts on every edge router. Flows go between
+    random pairs of hosts.
+    '''
+    if k < 2 or k % 2 != 0:
+        raise ValueError("Fat tree k must be an even number >= 2")
+
+    half = k // 2
+    topo = Topology()
+    core = [topo.add_router() for i in range(half * half)]
+
+    for pod in range(k):
+        aggs = [topo.add_router() for i in range(half)]
+        edges = [topo.add_router() for i in range(half)]
+
+        for i, agg in enumerate(aggs):
+            # Aggregation router i connects to core routers i*k/2 ..
+            for c in core[i * half:(i + 1) * half]:
+                topo.add_link(agg, c, args.rate, args.delay, args.buffer)
+            for edge in edges:
+                topo.add_link(agg, edge, args.rate, args.delay, args.buffer)
+
+        for edge in edges:
+            for i in range(half):
+                topo.add_host(edge, args.host_rate, args.delay, args.buffer)
+
+    return topo, random_pairs(topo.hosts, rng)
+
+def random_graph(size, args, rng):
+    '''
+    size routers joined by a random spanning tree plus each other pair of
+    routers with probability args.edge_prob, with one host on each router.
+    Flows go between random pairs of hosts.
+    '''
+    topo = Topology()
+    routers = [topo.add_router() for i in range(size)]
+
+    edges = set()
+    for i in range(1, size):
+        j = rng.randrange(i)
+        edges.add((j, i))
+    for i in range(size):
+        for j in range(i + 1, size):
+            if (i, j) not in edges and rng.random() < args.edge_prob:
+                edges.add((i, j))
+
+    for i, j in sorted(edges):
+        topo.add_link(routers[i], routers[j], args.rate, args.delay,
+                        args.buffer)
+
+    for r in routers:
+        topo.add_host(r, args.host_rate, args.delay, args.buffer)
+
+    return topo, random_pairs(topo.hosts, rng)
+
+def random_pairs(hosts, rng, num_pairs=None):
+    '''
+    Returns num_pairs (by default len(hosts)) random (source, destination)
+    pairs of different hosts.
+    '''
+    if num_pairs is None:
+        num_pairs = len(hosts)
+    return [tuple(rng.sample(hosts, 2)) for i in range(num_pairs)]
+
+TOPOLOGIES = {
+    'dumbbell': dumbbell,
+    'parkinglot': parking_lot,
+    'ring': ring,
+    'fattree': fat_tree,
+    'random': random_graph,
+}
+
+def make_flows(pairs, args, rng):
+    '''
+    Returns args.flows (source, destination, start time, congestion control)
+    tuples, cycling through pairs. Flow i starts at args.start plus
+    i * args.stagger, plus up to args.jitter seconds at random.
+    '''
+    num_flows = args.flows
+    if num_flows is None:
+        num_flows = len(pairs)
+
+    flows = []
+    for i in range(num_flows):
+        src, dest = pairs[i % len(pairs)]
+        start = args.start + i * args.stagger + rng.uniform(0, args.jitter)
+
+        cc = args.cc
+        if cc == 'mixed':
+            cc = 'R' if i % 2 == 0 else 'F'
+
+        flows.append((src, dest, start, cc))
+    return flows
+
+def generate(topology, size, args):
+    '''
+    Returns the text of an input file for the requested topology.
+    '''
+    if topology not in TOPOLOGIES:
+        raise ValueError("Unknown topology: %s" % topology)
+
+    rng = random.Random(args.seed)
+    topo, pairs = TOPOLOGIES[topology](size, args, rng)
+    flows = make_flows(pairs, args, rng)
+
+    lines = []
+    for i, (A, B, rate, delay, buffer_cap) in enumerate(topo.links):
+        lines.append("L%d %s %s %g %g %g" % (i + 1, A, B, rate, delay,
+                        buffer_cap))
+    lines.append("")
+
+    for i, (src, dest, start, cc) in enumerate(flows):
+        lines.append("F%d %s %s %g %g %s" % (i + 1, src, dest, args.flow_size,
+                        start, cc))
+
+    # Plot the first few links and flows
+    if args.plot > 0:
+        lines.append("")
+        lines.append(" ".join("L%d" % (i + 1) \
+                        for i in range(min(args.plot, len(topo.links)))))
+        lines.append(" ".join("F%d" % (i + 1) \
+                        for i in range(min(args.plot, len(flows)))))
+
+    return "\n".join(lines) + "\n"
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic network input file.")
+    parser.add_argument('topology', choices=sorted(TOPOLOGIES))
+    parser.add_argument('size', type=int,
+                        help="host pairs (dumbbell), routers (parkinglot, "
+                             "ring, random) or k (fattree)")
+    parser.add_argument('-o', '--out', default=None,
+                        help="output file (default: print it)")
+    add_generator_args(parser)
+    return parser
+
+def add_generator_args(parser):
+    '''
+    Add the options that control the generated network to parser.
+    '''
+    parser.add_argument('--flows', type=int, default=None,
+                        help="number of flows (default: one per host pair)")
+    parser.add_argument('--flow-size', type=float, default=1.0,
+                        help="data per flow (MB)")
+    parser.add_argument('--cc', choices=['R', 'F', 'mixed'], default='R',
+                        help="congestion control: TCP Reno, FAST TCP or "
+                             "alternating")
+    parser.add_argument('--start', type=float, default=0.5,
+                        help="start time of the first flow (s)")
+    parser.add_argument('--stagger', type=float, default=0.0,
+                        help="time between consecutive flow starts (s)")
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help="random extra delay added to each start (s)")
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help="router to router link rate (Mbps)")
+    parser.add_argument('--host-rate', type=float, default=12.5,
+                        help="host link rate (Mbps)")
+    parser.add_argument('--delay', type=float, default=10.0,
+                        help="link delay (ms)")
+    parser.add_argument('--buffer', type=float, default=64.0,
+                        help="link buffer size (KB)")
+    parser.add_argument('--edge-prob', type=float, default=0.1,
+                        help="extra edge probability for random graphs")
+    parser.add_argument('--plot', type=int, default=3,
+                        help="number of links and flows to plot")
+    parser.add_argument('--seed', type=int, default=1,
+                        help="random seed")
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    text = generate(args.topology, args.size, args)
+
+    if args.out is None:
+        print(text, end='')
+    else:
+        with open(args.out, 'w') as f:
+            f.write(text)
@@ -0,0 +1,36 @@
+# conftest.py
+# The simulator's modules import each other by name (e.g. "import
+# constants"), so the tests run them from src/ the way main.py does. The
+# fake simulation here stands in for a Simulation in the unit tests.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'src'))
+
+import pytest
+
+from event_queue import EventQueue
+
+class FakeAnalytics:
+    '''
+    Analytics that drop everything logged to them.
+    '''
+    def __getattr__(self, name):
+        if name.startswith('log_'):
+            return lambda *args: None
+        raise AttributeError(name)
+
+class FakeSim:
+    '''
+    The part of a Simulation that links, flows and their timers use: the
+    event queue and the analytics they log to.
+    '''
+    def __init__(self, scheduler='heap'):
+        self.EQ = EventQueue(scheduler)
+        self.analytics = FakeAnalytics()
+
+@pytest.fixture
+def fake_sim():
+    return FakeSim()
@@ -0,0 +1,88 @@
+# test_centralized_routing.py
+# Tests of the centralized (Dijkstra) routing engine.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+import constants
+from simulation import Simulation
+
+# H1 - R1 and R4 - H2, with two routes between R1 and R4: through R2 or
+#   through R3. R5 hangs off R3.
+NETWORK = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 R4 10 10 64
+L3 R1 R3 10 10 64
+L4 R3 R4 10 10 64
+L5 R4 H2 12.5 10 64
+L6 R3 R5 10 10 64
+
+F1 H1 H2 1 1 R
+
+L1
+F1
+'''
+
+@pytest.fixture
+def sim(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, 'ROUTING', 'centralized')
+    network = tmp_path / 'network.txt'
+    network.write_text(NETWORK)
+    sim = Simulation('heap')
+    assert sim.load_network(str(network))
+    return sim
+
+def set_cost(sim, link_id, cost):
+    sim.links[link_id + 'a'].cost = cost
+    sim.links[link_id + 'b'].cost = cost
+
+def next_hop(sim, router_id, host_id):
+    '''
+    ID of the link the router sends packets for host_id down.
+    '''
+    return sim.link_list[sim.routers[router_id].routingTable[host_id][0]].ID
+
+def test_shortest_paths(sim):
+    set_cost(sim, 'L1', 5000.0)         # The route through R2 is expensive
+    sim.routing.update()
+
+    assert next_hop(sim, 'R1', 'H2') == 'L3a'
+    assert next_hop(sim, 'R3', 'H2') == 'L4a'
+    assert next_hop(sim, 'R2', 'H2') == 'L2a'
+    assert next_hop(sim, 'R4', 'H1') == 'L4b'
+    assert next_hop(sim, 'R5', 'H1') == 'L6b'
+    assert next_hop(sim, 'R4', 'H2') == 'L5a'
+
+    # R2 goes around through R4, R3 and R1 rather than pay for L1
+    assert next_hop(sim, 'R2', 'H1') == 'L2a'
+    assert sim.routers['R2'].routingTable['H1'][1] == 0.0
+
+def test_hops_break_ties(sim):
+    sim.routing.update()                # Every link costs nothing
+
+    assert next_hop(sim, 'R2', 'H1') == 'L1b'
+    assert next_hop(sim, 'R5', 'H2') == 'L6b'
+    assert sim.routing.dists[0][sim.routers['R2'].index] == (0.0, 2)
+
+def test_routes_follow_cost_changes(sim):
+    set_cost(sim, 'L1', 5000.0)
+    sim.routing.update()
+    assert next_hop(sim, 'R1', 'H2') == 'L3a'
+
+    set_cost(sim, 'L1', 0.0)
+    set_cost(sim, 'L4', 8000.0)         # Now the route through R3 is
+    sim.routing.update()                #   expensive
+
+    assert next_hop(sim, 'R1', 'H2') == 'L1a'
+    assert next_hop(sim, 'R4', 'H1') == 'L2b'
+    assert next_hop(sim, 'R3', 'H2') == 'L3b'
+    assert sim.routers['R3'].routingTable['H2'][1] == 0.0
+
+def test_unchanged_costs_skip_dijkstra(sim, monkeypatch):
+    sim.routing.update()
+    calls = []
+    monkeypatch.setattr(sim.routing, 'shortest_paths',
+                        lambda *args: calls.append(args))
+    sim.routing.update()
+    assert calls == []
@@ -0,0 +1,73 @@
+# test_checkpoint.py
+# Tests of simulation checkpoints and forked what-if branches.
+
+import os
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+import checkpoint
+from simulation import Simulation
+
+# A single path from H1 to H2
+CHAIN = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 H2 12.5 10 64
+
+F1 H1 H2 1 0.5 R
+
+L1
+F1
+'''
+
+WARM_UP = 1000                      # Simulated time of the checkpoints (ms)
+
+@pytest.fixture
+def warm_sim(tmp_path):
+    network = tmp_path / 'network.txt'
+    network.write_text(CHAIN)
+    sim = Simulation('heap')
+    assert sim.load_network(str(network))
+    sim.start()
+    sim.run_events(end_time=WARM_UP)
+    assert not sim.all_flows_done
+    return sim
+
+def test_restored_checkpoint_reproduces_the_run(warm_sim, tmp_path):
+    fileName = str(tmp_path / 'warm.pkl')
+    checkpoint.save_checkpoint(warm_sim, fileName)
+
+    warm_sim.run_events()
+    expected = warm_sim.get_summary()
+
+    restored = checkpoint.load_checkpoint(fileName)
+    assert restored.EQ.currentTime <= WARM_UP
+    restored.run_events()
+    assert restored.get_summary() == expected
+    assert restored.all_flows_done
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_branches_fork_from_the_warm_state(warm_sim):
+    def slow_bottleneck(sim):
+        sim.links['L1a'].rate = 5.0
+        sim.links['L1b'].rate = 5.0
+
+    unchanged, slowed = checkpoint.fork_branches(warm_sim,
+                                                [None, slow_bottleneck])
+
+    # The branches ran in children: this process is still warm
+    assert warm_sim.EQ.currentTime <= WARM_UP
+    assert not warm_sim.flows['F1'].done
+
+    warm_sim.run_events()
+    assert unchanged == checkpoint.default_branch_result(warm_sim)
+    assert slowed['F1_done'] > unchanged['F1_done']
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_failing_branch_is_reported(warm_sim):
+    def fail(sim):
+        raise KeyError('L9a')
+
+    with pytest.raises(RuntimeError, match="branch 1"):
+        checkpoint.fork_branches(warm_sim, [None, fail], end_time=2000)
@@ -0,0 +1,110 @@
+# test_delta_advertisements.py
+# Tests that routers advertising only their changed entries converge to the
+# same routing tables as routers advertising their whole tables.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+from packet import RoutingTablePacket
+from router import Router
+from simulation import Simulation
+
+# Two routes between R1 and R4 (through R2 or R3), and R5 behind R4
+NETWORK = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 R4 10 10 64
+L3 R1 R3 10 10 64
+L4 R3 R4 10 10 64
+L5 R4 R5 10 10 64
+L6 R5 H2 12.5 10 64
+L7 H3 R3 12.5 10 64
+
+F1 H1 H2 1 1 R
+
+L1
+F1
+'''
+
+# Link costs of the second round of Bellman Ford
+COSTS = {'L1': 3000.0, 'L4': 1000.0, 'L5': 500.0}
+
+@pytest.fixture
+def inFile(tmp_path):
+    network = tmp_path / 'network.txt'
+    network.write_text(NETWORK)
+    return str(network)
+
+def drop_routing_packets(sim, link_id, dropped):
+    '''
+    Drop the routing table packets sent down link_id whose numbers (counted
+    from 0) are in dropped.
+    '''
+    link = sim.links[link_id]
+    enqueue_packet = link.enqueue_packet
+    sent = [0]
+    def enqueue_or_drop(pkt):
+        if type(pkt) is RoutingTablePacket:
+            sent[0] += 1
+            if sent[0] - 1 in dropped:
+                pkt.release()
+                return
+        enqueue_packet(pkt)
+    link.enqueue_packet = enqueue_or_drop
+
+def converge(inFile, drops=()):
+    '''
+    Run two rounds of Bellman Ford, the second with the link costs in
+    COSTS, and return the routing tables after each of them. drops are
+    (link ID, numbers of the routing table packets to drop) pairs.
+    '''
+    sim = Simulation('heap')
+    assert sim.load_network(inFile)
+    for link_id, dropped in drops:
+        drop_routing_packets(sim, link_id, dropped)
+
+    rounds = []
+    sim.routing_updates.start()
+    sim.run_events(stop_when_flows_done=False)
+    rounds.append(get_tables(sim))
+
+    for link_id, cost in COSTS.items():
+        sim.routing_updates.set_cost(sim.links[link_id + 'a'], cost)
+    sim.update_routing()
+    sim.run_events(stop_when_flows_done=False)
+    rounds.append(get_tables(sim))
+    return rounds
+
+def get_tables(sim):
+    return {router_id: {host_id: entry[:2] for host_id, entry in \
+                router.routingTable.items()} \
+            for router_id, router in sim.routers.items()}
+
+def converge_full(inFile, monkeypatch, drops=()):
+    '''
+    converge with routers that advertise their whole routing tables every
+    time.
+    '''
+    broadcast = Router.broadcastRTPackets
+    with monkeypatch.context() as m:
+        m.setattr(Router, 'broadcastRTPackets',
+                    lambda router, full=False: broadcast(router, True))
+        return converge(inFile, drops)
+
+def test_deltas_match_full_adverts(inFile, monkeypatch):
+    expected = converge_full(inFile, monkeypatch)
+    # The second round moves R1's route to H2 off L1 (through R3 instead)
+    assert expected[0] != expected[1]
+    assert converge(inFile) == expected
+
+def test_late_neighbor_converges(inFile, monkeypatch):
+    # R3 misses R1's first advertisement of each round, so it first
+    #   hears of R1 through the changes that follow
+    drops = [('L3a', {0, 3})]
+    assert converge(inFile, drops) == converge_full(inFile, monkeypatch, drops)
+
+def test_missed_round_converges(inFile, monkeypatch):
+    # R4 hears nothing from R2 in the first round (R2 sends it three
+    #   advertisements), so it only reads R2's log in the second
+    drops = [('L2a', {0, 1, 2})]
+    assert converge(inFile, drops) == converge_full(inFile, monkeypatch, drops)
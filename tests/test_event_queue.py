@@ -0,0 +1,169 @@
+# test_event_queue.py
+# Tests of the event queue and its scheduler backends.
+
+import heapq
+import random
+
+import pytest
+
+from event import Event
+from event_queue import CalendarScheduler, EventQueue, HeapScheduler
+
+SCHEDULERS = ['heap', 'calendar']
+
+def make_event(time):
+    return Event(Event.link_free, time, None)
+
+@pytest.mark.parametrize('backend', [HeapScheduler, CalendarScheduler])
+def test_scheduler_matches_reference(backend):
+    '''
+    Random pushes and pops (with many equal times and far future times, so
+    the calendar resizes and searches past a year) come out in the same
+    order as from a plain heap.
+    '''
+    rng = random.Random(1)
+    scheduler = backend()
+    reference = []
+    now = 0.0
+    ctr = 0
+    for i in range(5000):
+        if reference and rng.random() < 0.45:
+            entry = scheduler.pop()
+            assert entry == heapq.heappop(reference)
+            now = entry[0]
+            continue
+
+        r = rng.random()
+        if r < 0.2:
+            time = now
+        elif r < 0.25:
+            time = now + rng.uniform(1000.0, 100000.0)
+        else:
+            time = now + round(rng.expovariate(1.0), 2)
+        entry = [time, ctr, ctr]
+        ctr += 1
+        scheduler.push(entry)
+        heapq.heappush(reference, entry)
+        assert len(scheduler) == len(reference)
+        assert scheduler.peek() == reference[0]
+
+    while reference:
+        assert scheduler.pop() == heapq.heappop(reference)
+    assert len(scheduler) == 0
+
+def test_calendar_resizes():
+    scheduler = CalendarScheduler()
+    for i in range(100):
+        scheduler.push([i * 0.5, i, i])
+    assert scheduler.num_buckets > CalendarScheduler.MIN_BUCKETS
+
+    for i in range(100):
+        assert scheduler.pop()[1] == i
+    assert scheduler.num_buckets == CalendarScheduler.MIN_BUCKETS
+
+def test_calendar_peek_empty():
+    with pytest.raises(IndexError):
+        CalendarScheduler().peek()
+
+@pytest.mark.parametrize('scheduler', SCHEDULERS)
+def test_equal_times_are_fifo(scheduler):
+    EQ = EventQueue(scheduler)
+    events = [make_event(5.0) for i in range(20)]
+    for event in events:
+        EQ.enqueue(event)
+
+    for event in events:
+        assert EQ.dequeue() is event
+    assert EQ.currentTime == 5.0
+    assert EQ.isempty()
+
+def test_unknown_scheduler():
+    with pytest.raises(ValueError):
+        EventQueue('wheel')
+
+@pytest.mark.parametrize('scheduler', SCHEDULERS)
+def test_cancel_matches_reference(scheduler, monkeypatch):
+    '''
+    Random enqueues, cancels and dequeues, compacting every few cancels,
+    dequeue the same events as a reference list of the live events.
+    '''
+    monkeypatch.setattr(EventQueue, 'COMPACT_MIN_CANCELLED', 8)
+    rng = random.Random(2)
+    EQ = EventQueue(scheduler)
+    live = []                   # (time, order, event, handle) not cancelled
+    order = 0
+    compactions = 0
+    for i in range(5000):
+        r = rng.random()
+        if live and r < 0.3:
+            expected = min(live, key=lambda item: item[:2])
+            assert EQ.getNextTime() == expected[0]
+            assert EQ.dequeue() is expected[2]
+            live.remove(expected)
+        elif live and r < 0.55:
+            item = live.pop(rng.randrange(len(live)))
+            num_entries = EQ.getNumEntries()
+            EQ.cancel(item[3])
+            EQ.cancel(item[3])      # Cancelling twice does nothing
+            if EQ.getNumEntries() < num_entries:
+                compactions += 1
+        else:
+            time = EQ.currentTime + rng.choice([0.0, 0.5, rng.random() * 50])
+            event = make_event(time)
+            live.append((time, order, event, EQ.enqueue(event)))
+            order += 1
+        assert EQ.getSize() == len(live)
+        assert EQ.isempty() == (len(live) == 0)
+
+    assert compactions > 0
+    for item in sorted(live, key=lambda item: item[:2]):
+        assert EQ.dequeue() is item[2]
+    assert EQ.isempty()
+    assert EQ.getNextTime() is None
+
+@pytest.mark.parametrize('scheduler', SCHEDULERS)
+def test_cancel_after_dequeue(scheduler):
+    EQ = EventQueue(scheduler)
+    event = make_event(1.0)
+    handle = EQ.enqueue(event)
+    later = make_event(2.0)
+    EQ.enqueue(later)
+
+    assert EQ.dequeue() is event
+    EQ.cancel(handle)           # Already dequeued, so nothing to cancel
+    assert EQ.getSize() == 1
+    assert EQ.dequeue() is later
+
+@pytest.mark.parametrize('scheduler', SCHEDULERS)
+def test_fast_lane(scheduler):
+    '''
+    Events enqueued for the current time skip the scheduler and come out
+    after the scheduler's events for that time, before the clock advances.
+    '''
+    EQ = EventQueue(scheduler)
+    first = make_event(1.0)
+    second = make_event(1.0)
+    later = make_event(2.0)
+    for event in (later, first, second):
+        EQ.enqueue(event)
+
+    assert EQ.dequeue() is first
+    now1 = make_event(1.0)
+    now2 = make_event(1.0)
+    EQ.enqueue(now1)
+    EQ.enqueue(now2)
+    assert len(EQ.sameTimeEvents) == 2
+    assert EQ.getSize() == 4
+
+    assert EQ.getNextTime() == 1.0
+    assert EQ.dequeue() is second
+    assert EQ.dequeue() is now1
+
+    # Cancelled fast lane events are skipped
+    now3 = make_event(1.0)
+    EQ.cancel(EQ.enqueue(now3))
+    assert EQ.dequeue() is now2
+    assert EQ.getNextTime() == 2.0
+    assert EQ.dequeue() is later
+    assert EQ.currentTime == 2.0
+    assert EQ.isempty()
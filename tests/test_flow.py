@@ -0,0 +1,82 @@
+# test_flow.py
+# Tests of the send queue of the flow without congestion control.
+
+import pytest
+
+import constants
+from event import Event
+from flow import Flow
+
+def make_flow(sim, num_packets, window):
+    data_amt = num_packets * constants.DATA_PKT_SIZE / constants.MB_TO_BYTES
+    flow = Flow(sim, 'F1', 'H1', 'H2', data_amt, 0.0)
+    assert flow.num_packets == num_packets
+    flow.windowSize = window
+    return flow
+
+def sent_packets(flow):
+    '''
+    IDs and retransmitted flags of the packets sent since the last call.
+    '''
+    sent = []
+    while not flow.sim.EQ.isempty():
+        event = flow.sim.EQ.dequeue()
+        if event.event_type == Event.flow_send_packets:
+            sent += [(pkt.packet_id, pkt.retransmitted) \
+                        for pkt in event.data[1]]
+    return sent
+
+def test_send_order(fake_sim):
+    flow = make_flow(fake_sim, 3, 75)
+    assert [flow.nextPacketToSend() for i in range(3)] == [0, 1, 2]
+    assert not flow.hasPacketsToSend()
+
+    flow.retransmits.extend([2, 0])
+    assert flow.hasPacketsToSend()
+    assert [flow.nextPacketToSend() for i in range(2)] == [2, 0]
+    assert not flow.hasPacketsToSend()
+
+def test_window_of_new_packets(fake_sim):
+    flow = make_flow(fake_sim, 6, 4)
+    flow.flowStart()
+    assert sent_packets(flow) == [(0, False), (1, False), (2, False),
+                                    (3, False)]
+    assert len(flow.unackPackets) == 4
+    assert flow.firstUnackd() == 0
+
+    for PID in range(4):
+        flow.getACK(PID, 0.0, False)
+    assert sent_packets(flow) == [(4, False), (5, False)]
+
+def test_ack_past_a_packet_marks_it_lost(fake_sim):
+    flow = make_flow(fake_sim, 6, 4)
+    flow.flowStart()
+    sent_packets(flow)
+
+    flow.getACK(0, 0.0, False)
+    flow.getACK(2, 0.0, False)          # Everything sent before 2 was lost
+    assert list(flow.retransmits) == [1]
+    assert 1 not in flow.unackPackets
+    assert flow.firstUnackd() == 2
+
+    flow.getACK(2, 0.0, False)          # Now at the front of the pipeline
+    flow.getACK(3, 0.0, False)          # Window done: 2 new packets, then 1
+    assert sent_packets(flow) == [(4, False), (5, False), (1, True)]
+
+def test_timeout_and_finish(fake_sim):
+    flow = make_flow(fake_sim, 3, 3)
+    flow.flowStart()
+    sent_packets(flow)
+
+    flow.getACK(0, 0.0, False)
+    flow.handlePacketTimeout(1)
+    assert list(flow.retransmits) == [1]
+    assert flow.firstUnackd() == 2
+
+    flow.getACK(2, 0.0, False)          # Only the timed out packet is left
+    assert sent_packets(flow) == [(1, True)]
+    assert not flow.done
+
+    flow.getACK(1, 0.0, True)
+    assert flow.done
+    assert flow.done_time == flow.sim.EQ.currentTime
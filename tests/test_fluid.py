@@ -0,0 +1,76 @@
+# test_fluid.py
+# Tests of the fluid model against the packet model it stands in for.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+import constants
+from link import Link
+from packet import DataPacket
+from simulation import Simulation
+
+# A single 5 MB flow from H1 to H2 over a 10 Mbps bottleneck
+CHAIN = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 H2 12.5 10 64
+
+F1 H1 H2 5 0.5 %s
+
+L1
+F1
+'''
+
+# How far a fluid flow's transfer time may be from the packet flow's. The
+#   packet flows lose time the fluid doesn't model: Reno to the timeouts
+#   after overshooting in slow start, and both to sending fewer packets
+#   than their window on each ACK.
+TOLERANCE = 0.25
+
+def transfer_time(inFile, fluid, monkeypatch):
+    monkeypatch.setattr(constants, 'FLUID_FLOWS', ['F1'] if fluid else [])
+    sim = Simulation('heap')
+    assert sim.load_network(inFile)
+    sim.run()
+    flow = sim.flows['F1']
+    assert flow.done
+    return flow.done_time - flow.start
+
+@pytest.mark.parametrize('cc', ['R', 'F'])
+def test_fluid_flow_finishes_with_the_packet_flow(tmp_path, monkeypatch, cc):
+    inFile = tmp_path / 'network.txt'
+    inFile.write_text(CHAIN % cc)
+
+    packet_time = transfer_time(str(inFile), False, monkeypatch)
+    fluid_time = transfer_time(str(inFile), True, monkeypatch)
+    assert fluid_time == pytest.approx(packet_time, rel=TOLERANCE)
+
+def make_links(sim):
+    link = Link(sim, 'L1a', 10, 10, 'R1', 'R2', 64)
+    opposite = Link(sim, 'L1b', 10, 10, 'R2', 'R1', 64, link.buffer.shared)
+    link.opposite = opposite
+    opposite.opposite = link
+    link.dest_node = object()
+    link.in_use = True              # Keep the packets in the buffer
+    return link, opposite
+
+def test_arrivals_only_counted_while_carrying_fluid(fake_sim):
+    link, _ = make_links(fake_sim)
+
+    link.enqueue_packet(DataPacket(0, 'H1', 'H2', 'F1', 0.0))
+    assert link.arrived_bytes == 0.0
+
+    link.carries_fluid = True
+    pkt = DataPacket(1, 'H1', 'H2', 'F1', 0.0)
+    link.enqueue_packet(pkt)
+    assert link.arrived_bytes == pkt.size
+
+def test_fluid_backlog_never_leaves_residue(fake_sim):
+    link, opposite = make_links(fake_sim)
+
+    for backlog in (0.1, 0.7, 0.3, 1e-3):
+        link.set_fluid_backlog(backlog)
+        opposite.set_fluid_backlog(backlog / 3)
+    link.set_fluid_backlog(0.0)
+    opposite.set_fluid_backlog(0.0)
+    assert link.get_buffer_occupancy() == 0.0
@@ -0,0 +1,76 @@
+# test_index_network.py
+# Tests of the integer indices and object references that
+# inp_network.index_network gives the network.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+from event import Event
+from simulation import Simulation
+
+# Two routes between R1 and R4: through R2 or through R3
+NETWORK = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 R4 10 10 64
+L3 R1 R3 10 10 64
+L4 R3 R4 10 10 64
+L5 R4 H2 12.5 10 64
+
+F1 H1 H2 1 0.5 R
+F2 H2 H1 1 1 F
+
+L1
+F1
+'''
+
+@pytest.fixture
+def sim(tmp_path):
+    network = tmp_path / 'network.txt'
+    network.write_text(NETWORK)
+    sim = Simulation('heap')
+    assert sim.load_network(str(network))
+    return sim
+
+def test_indices_are_dense(sim):
+    assert [node.index for node in sim.node_list] == \
+        list(range(len(sim.nodes)))
+    assert [link.index for link in sim.link_list] == \
+        list(range(len(sim.links)))
+    assert set(sim.node_list) == set(sim.nodes.values())
+    assert set(sim.link_list) == set(sim.links.values())
+
+def test_links_refer_to_their_nodes(sim):
+    for link in sim.link_list:
+        assert link.src_node is sim.nodes[link.A]
+        assert link.dest_node is sim.nodes[link.B]
+        assert link.opposite.opposite is link
+        assert (link.opposite.A, link.opposite.B) == (link.B, link.A)
+
+    for host in sim.hosts.values():
+        assert host.link.src_node is host
+    for router in sim.routers.values():
+        assert router.out_links
+        assert all(link.src_node is router for link in router.out_links)
+
+    for flow in sim.flows.values():
+        assert flow.source_host is sim.hosts[flow.source]
+        assert flow.dest_host is sim.hosts[flow.dest]
+
+def test_routes_are_link_indices(sim):
+    sim.start()
+
+    for router in sim.routers.values():
+        for host_id, entry in router.routingTable.items():
+            next_link = sim.link_list[entry[0]]
+            assert next_link.src_node is router
+
+    # The flow start events (the next ones) carry the flows themselves
+    starts = [sim.EQ.dequeue() for flow in sim.flows]
+    assert all(event.event_type == Event.flow_start for event in starts)
+    assert [event.data[0] for event in starts] == \
+        [sim.flows['F1'], sim.flows['F2']]
+
+def test_indexed_run_delivers_every_flow(sim):
+    sim.run()
+    assert all(flow.done for flow in sim.flows.values())
@@ -0,0 +1,98 @@
+# test_inflight.py
+# Tests of the in-flight packet bitmap.
+
+import random
+
+import pytest
+
+from inflight import InFlightPackets
+
+def test_add_remove_contains():
+    inflight = InFlightPackets(10)
+    assert len(inflight) == 0
+    assert 3 not in inflight
+
+    inflight.add(3)
+    inflight.add(7)
+    inflight.add(3)                 # Adding twice counts once
+    assert len(inflight) == 2
+    assert 3 in inflight and 7 in inflight
+    assert 5 not in inflight
+
+    inflight.remove(3)
+    assert 3 not in inflight
+    assert len(inflight) == 1
+    with pytest.raises(KeyError):
+        inflight.remove(3)
+
+def test_remove_below():
+    inflight = InFlightPackets(20)
+    for PID in (2, 4, 5, 9, 15):
+        inflight.add(PID)
+
+    assert inflight.remove_below(6) == [2, 4, 5]
+    assert len(inflight) == 2
+    assert inflight.remove_below(6) == []
+    assert inflight.remove_below(3) == []
+    assert 9 in inflight and 15 in inflight
+
+    assert inflight.remove_below(20) == [9, 15]
+    assert len(inflight) == 0
+
+def test_max():
+    inflight = InFlightPackets(10)
+    with pytest.raises(ValueError):
+        inflight.max()
+
+    for PID in (1, 6, 8):
+        inflight.add(PID)
+    assert inflight.max() == 8
+    inflight.remove(8)
+    assert inflight.max() == 6
+    inflight.remove(6)
+    inflight.add(0)
+    assert inflight.max() == 1
+
+def test_clear():
+    inflight = InFlightPackets(10)
+    for PID in (1, 6, 8):
+        inflight.add(PID)
+    inflight.clear()
+    assert len(inflight) == 0
+    assert not any(PID in inflight for PID in range(10))
+
+    inflight.add(4)
+    assert inflight.max() == 4
+    assert inflight.remove_below(10) == [4]
+
+def test_matches_set():
+    '''
+    Random operations agree with a plain set.
+    '''
+    rng = random.Random(3)
+    num_packets = 200
+    inflight = InFlightPackets(num_packets)
+    reference = set()
+    for i in range(5000):
+        r = rng.random()
+        PID = rng.randrange(num_packets)
+        if r < 0.5:
+            inflight.add(PID)
+            reference.add(PID)
+        elif r < 0.8:
+            if PID in reference:
+                inflight.remove(PID)
+                reference.remove(PID)
+        elif r < 0.95:
+            removed = inflight.remove_below(PID)
+            assert removed == sorted(p for p in reference if p < PID)
+            reference.difference_update(removed)
+        else:
+            inflight.clear()
+            reference.clear()
+
+        assert len(inflight) == len(reference)
+        if reference:
+            assert inflight.max() == max(reference)
+    assert all((PID in inflight) == (PID in reference) \
+                for PID in range(num_packets))
@@ -0,0 +1,70 @@
+# test_link_buffer.py
+# Tests of the byte-counted link buffers.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # link.py logs through analytics.py
+
+from link import BufferCounters, Link, LinkBuffer
+from packet import AckPacket, DataPacket
+
+def make_link(sim, buffer_kb, counters=None):
+    link = Link(sim, 'L1a', 10, 10, 'R1', 'R2', buffer_kb, counters)
+    link.dest_node = object()
+    return link
+
+def test_buffer_is_fifo_and_counts_bytes():
+    counters = BufferCounters()
+    buffer = LinkBuffer(counters)
+    opposite = LinkBuffer(counters)
+    pkts = [DataPacket(i, 'H1', 'H2', 'F1', 0.0) for i in range(3)]
+    ack = AckPacket(0, 'H2', 'H1', 'F1', 0.0)
+
+    assert buffer.empty()
+    for pkt in pkts:
+        buffer.put(pkt)
+    opposite.put(ack)
+
+    assert len(buffer) == 3
+    assert buffer.bytes_used == 3 * pkts[0].size
+    assert opposite.bytes_used == ack.size
+    assert counters.bytes == 3 * pkts[0].size + ack.size
+    assert counters.pkts == 4
+
+    assert [buffer.get() for i in range(3)] == pkts
+    assert buffer.empty()
+    assert buffer.bytes_used == 0
+    assert counters.bytes == ack.size
+    assert counters.pkts == 1
+
+def test_link_drops_when_buffer_is_full(fake_sim):
+    '''
+    The first packet is sent right away, the second waits in the 2 KB
+    buffer and the third doesn't fit.
+    '''
+    sim = fake_sim
+    link = make_link(sim, 2)
+    pkts = [DataPacket(i, 'H1', 'H2', 'F1', 0.0) for i in range(3)]
+    for pkt in pkts:
+        link.enqueue_packet(pkt)
+
+    assert link.in_use
+    assert len(link.buffer) == 1
+    assert link.pkts_dropped == 1
+    assert link.get_buffer_occupancy() == pkts[1].size
+    assert link.get_buffer_pkts() == 1
+
+def test_directions_share_occupancy(fake_sim):
+    sim = fake_sim
+    link = make_link(sim, 64)
+    opposite = Link(sim, 'L1b', 10, 10, 'R2', 'R1', 64, link.buffer.shared)
+    opposite.in_use = True          # Keep the packets in the buffer
+    link.in_use = True
+
+    link.enqueue_packet(DataPacket(0, 'H1', 'H2', 'F1', 0.0))
+    opposite.enqueue_packet(AckPacket(0, 'H2', 'H1', 'F1', 0.0))
+
+    expected = DataPacket(0, 'H1', 'H2', 'F1', 0.0).size + \
+        AckPacket(0, 'H2', 'H1', 'F1', 0.0).size
+    assert link.get_buffer_occupancy() == expected
+    assert opposite.get_buffer_occupancy() == expected
@@ -0,0 +1,76 @@
+# test_link_delay.py
+# Tests of the links' propagation delay and of packets pipelined on a link.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # link.py logs through analytics.py
+
+import constants
+from event import Event
+from link import Link
+from packet import DataPacket
+from simulation import Simulation
+
+# Time (ms) to put a data packet onto a 10 Mbps link
+TRANSMISSION = constants.SEC_TO_MS * constants.DATA_PKT_SIZE * \
+                constants.BYTES_TO_MBITS / 10
+
+def arrival_times(sim, delay, num_packets):
+    '''
+    Send num_packets data packets down a 10 Mbps link with the given delay
+    and return how long each of them took to reach the other end.
+    '''
+    start = sim.EQ.currentTime
+    link = Link(sim, 'L1a', 10, delay, 'R1', 'R2', 64)
+    link.dest_node = object()
+    for i in range(num_packets):
+        link.enqueue_packet(DataPacket(i, 'H1', 'H2', 'F1', 0.0))
+
+    arrivals = []
+    while not sim.EQ.isempty():
+        event = sim.EQ.dequeue()
+        if event.event_type == Event.link_free:
+            link.handle_link_free()
+        elif event.event_type == Event.pckt_rcv:
+            arrivals.append(event.time - start)
+    return arrivals
+
+def test_delay_shifts_arrivals(fake_sim):
+    assert arrival_times(fake_sim, 0, 1) == \
+        [pytest.approx(TRANSMISSION)]
+
+    no_delay = arrival_times(fake_sim, 0, 5)
+    delayed = arrival_times(fake_sim, 25, 5)
+    assert delayed == [pytest.approx(t + 25) for t in no_delay]
+
+def test_packets_are_pipelined(fake_sim):
+
+    # Back to back packets are one transmission time apart, not a whole
+    #   delay, so several of them are on the link at once
+    arrivals = arrival_times(fake_sim, 100, 5)
+    assert arrivals == [pytest.approx(100 + (i + 1) * TRANSMISSION) \
+                        for i in range(5)]
+
+# A single path from H1 to H2 with every link's delay filled in
+CHAIN = '''L0 H1 R1 12.5 %d 64
+L1 R1 R2 10 %d 64
+L2 R2 H2 12.5 %d 64
+
+F1 H1 H2 1 0.5 F
+
+L1
+F1
+'''
+
+def min_RTT(tmp_path, delay):
+    network = tmp_path / ('network_%d.txt' % delay)
+    network.write_text(CHAIN % (delay, delay, delay))
+    sim = Simulation('heap')
+    assert sim.load_network(str(network))
+    sim.run()
+    return sim.flows['F1'].minRTT
+
+def test_delay_adds_to_the_flow_RTT(tmp_path):
+    # Three links there and three back
+    assert min_RTT(tmp_path, 20) == \
+        pytest.approx(min_RTT(tmp_path, 10) + 6 * 10)
@@ -0,0 +1,91 @@
+# test_pdes.py
+# Tests of the parallel simulation against the sequential one.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+from analytics import Analytics
+from pdes import Coordinator
+from simulation import Simulation
+
+# A single path from H1 to H2
+CHAIN = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 H2 12.5 10 64
+
+F1 H1 H2 1 0.5 R
+
+L1
+F1
+'''
+
+# Two paths between R1 and R4, with flows both ways across the regions
+TWO_PATHS = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R1 R3 10 10 64
+L3 R2 R4 10 10 64
+L4 R3 R4 10 10 64
+L5 R4 H2 12.5 10 64
+L6 H3 R1 12.5 10 64
+L7 R4 H4 12.5 10 64
+
+F1 H1 H2 2 0.5 R
+F2 H3 H4 1 1 F
+F3 H4 H1 1 1.5 R
+
+L1 L2
+F1 F2
+'''
+
+def write_network(tmp_path, network):
+    path = tmp_path / 'network.txt'
+    path.write_text(network)
+    return str(path)
+
+def run_sequential(inFile):
+    '''
+    Flow finish times of a sequential run whose routers keep their next
+    hops while routes are reset, as they do in the regions.
+    '''
+    sim = Simulation('heap')
+    assert sim.load_network(inFile)
+    for router in sim.routers.values():
+        router.keep_next_hops = True
+    sim.run()
+    return {flow_id: flow.done_time for flow_id, flow in sim.flows.items()}
+
+def run_parallel(inFile, num_regions):
+    coordinator = Coordinator(inFile, num_regions, 'heap')
+    assert coordinator.num_regions == num_regions
+    coordinator.run()
+    return coordinator.done_flows
+
+def test_single_path_matches_exactly(tmp_path):
+    inFile = write_network(tmp_path, CHAIN)
+    assert run_parallel(inFile, 2) == run_sequential(inFile)
+
+@pytest.mark.parametrize('num_regions', [2, 3])
+def test_two_paths_match_closely(tmp_path, num_regions):
+    inFile = write_network(tmp_path, TWO_PATHS)
+    sequential = run_sequential(inFile)
+    parallel = run_parallel(inFile, num_regions)
+
+    assert sorted(parallel) == sorted(sequential)
+    for flow_id, done_time in sequential.items():
+        assert parallel[flow_id] == pytest.approx(done_time, rel=0.005)
+
+def test_merged_rates_are_sorted():
+    merged = Analytics(['L1'], ['F1'])
+    for times in ([1.0, 3.0, 5.0], [2.0, 3.0, 4.0]):
+        region = Analytics(['L1'], ['F1'])
+        for time in times:
+            region.log_link_rate('L1a', 1024, time)
+            region.log_flow_send_rate('F1', 1024, time)
+        merged.merge(region)
+
+    for logs in (merged.link_flow_rate['L1'], merged.flow_send_rate['F1']):
+        times = [currTime for currTime, amount in logs]
+        assert times == sorted(times)
+        assert len(times) == 5
+        assert sum(amount for currTime, amount in logs) == 6 * 1024
@@ -0,0 +1,49 @@
+# test_pools.py
+# Tests of the free lists that events and packets are reused from.
+
+import pytest
+
+import constants
+import packet
+from event import Event
+from packet import AckPacket, DataPacket
+
+@pytest.fixture(autouse=True)
+def empty_pools():
+    Event.clear_pool()
+    packet.clear_pools()
+    yield
+    Event.clear_pool()
+    packet.clear_pools()
+
+def test_released_objects_are_reused():
+    event = Event(Event.link_free, 1.0, ['link'])
+    event.release()
+    assert event.data is None
+
+    again = Event(Event.flow_done, 2.0, None)
+    assert again is event
+    assert (again.event_type, again.time) == (Event.flow_done, 2.0)
+
+    data = DataPacket(0, 'H1', 'H2', 'F1', 0.0)
+    data.release()
+    ack = AckPacket(0, 'H2', 'H1', 'F1', 0.0)
+    assert ack is not data              # Each class has its own pool
+    assert DataPacket(1, 'H1', 'H2', 'F1', 0.0) is data
+
+def test_pool_size_is_capped(monkeypatch):
+    monkeypatch.setattr(constants, 'POOL_SIZE', 3)
+    events = [Event(Event.link_free, 0.0, None) for i in range(5)]
+    for event in events:
+        event.release()
+    assert len(Event.free_list) == 3
+
+def test_new_simulation_empties_the_pools():
+    pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+    from simulation import Simulation
+
+    Event(Event.link_free, 0.0, None).release()
+    DataPacket(0, 'H1', 'H2', 'F1', 0.0).release()
+    Simulation('heap')
+    assert Event.free_list == []
+    assert DataPacket.free_list == []
@@ -0,0 +1,72 @@
+# test_profiler.py
+# Tests of the event loop profiler.
+
+import json
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+from profiler import EventProfiler
+from simulation import Simulation
+
+# A single path from H1 to H2
+CHAIN = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 H2 12.5 10 64
+
+F1 H1 H2 1 0.5 F
+
+L1
+F1
+'''
+
+@pytest.fixture
+def inFile(tmp_path):
+    network = tmp_path / 'network.txt'
+    network.write_text(CHAIN)
+    return str(network)
+
+def run(inFile, profiled):
+    '''
+    Run the simulation of inFile, returning it and the number of events
+    handled.
+    '''
+    sim = Simulation('heap')
+    assert sim.load_network(inFile)
+    if profiled:
+        sim.profiler = EventProfiler(sim)
+    sim.start()
+    num_events = sim.run_events()
+    return sim, num_events
+
+def test_profiling_doesnt_change_the_run(inFile):
+    sim, num_events = run(inFile, False)
+    profiled_sim, profiled_events = run(inFile, True)
+
+    assert profiled_events == num_events
+    assert profiled_sim.get_summary() == sim.get_summary()
+
+def test_profile_counts_every_event(inFile):
+    sim, num_events = run(inFile, True)
+    summary = sim.profiler.get_summary()
+
+    # The profiler also saw the initial Bellman Ford of sim.start
+    assert summary['num_events'] > num_events
+    assert summary['num_events'] == \
+        sum(stats['count'] for stats in summary['events'].values())
+    assert {'flow_start', 'pckt_rcv', 'link_free'} <= set(summary['events'])
+    assert summary['events']['flow_start']['count'] == 1
+
+    assert summary['sim_time'] == sim.EQ.currentTime
+    assert summary['peak_queue_size'] > 0
+    assert 0 < summary['handler_time'] <= summary['wall_time']
+    assert summary['events_per_sec'] > 0
+
+def test_profile_json(inFile, tmp_path):
+    sim, _ = run(inFile, True)
+    fileName = str(tmp_path / 'profile.json')
+    sim.profiler.dump_json(fileName)
+
+    with open(fileName) as f:
+        assert json.load(f) == sim.profiler.get_summary()
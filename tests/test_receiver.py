@@ -0,0 +1,64 @@
+# test_receiver.py
+# Tests of the destination's record of received packets in the TCP Reno and
+# FAST TCP flows.
+
+import random
+
+import pytest
+
+from flowFast import FlowFast
+from flowReno import FlowReno
+from packet import DataPacket
+
+@pytest.fixture(params=[FlowReno, FlowFast])
+def flow(request, fake_sim):
+    flow = request.param(fake_sim, 'F1', 'H1', 'H2', 0.1, 0.0)
+    flow.initReceiver()
+    return flow
+
+def test_in_order(flow):
+    for PID in range(5):
+        flow.receivePacketID(PID)
+        assert flow.next_expected == PID + 1
+    assert flow.out_of_order == set()
+
+def test_out_of_order_and_duplicates(flow):
+    for PID in (1, 3, 2, 3):
+        flow.receivePacketID(PID)
+    assert flow.next_expected == 0
+    assert flow.out_of_order == {1, 2, 3}
+
+    flow.receivePacketID(0)         # Fills the hole
+    assert flow.next_expected == 4
+    assert flow.out_of_order == set()
+
+    flow.receivePacketID(2)         # Old duplicate
+    assert flow.next_expected == 4
+    assert flow.out_of_order == set()
+
+def test_matches_reference(flow):
+    '''
+    The next expected packet is always the lowest packet not received yet.
+    '''
+    rng = random.Random(4)
+    received = set()
+    for i in range(2000):
+        PID = rng.randrange(300)
+        flow.receivePacketID(PID)
+        received.add(PID)
+
+        expected = 0
+        while expected in received:
+            expected += 1
+        assert flow.next_expected == expected
+        assert flow.out_of_order == set(p for p in received if p > expected)
+
+def test_ack_asks_for_next_expected(flow):
+    flow.receivePacketID(0)
+    flow.flowReceiveDataPacket(DataPacket(2, 'H1', 'H2', 'F1', 1.5, True))
+
+    ack_event = flow.sim.EQ.dequeue()
+    ack = ack_event.data[1][0]
+    assert ack.packet_id == 1
+    assert ack.timestamp == 1.5
+    assert ack.retransmitted
@@ -0,0 +1,209 @@
+# test_retransmit_timer.py
+# Tests of the per-flow retransmission timer.
+
+import random
+
+import pytest
+
+import constants
+from event import Event
+from inflight import InFlightPackets
+from retransmit_timer import RetransmitTimer
+
+class TimedFlow:
+    '''
+    The part of a flow the timer uses. Records the packets that time out.
+    '''
+    def __init__(self, sim, num_packets=100):
+        self.sim = sim
+        self.unackPackets = InFlightPackets(num_packets)
+        self.timer = RetransmitTimer(self)
+        self.timeouts = []          # (time, packet ID) of every timeout
+
+    def send(self, packetID):
+        self.unackPackets.add(packetID)
+        self.timer.packetSent(packetID)
+
+    def handlePacketTimeout(self, packetID):
+        self.timeouts.append((self.sim.EQ.currentTime, packetID))
+
+@pytest.fixture
+def flow(fake_sim):
+    return TimedFlow(fake_sim)
+
+def advance(flow, time):
+    '''
+    Dispatch the flow's timeout events up to time.
+    '''
+    EQ = flow.sim.EQ
+    while not EQ.isempty() and EQ.getNextTime() <= time:
+        event = EQ.dequeue()
+        assert event.event_type == Event.pckt_timeout
+        assert event.data == [flow]
+        flow.timer.expire()
+    EQ.currentTime = time
+
+def test_one_event_per_flow(flow):
+    for PID in range(50):
+        flow.send(PID)
+    assert flow.sim.EQ.getSize() == 1
+    assert flow.sim.EQ.getNextTime() == constants.TIMEOUT_TIME
+
+def test_packets_time_out_oldest_first(flow):
+    flow.send(0)
+    advance(flow, 10)
+    flow.send(1)
+    flow.send(2)
+    advance(flow, 20)
+    flow.send(3)
+
+    advance(flow, 10 + constants.TIMEOUT_TIME)
+    assert flow.timeouts == [(constants.TIMEOUT_TIME, 0),
+                             (10 + constants.TIMEOUT_TIME, 1),
+                             (10 + constants.TIMEOUT_TIME, 2)]
+    assert flow.sim.EQ.getSize() == 1
+
+def test_acked_packets_are_skipped(flow):
+    for PID in range(3):
+        flow.send(PID)
+        advance(flow, flow.sim.EQ.currentTime + 100)
+    flow.unackPackets.remove_below(2)   # Cumulative ACK of 0 and 1
+
+    advance(flow, 10000)
+    assert flow.timeouts == [(200 + constants.TIMEOUT_TIME, 2)]
+    assert flow.sim.EQ.isempty()
+
+def test_resent_packet_gets_new_deadline(flow):
+    flow.send(0)
+    advance(flow, 300)
+    flow.send(0)                        # Sent again before timing out
+
+    advance(flow, 300 + constants.TIMEOUT_TIME - 1)
+    assert flow.timeouts == []
+    advance(flow, 300 + constants.TIMEOUT_TIME)
+    assert flow.timeouts == [(300 + constants.TIMEOUT_TIME, 0)]
+
+def test_shrunk_timeout_moves_the_event_forward(flow):
+    '''
+    A packet sent after the timeout shrank times out at its own deadline,
+    not at the later deadline of a packet sent before.
+    '''
+    flow.send(0)                        # Deadline TIMEOUT_TIME
+    advance(flow, 10)
+    flow.send(1)
+    advance(flow, 20)
+    flow.timer.rttSample(20, False)     # Timeout of RTO_MIN
+    flow.unackPackets.remove_below(1)   # ACK of 0
+    flow.send(2)
+    assert flow.sim.EQ.getSize() == 1
+
+    advance(flow, 20 + constants.RTO_MIN)
+    assert flow.timeouts == [(20 + constants.RTO_MIN, 2)]
+    advance(flow, 10 + constants.TIMEOUT_TIME)
+    assert flow.timeouts == [(20 + constants.RTO_MIN, 2),
+                             (10 + constants.TIMEOUT_TIME, 1)]
+
+def test_timeouts_in_deadline_order(flow):
+    '''
+    The same packets time out when they would with one event each.
+    '''
+    rng = random.Random(7)
+    expected = {}
+    for PID in range(100):
+        advance(flow, flow.sim.EQ.currentTime + rng.randrange(30))
+        if rng.random() < 0.2:
+            flow.timer.rttSample(rng.randrange(20, 300), False)
+        flow.send(PID)
+        expected[PID] = flow.sim.EQ.currentTime + flow.timer.timeout
+
+    advance(flow, 10 ** 6)
+    assert flow.timeouts == sorted((time, PID) for PID, time in
+                                   expected.items())
+
+def test_stop(flow):
+    for PID in range(5):
+        flow.send(PID)
+    flow.timer.stop()
+    assert flow.sim.EQ.isempty()
+    assert flow.timer.getOldest() is None
+
+    flow.send(7)                        # Starts timing again
+    assert flow.sim.EQ.getSize() == 1
+
+def test_packets_sent_while_expiring(flow):
+    '''
+    Packets resent by the timeout handler don't enqueue a second event.
+    '''
+    resend = flow.handlePacketTimeout
+    def handlePacketTimeout(packetID):
+        resend(packetID)
+        flow.send(packetID)
+    flow.handlePacketTimeout = handlePacketTimeout
+
+    for PID in range(3):
+        flow.send(PID)
+    advance(flow, constants.TIMEOUT_TIME)
+    assert [PID for time, PID in flow.timeouts] == [0, 1, 2]
+    assert flow.sim.EQ.getSize() == 1
+
+def test_first_rtt_sample(flow):
+    timer = flow.timer
+    timer.rttSample(100, False)
+    assert timer.SRTT == 100
+    assert timer.RTTVAR == 50
+    assert timer.timeout == 100 + constants.RTO_K * 50
+
+def test_rtt_samples_follow_rfc6298(flow):
+    timer = flow.timer
+    SRTT, RTTVAR = None, None
+    for RTT in [100, 140, 60, 300, 120, 120, 90]:
+        timer.rttSample(RTT, False)
+        if SRTT is None:
+            SRTT, RTTVAR = RTT, RTT / 2.0
+        else:
+            RTTVAR = 0.75 * RTTVAR + 0.25 * abs(SRTT - RTT)
+            SRTT = 0.875 * SRTT + 0.125 * RTT
+        assert timer.SRTT == pytest.approx(SRTT)
+        assert timer.RTTVAR == pytest.approx(RTTVAR)
+        assert timer.timeout == pytest.approx(max(SRTT + 4 * RTTVAR, 200))
+
+def test_timeout_is_clamped(flow):
+    timer = flow.timer
+    timer.rttSample(10, False)
+    assert timer.timeout == constants.RTO_MIN
+
+    timer = RetransmitTimer(flow)
+    timer.rttSample(constants.RTO_MAX, False)
+    assert timer.timeout == constants.RTO_MAX
+
+def test_karns_rule(flow):
+    timer = flow.timer
+    timer.rttSample(100, False)
+    timer.rttSample(5000, True)         # Retransmitted: ambiguous RTT
+    assert timer.SRTT == 100
+    assert timer.RTTVAR == 50
+    assert timer.timeout == 300
+
+def test_backoff_once_per_expiry(flow):
+    flow.timer.rttSample(100, False)    # Timeout of 300
+    for PID in range(3):
+        flow.send(PID)
+    advance(flow, 300)
+    assert len(flow.timeouts) == 3
+    assert flow.timer.timeout == 600    # Doubled once, not three times
+
+def test_backoff_keeps_doubling_until_a_sample(flow):
+    flow.timer.rttSample(100, False)
+    expected = 300
+    for i in range(12):
+        flow.send(0)
+        advance(flow, flow.sim.EQ.currentTime + flow.timer.timeout)
+        expected = min(2 * expected, constants.RTO_MAX)
+        assert flow.timer.timeout == expected
+    assert flow.timer.timeout == constants.RTO_MAX
+
+    flow.timer.rttSample(5000, True)    # Karn: the backoff stays
+    assert flow.timer.timeout == constants.RTO_MAX
+    flow.timer.rttSample(100, False)
+    assert flow.timer.backoffs == 0
+    assert flow.timer.timeout < 300
@@ -0,0 +1,101 @@
+# test_routing_updates.py
+# Tests of the change triggered routing updates.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+import constants
+from simulation import Simulation
+
+# Two routes between R1 and R4: through R2 or through R3
+NETWORK = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 R4 10 10 64
+L3 R1 R3 10 10 64
+L4 R3 R4 10 10 64
+L5 R4 H2 12.5 10 64
+
+F1 H1 H2 1 1 R
+
+L1
+F1
+'''
+
+THRESHOLD = constants.ROUTING_COST_THRESHOLD
+HOLD_DOWN = constants.ROUTING_HOLD_DOWN
+
+@pytest.fixture
+def sim(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, 'ROUTING', 'centralized')
+    monkeypatch.setattr(constants, 'ROUTING_UPDATES', 'triggered')
+    network = tmp_path / 'network.txt'
+    network.write_text(NETWORK)
+    sim = Simulation('heap')
+    assert sim.load_network(str(network))
+
+    # Count the routing updates
+    sim.num_updates = 0
+    update_routing = sim.update_routing
+    def count_update():
+        sim.num_updates += 1
+        update_routing()
+    sim.update_routing = count_update
+
+    sim.routing_updates.start()
+    assert sim.num_updates == 1
+    return sim
+
+def set_occupancy(sim, link_id, occupancy):
+    sim.links[link_id + 'a'].buffer.shared.bytes = occupancy
+
+def check_at(sim, time):
+    sim.EQ.currentTime = time
+    return sim.routing_updates.check()
+
+def tables(sim):
+    return {router_id: sim.routing_updates.copy_table(router.routingTable) \
+            for router_id, router in sim.routers.items()}
+
+def test_small_cost_change_triggers_no_update(sim):
+    set_occupancy(sim, 'L1', THRESHOLD / 2)
+
+    assert not check_at(sim, HOLD_DOWN)
+    assert not check_at(sim, 2 * HOLD_DOWN)
+    assert sim.num_updates == 1
+    assert sim.links['L1a'].cost == 0.0
+
+def test_one_update_per_hold_down(sim):
+    set_occupancy(sim, 'L1', 3 * THRESHOLD)
+    assert check_at(sim, HOLD_DOWN)
+    assert sim.num_updates == 2
+    assert sim.links['L1a'].cost == sim.links['L1b'].cost == 3 * THRESHOLD
+
+    # The costs keep changing, but the routes are held down
+    time = HOLD_DOWN
+    for occupancy in (6, 9, 12):
+        set_occupancy(sim, 'L1', occupancy * THRESHOLD)
+        time += constants.ROUTING_CHECK_PERIOD
+        assert not check_at(sim, time)
+    assert sim.num_updates == 2
+
+    assert check_at(sim, 2 * HOLD_DOWN)
+    assert sim.num_updates == 3
+    assert sim.links['L1a'].cost == 12 * THRESHOLD
+
+def test_cached_tables_match_recomputed(sim):
+    idle_tables = tables(sim)
+
+    set_occupancy(sim, 'L3', 3 * THRESHOLD)
+    assert check_at(sim, HOLD_DOWN)
+    assert tables(sim) != idle_tables   # The route through R3 is avoided
+
+    # Back to the idle costs: the tables come from the cache
+    set_occupancy(sim, 'L3', 0.0)
+    assert not check_at(sim, 2 * HOLD_DOWN)
+    assert sim.num_updates == 2
+    cached = tables(sim)
+    assert cached == idle_tables
+
+    sim.routing.update()
+    assert tables(sim) == cached
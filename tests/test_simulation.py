@@ -0,0 +1,81 @@
+# test_simulation.py
+# Tests that simulations keep all their state in their Simulation object.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+from simulation import Simulation
+
+# A single path from H1 to H2
+CHAIN = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 H2 12.5 10 64
+
+F1 H1 H2 1 0.5 R
+
+L1
+F1
+'''
+
+# Two flows sharing the bottleneck
+SHARED = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 H2 12.5 10 64
+L3 H3 R1 12.5 10 64
+
+F1 H1 H2 1 0.5 F
+F2 H3 H2 1 1 R
+
+L1
+F1 F2
+'''
+
+@pytest.fixture
+def networks(tmp_path):
+    files = {}
+    for name, network in (('chain', CHAIN), ('shared', SHARED)):
+        files[name] = str(tmp_path / (name + '.txt'))
+        with open(files[name], 'w') as f:
+            f.write(network)
+    return files
+
+def load(inFile):
+    sim = Simulation('heap')
+    assert sim.load_network(inFile)
+    return sim
+
+def run(inFile):
+    sim = load(inFile)
+    sim.run()
+    return sim.get_summary()
+
+def test_objects_belong_to_their_simulation(networks):
+    sim = load(networks['shared'])
+    other = load(networks['shared'])
+
+    for objects in (sim.links, sim.flows, sim.hosts, sim.routers):
+        for obj in objects.values():
+            assert obj.sim is sim
+    assert sim.links['L1a'] is not other.links['L1a']
+    assert sim.EQ is not other.EQ
+
+def test_repeated_runs_match(networks):
+    assert run(networks['shared']) == run(networks['shared'])
+
+def test_interleaved_simulations_are_independent(networks):
+    expected_chain = run(networks['chain'])
+    expected_shared = run(networks['shared'])
+
+    chain = load(networks['chain'])
+    shared = load(networks['shared'])
+    chain.start()
+    shared.start()
+
+    # Take turns handling a few events of each
+    while not (chain.all_flows_done and shared.all_flows_done):
+        chain.run_events(max_events=100)
+        shared.run_events(max_events=70)
+
+    assert chain.get_summary() == expected_chain
+    assert shared.get_summary() == expected_shared
@@ -0,0 +1,82 @@
+# test_simulator.py
+# Tests of the incremental Simulator stepping API.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+from simulator import Simulator
+
+# One flow that starts at 500 ms, long after the first Bellman Ford
+NETWORK = '''L0 H1 R1 12.5 10 64
+L1 R1 H2 10 10 64
+
+F1 H1 H2 0.1 0.5 R
+
+L1
+F1
+'''
+
+@pytest.fixture
+def network(tmp_path):
+    path = tmp_path / 'network.txt'
+    path.write_text(NETWORK)
+    return str(path)
+
+def test_run_iter_steps_over_idle_time(network):
+    '''
+    Chunks keep moving forward in simulated time when there are no events
+    in them, so the iteration reaches the flow start and finishes.
+    '''
+    sim = Simulator(network)
+    chunks = []
+    for stats in sim.run_iter(sim_interval=100):
+        chunks.append(stats)
+        assert len(chunks) < 1000
+    assert chunks[-1]['done']
+    assert chunks[-1]['flows_done'] == ['F1']
+
+    times = [stats['time'] for stats in chunks]
+    assert times == sorted(times)
+    assert times[-1] > 500
+
+def test_run_iter_stops_at_end_time(network):
+    sim = Simulator(network)
+    chunks = list(sim.run_iter(sim_interval=100, end_time=700))
+    assert not chunks[-1]['done']
+    assert chunks[-1]['time'] <= 700
+    assert sim.sim.EQ.getNextTime() > 700
+    assert len(chunks) == 7
+
+def test_run_iter_event_interval(network):
+    sim = Simulator(network)
+    previous = 0
+    for stats in sim.run_iter(event_interval=50):
+        assert stats['num_events'] - previous <= 50
+        previous = stats['num_events']
+    assert sim.is_done()
+
+def test_step_and_run_until(network):
+    sim = Simulator(network)
+    assert sim.step(5) == 5
+    assert sim.num_events == 5
+
+    assert sim.run_until(600)
+    assert sim.sim.EQ.currentTime <= 600
+    assert sim.sim.EQ.getNextTime() > 600
+
+    assert sim.run()
+    assert sim.is_done()
+    assert sim.step() == 0
+
+def test_matches_one_run(network):
+    '''
+    Running in chunks handles the same events as running in one go.
+    '''
+    whole = Simulator(network)
+    whole.run()
+    chunked = Simulator(network)
+    for stats in chunked.run_iter(sim_interval=37, event_interval=101):
+        pass
+    assert chunked.num_events == whole.num_events
+    assert chunked.sim.EQ.currentTime == whole.sim.EQ.currentTime
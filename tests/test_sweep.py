@@ -0,0 +1,86 @@
+# test_sweep.py
+# Tests of the parameter sweep runner and the simulate() it runs.
+
+import pytest
+
+pytest.importorskip('matplotlib')   # simulation.py plots through analytics
+
+import constants
+import sweep
+from simulation import simulate
+
+# A single path from H1 to H2
+CHAIN = '''L0 H1 R1 12.5 10 64
+L1 R1 R2 10 10 64
+L2 R2 H2 12.5 10 64
+
+F1 H1 H2 %s 0.5 %s
+
+L1
+F1
+'''
+
+@pytest.fixture
+def write_network(tmp_path):
+    def write(data_amt=1, cc='F'):
+        path = tmp_path / ('network_%s_%s.txt' % (data_amt, cc))
+        path.write_text(CHAIN % (data_amt, cc))
+        return str(path)
+    return write
+
+def without_wall_time(summary):
+    return {key: value for key, value in summary.items() \
+            if key != 'wall_time'}
+
+def test_parse_grid_param():
+    assert sweep.parse_grid_param('FAST_ALPHA=10,15') == \
+        ('FAST_ALPHA', [10, 15])
+    assert sweep.parse_grid_param('BUFFER_SIZE=None,0.5,big') == \
+        ('BUFFER_SIZE', [None, 0.5, 'big'])
+    with pytest.raises(ValueError):
+        sweep.parse_grid_param('FAST_ALPHA')
+    with pytest.raises(ValueError):
+        sweep.parse_grid_param('NOT_A_CONSTANT=1')
+
+def test_make_grid():
+    grid = sweep.make_grid([('FAST_ALPHA', [10, 20]), ('BUFFER_SIZE', [64])])
+    assert grid == [{'FAST_ALPHA': 10, 'BUFFER_SIZE': 64},
+                    {'FAST_ALPHA': 20, 'BUFFER_SIZE': 64}]
+
+def test_sweep_matches_sequential_runs(write_network):
+    inFile = write_network()
+    grid = sweep.make_grid([('FAST_ALPHA', [10, 20]),
+                            ('BUFFER_SIZE', [32, 64])])
+
+    results = sweep.run_sweep(inFile, grid, workers=2)
+
+    assert len(results) == len(grid)
+    for overrides, summary in zip(grid, results):
+        expected = simulate({'network': inFile, 'constants': overrides})
+        assert summary['finished']
+        assert without_wall_time(summary) == \
+            dict(overrides, **without_wall_time(expected))
+
+    # The overrides were restored after every run
+    assert constants.FAST_ALPHA == 15
+    assert constants.BUFFER_SIZE is None
+
+def test_run_stops_at_end_time(write_network):
+    inFile = write_network(data_amt=1000)
+
+    summary = sweep.run_sweep_point(inFile, {}, end_time=2000)
+    assert not summary['finished']
+    assert summary['F1_done'] is None
+    assert summary['end_time'] <= 2000
+
+def test_run_stops_at_max_sim_time(write_network, monkeypatch):
+    monkeypatch.setattr(constants, 'MAX_SIM_TIME', 3000)
+    summary = simulate({'network': write_network(data_amt=1000)})
+    assert not summary['finished']
+    assert summary['end_time'] <= 3000
+
+def test_run_stops_at_wall_budget(write_network):
+    summary = simulate({'network': write_network(data_amt=1000),
+                        'wall_budget': 0.0})
+    assert not summary['finished']
+    assert summary['end_time'] < constants.MAX_SIM_TIME
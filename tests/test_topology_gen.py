@@ -0,0 +1,96 @@
+# test_topology_gen.py
+# Tests of the synthetic topology generator and the scaling benchmark.
+
+import collections
+
+import pytest
+
+import topology_gen
+
+def generate(topology, size, *options):
+    args = topology_gen.get_parser().parse_args([topology, str(size)] +
+                                                list(options))
+    return topology_gen.generate(topology, size, args)
+
+def parse(text):
+    '''
+    Returns the links ((A, B) pairs) and flows ((source, destination)
+    pairs) of a generated input file.
+    '''
+    links_text, flows_text = text.split('\n\n')[:2]
+    links = [tuple(line.split()[1:3]) for line in links_text.splitlines()]
+    flows = [tuple(line.split()[1:3]) for line in flows_text.splitlines()]
+    return links, flows
+
+def is_connected(links):
+    neighbors = collections.defaultdict(set)
+    for A, B in links:
+        neighbors[A].add(B)
+        neighbors[B].add(A)
+
+    start = next(iter(neighbors))
+    seen = {start}
+    todo = [start]
+    while todo:
+        for node in neighbors[todo.pop()] - seen:
+            seen.add(node)
+            todo.append(node)
+    return seen == set(neighbors)
+
+@pytest.mark.parametrize('topology,size', [('dumbbell', 3),
+    ('parkinglot', 4), ('ring', 5), ('fattree', 4), ('random', 8)])
+def test_generated_networks_are_valid(topology, size):
+    links, flows = parse(generate(topology, size))
+
+    assert is_connected(links)
+    assert len(set(links)) == len(links)
+    nodes = [node for link in links for node in link]
+    hosts = [node for node in nodes if node.startswith('H')]
+    assert len(hosts) == len(set(hosts))    # One link per host
+
+    assert flows
+    for src, dest in flows:
+        assert src != dest
+        assert src in hosts and dest in hosts
+
+def test_fat_tree_size():
+    links, flows = parse(generate('fattree', 4))
+    nodes = {node for link in links for node in link}
+
+    assert len([node for node in nodes if node.startswith('H')]) == 16
+    assert len([node for node in nodes if node.startswith('R')]) == 20
+    assert len(links) == 48
+    assert len(flows) == 16
+
+    with pytest.raises(ValueError):
+        generate('fattree', 3)
+
+def test_flow_options():
+    text = generate('dumbbell', 2, '--flows', '4', '--cc', 'mixed',
+                    '--start', '1', '--stagger', '0.5', '--flow-size', '2')
+    flow_lines = text.split('\n\n')[1].splitlines()
+
+    assert [line.split()[3:] for line in flow_lines] == [
+        ['2', '1', 'R'], ['2', '1.5', 'F'], ['2', '2', 'R'], ['2', '2.5', 'F']]
+
+def test_seed_makes_networks_reproducible():
+    assert generate('random', 10, '--seed', '3') == \
+        generate('random', 10, '--seed', '3')
+    assert generate('random', 10, '--seed', '3') != \
+        generate('random', 10, '--seed', '4')
+
+def test_benchmark_runs_generated_networks():
+    pytest.importorskip('matplotlib')   # The simulation plots through
+    import benchmark                    #   analytics
+
+    args = topology_gen.get_parser().parse_args(['dumbbell', '2',
+                                                '--flow-size', '0.1'])
+    results = benchmark.run_benchmark(['dumbbell'], [2], args, 'heap')
+
+    assert len(results) == 1
+    result = results[0]
+    assert (result['topology'], result['size']) == ('dumbbell', 2)
+    assert (result['hosts'], result['routers'], result['links']) == (4, 2, 5)
+    assert result['done']
+    assert result['flows_done'] == result['flows'] == 2
+    assert result['events'] > 0